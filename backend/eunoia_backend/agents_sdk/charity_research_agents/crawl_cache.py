@@ -0,0 +1,120 @@
+"""
+Persistent crawl cache (main.models.CrawlCache) used by the website crawler.
+
+Each canonical URL keeps its last body (zlib-compressed), content hash and
+HTTP validators. The crawler revalidates with If-None-Match /
+If-Modified-Since and reuses the stored body on 304 Not Modified, so
+re-researching charities whose sites have not changed transfers headers
+only.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import threading
+import zlib
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+from django.conf import settings
+from django.utils import timezone
+
+
+@dataclass
+class CachedPage:
+    text: str
+    etag: str
+    last_modified: str
+    content_hash: str
+
+
+_counters = {'hits': 0, 'misses': 0, 'bytes_fetched': 0, 'bytes_reused': 0}
+_counters_lock = threading.Lock()
+
+
+def _count(**increments: int) -> None:
+    with _counters_lock:
+        for key, value in increments.items():
+            _counters[key] += value
+
+
+def crawl_cache_stats() -> Dict[str, float]:
+    """Process-wide revalidation counters: 304 hits, full downloads, and body bytes fetched vs reused."""
+    with _counters_lock:
+        stats = dict(_counters)
+    lookups = stats['hits'] + stats['misses']
+    stats['hit_rate'] = round(stats['hits'] / lookups, 3) if lookups else 0.0
+    return stats
+
+
+def is_enabled() -> bool:
+    return getattr(settings, 'CRAWL_CACHE_ENABLED', True)
+
+
+def url_hash(canonical_url: str) -> str:
+    return hashlib.sha256(canonical_url.encode('utf-8')).hexdigest()
+
+
+def read_cached_page(canonical_url: str) -> Optional[CachedPage]:
+    from main.models import CrawlCache
+
+    try:
+        row = CrawlCache.objects.filter(url_hash=url_hash(canonical_url)).values(
+            'body', 'etag', 'last_modified', 'content_hash').first()
+    except Exception as e:
+        print(f"Crawl cache read failed: {e}")
+        return None
+    if row is None:
+        return None
+    try:
+        text = zlib.decompress(bytes(row['body'])).decode('utf-8')
+    except (zlib.error, UnicodeDecodeError):
+        return None
+    return CachedPage(text=text, etag=row['etag'], last_modified=row['last_modified'], content_hash=row['content_hash'])
+
+
+def conditional_headers(cached: Optional[CachedPage]) -> Dict[str, str]:
+    headers: Dict[str, str] = {}
+    if cached is not None:
+        if cached.etag:
+            headers['If-None-Match'] = cached.etag
+        if cached.last_modified:
+            headers['If-Modified-Since'] = cached.last_modified
+    return headers
+
+
+def mark_revalidated(canonical_url: str, cached: CachedPage) -> None:
+    """Record a 304: the stored body is still current."""
+    from main.models import CrawlCache
+
+    _count(hits=1, bytes_reused=len(cached.text.encode('utf-8')))
+    try:
+        CrawlCache.objects.filter(url_hash=url_hash(canonical_url)).update(validated_at=timezone.now())
+    except Exception as e:
+        print(f"Crawl cache update failed: {e}")
+
+
+def store_page(canonical_url: str, text: str, content_type: str, etag: str, last_modified: str,
+               wire_bytes: int) -> None:
+    """Store (or replace) the body and validators of a freshly downloaded page."""
+    from main.models import CrawlCache
+
+    _count(misses=1, bytes_fetched=wire_bytes)
+    body = text.encode('utf-8')
+    now = timezone.now()
+    try:
+        CrawlCache.objects.update_or_create(
+            url_hash=url_hash(canonical_url),
+            defaults={
+                'url': canonical_url,
+                'body': zlib.compress(body, 6),
+                'content_type': content_type[:255],
+                'etag': etag[:512],
+                'last_modified': last_modified[:64],
+                'content_hash': hashlib.sha256(body).hexdigest(),
+                'fetched_at': now,
+                'validated_at': now,
+            },
+        )
+    except Exception as e:
+        print(f"Crawl cache write failed: {e}")
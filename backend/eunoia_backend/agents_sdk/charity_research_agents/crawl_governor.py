@@ -0,0 +1,254 @@
+"""
+Process-wide crawl governor.
+
+Every crawler request (pages, robots.txt, sitemaps) goes through one
+`CrawlGovernor`, however many research threads or event loops are crawling:
+
+- a global cap on in-flight requests (CRAWL_GLOBAL_CONCURRENCY), so bulk
+  research cannot exhaust sockets or starve the web process;
+- a token bucket per host (CRAWL_DOMAIN_RATE requests/second, bursts of
+  CRAWL_DOMAIN_BURST), tightened to the site's robots.txt Crawl-delay;
+- adaptive backoff: a 429 or 503 halves the host's rate and pauses it for
+  Retry-After (or an exponential backoff); successful responses restore the
+  rate gradually.
+
+State is guarded by a threading lock and waiters are woken with
+`call_soon_threadsafe`, so crawls on different event loops share the same limits.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import random
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
+from typing import Awaitable, Callable, Deque, Dict, Optional, Tuple
+
+import httpx
+from django.conf import settings
+
+from .frontier import site_host
+
+THROTTLE_STATUSES = frozenset({429, 503})
+BASE_BACKOFF = 1.0
+RECOVERY_STEP = 0.1  # share of the target rate regained per successful response
+MIN_RATE_FACTOR = 1 / 16
+IDLE_BUCKET_SECONDS = 600
+
+
+@dataclass
+class _DomainBucket:
+    target_rate: float
+    burst: float
+    rate: float
+    tokens: float
+    updated: float
+    paused_until: float = 0.0
+    strikes: int = 0
+
+    def refill(self, now: float) -> None:
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+
+def _retry_after_seconds(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class CrawlGovernor:
+    def __init__(self, max_concurrency: int = 16, domain_rate: float = 2.0, domain_burst: float = 4.0,
+                 max_backoff: float = 60.0, clock: Callable[[], float] = time.monotonic,
+                 sleep: Callable[[float], Awaitable[None]] = asyncio.sleep):
+        # clock and sleep are injectable so the computed waits can be checked without real time passing
+        self._clock = clock
+        self._sleep = sleep
+        self.max_concurrency = max(1, max_concurrency)
+        self.domain_rate = max(0.01, domain_rate)
+        self.domain_burst = max(1.0, domain_burst)
+        self.max_backoff = max_backoff
+        self._lock = threading.Lock()
+        self._active = 0
+        self._waiters: Deque[Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = deque()
+        self._buckets: Dict[str, _DomainBucket] = {}
+        self._counters = {'requests': 0, 'throttled': 0, 'waited_seconds': 0.0}
+
+    # --- Per-host token buckets ---
+
+    def _bucket(self, host: str, now: float) -> _DomainBucket:
+        bucket = self._buckets.get(host)
+        if bucket is None:
+            if len(self._buckets) > 1000:
+                for idle in [h for h, b in self._buckets.items() if now - b.updated > IDLE_BUCKET_SECONDS]:
+                    del self._buckets[idle]
+            bucket = _DomainBucket(self.domain_rate, self.domain_burst, self.domain_rate, self.domain_burst, now)
+            self._buckets[host] = bucket
+        return bucket
+
+    def set_crawl_delay(self, host: str, delay: float) -> None:
+        """Cap a host's rate at one request per `delay` seconds (robots.txt Crawl-delay)."""
+        if delay <= 0:
+            return
+        with self._lock:
+            bucket = self._bucket(host, self._clock())
+            bucket.target_rate = min(bucket.target_rate, 1.0 / delay)
+            bucket.rate = min(bucket.rate, bucket.target_rate)
+            bucket.burst = 1.0
+            bucket.tokens = min(bucket.tokens, 1.0)
+
+    def _reserve(self, host: str) -> float:
+        """Take a token from `host`'s bucket, returning how long to wait before using it."""
+        with self._lock:
+            now = self._clock()
+            bucket = self._bucket(host, now)
+            bucket.refill(now)
+            wait = max(0.0, bucket.paused_until - now)
+            if bucket.tokens < 1.0:
+                wait = max(wait, (1.0 - bucket.tokens) / bucket.rate)
+            bucket.tokens -= 1.0  # may go negative: later callers queue behind this reservation
+            return wait
+
+    def _pause_remaining(self, host: str) -> float:
+        with self._lock:
+            bucket = self._buckets.get(host)
+            return max(0.0, bucket.paused_until - self._clock()) if bucket else 0.0
+
+    def report(self, host: str, status: Optional[int], retry_after: Optional[str] = None) -> Optional[float]:
+        """
+        Feed a response status back to `host`'s bucket.
+
+        Returns the pause the server asked for after a 429/503 (applied capped
+        at max_backoff), else None.
+        """
+        with self._lock:
+            now = self._clock()
+            bucket = self._bucket(host, now)
+            bucket.refill(now)
+            if status in THROTTLE_STATUSES:
+                self._counters['throttled'] += 1
+                bucket.strikes += 1
+                bucket.rate = max(bucket.target_rate * MIN_RATE_FACTOR, bucket.rate / 2)
+                pause = _retry_after_seconds(retry_after)
+                if pause is None:
+                    pause = BASE_BACKOFF * (2 ** (bucket.strikes - 1)) * random.uniform(0.8, 1.2)
+                applied = min(pause, self.max_backoff)
+                bucket.paused_until = max(bucket.paused_until, now + applied)
+                # Drain the bucket so exactly one request is allowed when the pause ends
+                bucket.tokens = min(bucket.tokens, 1.0 - applied * bucket.rate)
+                return pause
+            if status is not None and status < 500:
+                bucket.strikes = 0
+                bucket.rate = min(bucket.target_rate, bucket.rate + bucket.target_rate * RECOVERY_STEP)
+            return None
+
+    # --- Global concurrency cap ---
+
+    async def _acquire_slot(self) -> None:
+        while True:
+            with self._lock:
+                if self._active < self.max_concurrency:
+                    self._active += 1
+                    return
+                future = asyncio.get_running_loop().create_future()
+                waiter = (asyncio.get_running_loop(), future)
+                self._waiters.append(waiter)
+            try:
+                await future
+            except asyncio.CancelledError:
+                with self._lock:
+                    try:
+                        self._waiters.remove(waiter)
+                    except ValueError:
+                        self._wake_one_locked()  # we were woken but won't take the slot: pass it on
+                raise
+
+    def _wake_one_locked(self) -> None:
+        while self._waiters:
+            loop, future = self._waiters.popleft()
+            try:
+                loop.call_soon_threadsafe(lambda f=future: f.done() or f.set_result(None))
+                return
+            except RuntimeError:
+                continue  # that loop has closed
+
+    def _release_slot(self) -> None:
+        with self._lock:
+            self._active -= 1
+            self._wake_one_locked()
+
+    @asynccontextmanager
+    async def slot(self, host: str):
+        """Wait for `host`'s rate limit and a global slot; hold the slot for the duration of the request."""
+        started = self._clock()
+        wait = self._reserve(host)
+        while wait > 0:
+            await self._sleep(wait)
+            wait = self._pause_remaining(host)  # a 429/503 may have paused the host meanwhile
+        await self._acquire_slot()
+        with self._lock:
+            self._counters['requests'] += 1
+            self._counters['waited_seconds'] += self._clock() - started
+        try:
+            yield
+        finally:
+            self._release_slot()
+
+    async def get(self, client: httpx.AsyncClient, url: str, headers: Optional[Dict[str, str]] = None,
+                  max_retries: Optional[int] = None) -> httpx.Response:
+        """
+        GET `url` under the governor.
+
+        429/503 responses are retried (after the host's backoff) up to
+        CRAWL_MAX_RETRIES times, unless the server asks for a longer pause than
+        max_backoff; the last response is returned either way.
+        """
+        host = site_host(url)
+        retries = getattr(settings, 'CRAWL_MAX_RETRIES', 2) if max_retries is None else max_retries
+        attempt = 0
+        while True:
+            async with self.slot(host):
+                resp = await client.get(url, headers=headers)
+            pause = self.report(host, resp.status_code, resp.headers.get('Retry-After'))
+            if pause is None or pause > self.max_backoff or attempt >= retries:
+                return resp
+            attempt += 1
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            stats = dict(self._counters)
+            stats['active'] = self._active
+            stats['waiting'] = len(self._waiters)
+            stats['backed_off_hosts'] = sum(1 for b in self._buckets.values() if b.rate < b.target_rate)
+        stats['waited_seconds'] = round(stats['waited_seconds'], 3)
+        return stats
+
+
+_governor: Optional[CrawlGovernor] = None
+_governor_lock = threading.Lock()
+
+
+def get_crawl_governor() -> CrawlGovernor:
+    """Return the process-wide crawl governor, configured from the CRAWL_* settings."""
+    global _governor
+    if _governor is None:
+        with _governor_lock:
+            if _governor is None:
+                _governor = CrawlGovernor(
+                    max_concurrency=getattr(settings, 'CRAWL_GLOBAL_CONCURRENCY', 16),
+                    domain_rate=getattr(settings, 'CRAWL_DOMAIN_RATE', 2.0),
+                    domain_burst=getattr(settings, 'CRAWL_DOMAIN_BURST', 4.0),
+                    max_backoff=getattr(settings, 'CRAWL_MAX_BACKOFF', 60.0),
+                )
+    return _governor
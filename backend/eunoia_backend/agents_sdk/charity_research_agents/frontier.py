@@ -0,0 +1,162 @@
+"""
+Crawl frontier for the charity website crawler.
+
+URLs are canonicalized before they are queued, so `/about`, `/about/`,
+`/About#team` and `/about?utm_source=x` are one page, and every link is
+scored from its path and anchor text: pages that describe the charity
+(about, mission, programs, our work, impact) are fetched before blog
+archives, tag pages and legal boilerplate. The frontier is a heap keyed by
+score plus a set of seen keys, so push, pop and membership are O(log n) / O(1).
+"""
+
+from __future__ import annotations
+
+import heapq
+import itertools
+import re
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+TRACKING_PARAMS = frozenset({
+    'fbclid', 'gclid', 'dclid', 'msclkid', 'mc_cid', 'mc_eid', 'igshid', 'yclid',
+    '_ga', '_gl', '_hsenc', '_hsmi', 'ref', 'ref_src', 'source', 'share',
+})
+TRACKING_PREFIXES = ('utm_', 'pk_', 'hsa_')
+
+SKIPPED_EXTENSIONS = frozenset({
+    '.pdf', '.jpg', '.jpeg', '.png', '.gif', '.svg', '.webp', '.ico', '.zip', '.rar', '.gz',
+    '.doc', '.docx', '.xls', '.xlsx', '.ppt', '.pptx', '.mp3', '.mp4', '.mov', '.avi',
+    '.css', '.js', '.json', '.xml', '.rss', '.woff', '.woff2', '.ttf', '.exe', '.dmg',
+})
+
+# Path / anchor-text priors: what the research agents need first
+LINK_PRIORS: List[Tuple[re.Pattern, float]] = [
+    (re.compile(r'about|who[-_ ]?we[-_ ]?are|mission|vision|our[-_ ]?story'), 3.0),
+    (re.compile(r'program|our[-_ ]?work|what[-_ ]?we[-_ ]?do|services'), 2.5),
+    (re.compile(r'impact|project|campaign|initiative|appeal|cause'), 2.0),
+    (re.compile(r'history|annual[-_ ]?report|results|where[-_ ]?we[-_ ]?work'), 1.5),
+    (re.compile(r'team|leadership|board|staff|contact'), 0.5),
+]
+LINK_PENALTIES: List[Tuple[re.Pattern, float]] = [
+    (re.compile(r'/(tag|tags|category|categories|author|archive|archives|feed|search)(/|$)'), 3.0),
+    (re.compile(r'/page/\d+|[?&]page=\d+|/20\d\d/\d\d(/|$)'), 3.0),
+    (re.compile(r'login|log-in|sign-?in|register|account|cart|checkout|basket|wp-admin|wp-json'), 4.0),
+    (re.compile(r'privacy|cookie|terms|legal|disclaimer|accessibility|sitemap'), 2.5),
+    (re.compile(r'/(blog|news|events|press|media|stories)/.+'), 1.5),  # individual posts, not the index
+    (re.compile(r'shop|store|merch|careers|jobs|vacancies'), 1.5),
+]
+DEPTH_PENALTY = 0.5
+
+
+def canonicalize_url(url: str) -> Optional[str]:
+    """
+    Normalize a URL for fetching and deduplication.
+
+    Lowercases scheme and host, drops default ports, fragments, tracking
+    parameters and trailing slashes, collapses duplicate slashes and sorts the
+    query. Returns None for non-HTTP(S) URLs and obvious non-HTML resources.
+    """
+    try:
+        parts = urlsplit(url.strip())
+    except ValueError:
+        return None
+    scheme = parts.scheme.lower()
+    if scheme not in ('http', 'https'):
+        return None
+    host = (parts.hostname or '').lower()
+    if not host:
+        return None
+    port = parts.port if parts.port and (scheme, parts.port) not in (('http', 80), ('https', 443)) else None
+    netloc = f"{host}:{port}" if port else host
+
+    path = re.sub(r'/{2,}', '/', parts.path or '/')
+    if len(path) > 1:
+        path = path.rstrip('/')
+    last_segment = path.rsplit('/', 1)[-1].lower()
+    if '.' in last_segment and last_segment[last_segment.rfind('.'):] in SKIPPED_EXTENSIONS:
+        return None
+
+    query = [
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if key.lower() not in TRACKING_PARAMS and not key.lower().startswith(TRACKING_PREFIXES)
+    ]
+    return urlunsplit((scheme, netloc, path, urlencode(sorted(query)), ''))
+
+
+def site_host(url: str) -> str:
+    """Host used to decide whether a link stays on the crawled site (www. and bare domain are one site)."""
+    host = (urlsplit(url).hostname or '').lower()
+    return host[4:] if host.startswith('www.') else host
+
+
+def url_key(canonical_url: str) -> str:
+    """Deduplication key: case-insensitive, with http/https and www. variants treated as one page."""
+    parts = urlsplit(canonical_url)
+    host = parts.netloc[4:] if parts.netloc.startswith('www.') else parts.netloc
+    return f"{host}{parts.path}?{parts.query}".lower()
+
+
+def score_link(canonical_url: str, anchor_text: str = '') -> float:
+    """Priority of a link: path and anchor-text priors, minus penalties for archives, boilerplate and depth."""
+    parts = urlsplit(canonical_url)
+    path = parts.path.lower()
+    target = f"{path}?{parts.query}".lower() if parts.query else path
+    anchor = (anchor_text or '').lower()
+
+    score = 0.0
+    for pattern, weight in LINK_PRIORS:
+        if pattern.search(path):
+            score += weight
+        elif anchor and pattern.search(anchor):
+            score += weight * 0.75
+    for pattern, weight in LINK_PENALTIES:
+        if pattern.search(target):
+            score -= weight
+    depth = len([segment for segment in path.split('/') if segment])
+    return score - DEPTH_PENALTY * max(0, depth - 1)
+
+
+class CrawlFrontier:
+    """
+    Max-priority frontier of canonical URLs.
+
+    A URL is queued once per key; pushing it again with a higher score (e.g.
+    a better anchor text found on a later page) raises its priority, and the
+    stale heap entry is skipped on pop.
+    """
+
+    def __init__(self):
+        self._heap: List[Tuple[float, int, str]] = []
+        self._best: Dict[str, float] = {}
+        self._done = set()
+        self._counter = itertools.count()
+
+    def __len__(self) -> int:
+        return len(self._best) - len(self._done)
+
+    def __bool__(self) -> bool:
+        return len(self) > 0
+
+    def __contains__(self, url: str) -> bool:
+        return url_key(url) in self._best
+
+    def push(self, url: str, score: float) -> bool:
+        """Queue `url` (already canonical); returns False if it was seen with an equal or better score."""
+        key = url_key(url)
+        if key in self._done or self._best.get(key, float('-inf')) >= score:
+            return False
+        self._best[key] = score
+        # Ties keep discovery order (breadth-first)
+        heapq.heappush(self._heap, (-score, next(self._counter), url))
+        return True
+
+    def pop(self) -> Optional[str]:
+        """Remove and return the highest-scoring URL not yet popped, or None when empty."""
+        while self._heap:
+            neg_score, _, url = heapq.heappop(self._heap)
+            key = url_key(url)
+            if key in self._done or -neg_score != self._best.get(key):
+                continue
+            self._done.add(key)
+            return url
+        return None
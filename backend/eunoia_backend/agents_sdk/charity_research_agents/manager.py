@@ -3,18 +3,22 @@ from __future__ import annotations
 import asyncio
 import logging
 import threading
-from typing import Any, Dict, List
+import time
+from typing import Any, Dict, List, Optional, Tuple, Type
 
 from asgiref.sync import sync_to_async
+from django.conf import settings
 from django.utils.text import slugify
 
-from agents import Runner, custom_span, gen_trace_id, trace, set_tracing_disabled
+from agents import Agent, Runner, custom_span, gen_trace_id, trace, set_tracing_disabled
 set_tracing_disabled(True)
 
 from .utils import smart_website_crawler, CrawledWebsiteData
+from .prompt_assembler import MOVEMENT_GOAL, PROFILE_GOAL, PromptGoal, select_page_content
 from .charity_profile_agent import charity_profile_agent, CharityProfile
 from .movement_finder_agent import movement_finder_agent, MovementData, MovementAnalysisResult
-from main.utils import get_embedding
+from main.openai_client import run_sync
+from main.utils import get_embeddings
 
 
 logger = logging.getLogger(__name__)
@@ -34,37 +38,88 @@ class CharityResearchManager:
             if not charity.website_url:
                 return {"success": False, "error": "Charity has no website_url", "trace_id": trace_id}
 
+            durations: Dict[str, float] = {}
+            started = time.perf_counter()
+
             # Step 1: Crawl
             crawled = await smart_website_crawler(charity.website_url, max_pages=max_pages)
+            durations["crawl"] = round(time.perf_counter() - started, 3)
             if not crawled.pages:
-                return {"success": False, "error": "No crawlable content found", "trace_id": trace_id}
-
-            # Step 2: Analyze profile
-            profile_input = self._prepare_profile_input(crawled)
-            profile_result = await Runner.run(charity_profile_agent, profile_input)
-            profile: CharityProfile = profile_result.final_output_as(CharityProfile)
+                return {"success": False, "error": "No crawlable content found", "durations": durations, "trace_id": trace_id}
 
-            # Step 3: Find movements
-            movement_input = self._prepare_movement_input(crawled)
-            movements_result = await Runner.run(movement_finder_agent, movement_input)
-            analysis = movements_result.final_output_as(MovementAnalysisResult)
-            movements: List[MovementData] = analysis.movements
-
-            # Step 4: Save
+            # Step 2: Profile and movement analysis both read only the crawl, so they run concurrently.
+            # Prompt assembly is CPU work; keep it off the event loop shared with every OpenAI call.
+            profile_input, movement_input = await asyncio.gather(
+                asyncio.to_thread(self._prepare_profile_input, crawled),
+                asyncio.to_thread(self._prepare_movement_input, crawled),
+            )
+            (profile, profile_error), (analysis, movement_error) = await asyncio.gather(
+                self._run_stage("profile", charity_profile_agent, profile_input, CharityProfile,
+                                getattr(settings, 'RESEARCH_PROFILE_TIMEOUT', 120), durations),
+                self._run_stage("movements", movement_finder_agent, movement_input, MovementAnalysisResult,
+                                getattr(settings, 'RESEARCH_MOVEMENT_TIMEOUT', 120), durations),
+            )
+            errors = {stage: error for stage, error in (("profile", profile_error), ("movements", movement_error)) if error}
+            if profile is None and analysis is None:
+                durations["total"] = round(time.perf_counter() - started, 3)
+                return {"success": False, "error": "; ".join(f"{k}: {v}" for k, v in errors.items()),
+                        "errors": errors, "durations": durations, "trace_id": trace_id}
+            movements: List[MovementData] = analysis.movements if analysis is not None else []
+
+            # Step 3: Save whatever succeeded
+            save_started = time.perf_counter()
             await self._save_outputs(charity_id, crawled, profile, movements)
+            durations["save"] = round(time.perf_counter() - save_started, 3)
+            durations["total"] = round(time.perf_counter() - started, 3)
 
-            return {
+            result = {
                 "success": True,
                 "charity_id": charity_id,
                 "pages_crawled": crawled.total_pages_crawled,
                 "movements_found": len(movements),
+                "durations": durations,
                 "trace_id": trace_id,
             }
+            if errors:
+                result["partial"] = True
+                result["errors"] = errors
+            return result
+
+    async def _run_stage(self, stage: str, agent: Agent, agent_input: str, output_type: Type, timeout: float,
+                         durations: Dict[str, float]) -> Tuple[Optional[Any], Optional[str]]:
+        """Run one agent with its own timeout. Returns (output, None) or (None, error) - never raises."""
+        started = time.perf_counter()
+        try:
+            result = await asyncio.wait_for(Runner.run(agent, agent_input), timeout=timeout)
+            return result.final_output_as(output_type), None
+        except asyncio.TimeoutError:
+            logger.warning(f"Research stage '{stage}' timed out after {timeout}s")
+            return None, f"timed out after {timeout}s"
+        except Exception as e:
+            logger.error(f"Research stage '{stage}' failed: {e}")
+            return None, f"{type(e).__name__}: {e}"
+        finally:
+            durations[stage] = round(time.perf_counter() - started, 3)
+
+    def _page_sections(self, crawled: CrawledWebsiteData, goal: PromptGoal, budget_setting: str,
+                       include_meta: bool) -> List[str]:
+        token_budget = getattr(settings, budget_setting, 0)
+        if token_budget <= 0:
+            # Unbudgeted: every page in full
+            return [
+                f"PAGE: {p.title or ''} ({p.url})\n" + (f"Meta: {p.meta_description or ''}\n" if include_meta else "")
+                + f"Headings: {', '.join(p.headings)}\nContent: {p.content}\n"
+                for p in crawled.pages
+            ]
+        sections, stats = select_page_content(crawled, goal, token_budget, include_meta=include_meta)
+        logger.info(
+            f"{goal.name} prompt for {crawled.domain}: ~{stats['tokens_after']} of ~{stats['tokens_before']} tokens "
+            f"({stats['spans_kept']}/{stats['spans_total']} spans)"
+        )
+        return sections
 
     def _prepare_profile_input(self, crawled: CrawledWebsiteData) -> str:
-        parts = []
-        for p in crawled.pages:
-            parts.append(f"PAGE: {p.title or ''} ({p.url})\nMeta: {p.meta_description or ''}\nHeadings: {', '.join(p.headings)}\nContent: {p.content}\n")
+        parts = self._page_sections(crawled, PROFILE_GOAL, 'RESEARCH_PROFILE_TOKEN_BUDGET', include_meta=True)
         return (
             f"CHARITY WEBSITE CRAWL DATA\nDomain: {crawled.domain}\nMain URL: {crawled.main_url}\n"
             f"Total Pages Crawled: {crawled.total_pages_crawled}\nCrawl Method: {crawled.crawl_method}\n\n"
@@ -73,16 +128,14 @@ class CharityResearchManager:
         )
 
     def _prepare_movement_input(self, crawled: CrawledWebsiteData) -> str:
-        parts = []
-        for p in crawled.pages:
-            parts.append(f"PAGE: {p.title or ''} ({p.url})\nHeadings: {', '.join(p.headings)}\nContent: {p.content}\n")
+        parts = self._page_sections(crawled, MOVEMENT_GOAL, 'RESEARCH_MOVEMENT_TOKEN_BUDGET', include_meta=False)
         return (
             f"CHARITY WEBSITE CRAWL DATA FOR MOVEMENT DISCOVERY\nDomain: {crawled.domain}\n"
             f"PAGES:\n{chr(10).join(parts)}\n"
             "Identify up to 5 top movements with supporting URLs."
         )
 
-    async def _save_outputs(self, charity_id: int, crawled: CrawledWebsiteData, profile: CharityProfile, movements: List[MovementData]) -> None:
+    async def _save_outputs(self, charity_id: int, crawled: CrawledWebsiteData, profile: Optional[CharityProfile], movements: List[MovementData]) -> None:
         from main.models import Charity, Movement
 
         def map_category(cat: str | None) -> str | None:
@@ -94,59 +147,52 @@ class CharityResearchManager:
 
         charity = await sync_to_async(Charity.objects.get)(id=charity_id)
 
-        # Update charity fields
-        if profile.tagline:
-            charity.tagline = profile.tagline
-        if profile.summary and (not charity.description or len(charity.description) < 20):
-            charity.description = profile.summary
-        if profile.keywords:
-            charity.keywords = profile.keywords
-        mapped_category = map_category(profile.category)
-        if mapped_category:
-            charity.category = mapped_category
-        if profile.country_of_operation:
-            charity.country_of_operation = profile.country_of_operation
-        if profile.year_founded:
-            charity.year_founded = profile.year_founded
-        if profile.contact_person:
-            charity.contact_person = profile.contact_person
+        # Update charity fields (profile is None when only movement discovery succeeded)
+        if profile is not None:
+            if profile.tagline:
+                charity.tagline = profile.tagline
+            if profile.summary and (not charity.description or len(charity.description) < 20):
+                charity.description = profile.summary
+            if profile.keywords:
+                charity.keywords = profile.keywords
+            mapped_category = map_category(profile.category)
+            if mapped_category:
+                charity.category = mapped_category
+            if profile.country_of_operation:
+                charity.country_of_operation = profile.country_of_operation
+            if profile.year_founded:
+                charity.year_founded = profile.year_founded
+            if profile.contact_person:
+                charity.contact_person = profile.contact_person
 
         if not charity.extracted_text_data:
             combined_text = "\n\n".join([p.content for p in crawled.pages])
             charity.extracted_text_data = combined_text[:15000]
 
-        # Generate/update the charity embedding from description + tagline + keywords
+        # Embed the charity (description + tagline + keywords) and every movement summary in one batched request
+        text_for_embedding_parts: List[str] = []
+        if charity.description:
+            text_for_embedding_parts.append(charity.description)
+        if charity.tagline:
+            text_for_embedding_parts.append(charity.tagline)
+        if charity.keywords:
+            text_for_embedding_parts.append(" ".join(charity.keywords))
+        text_for_embedding = " \n ".join(text_for_embedding_parts).strip()
+
+        movements = [m for m in movements if m.title]
         try:
-            text_for_embedding_parts: List[str] = []
-            if charity.description:
-                text_for_embedding_parts.append(charity.description)
-            if charity.tagline:
-                text_for_embedding_parts.append(charity.tagline)
-            if charity.keywords:
-                text_for_embedding_parts.append(" ".join(charity.keywords))
-            text_for_embedding = " \n ".join(text_for_embedding_parts).strip()
-            if text_for_embedding:
-                emb = await sync_to_async(get_embedding)(text_for_embedding)
-                if emb:
-                    charity.embedding = emb
+            embeddings = await sync_to_async(get_embeddings)([text_for_embedding] + [m.summary or '' for m in movements])
         except Exception:
-            pass
+            embeddings = [None] * (len(movements) + 1)
+        if embeddings[0]:
+            charity.embedding = embeddings[0]
 
         await sync_to_async(charity.save)()
 
         # Create/update movements
-        for m in movements:
-            if not m.title:
-                continue
+        for m, movement_embedding in zip(movements, embeddings[1:]):
             base_slug = slugify(m.title)[:290]
             slug = await sync_to_async(self._unique_slug)(charity, base_slug)
-            # Compute embedding from summary if present
-            movement_embedding = None
-            if m.summary:
-                try:
-                    movement_embedding = await sync_to_async(get_embedding)(m.summary)
-                except Exception:
-                    movement_embedding = None
 
             await sync_to_async(Movement.objects.update_or_create)(
                 charity=charity,
@@ -181,11 +227,8 @@ def research_charity_sync(charity_id: int, max_pages: int = 6) -> Dict[str, Any]
         manager = CharityResearchManager()
         return await manager.research_charity(charity_id=charity_id, max_pages=max_pages)
 
-    loop = asyncio.new_event_loop()
-    try:
-        return loop.run_until_complete(_run())
-    finally:
-        loop.close()
+    # Runs on the shared OpenAI event loop so the agents reuse its pooled connections
+    return run_sync(_run())
 
 
 def launch_charity_research_in_background(charity_id: int, max_pages: int = 6) -> None:
@@ -0,0 +1,238 @@
+"""
+Relevance-ranked, token-budgeted prompt assembly for the research agents.
+
+Instead of pasting every crawled page in full, pages are split into
+sentence-sized spans, each span is scored against the agent's goal and the
+best spans are packed into a token budget:
+
+- TF-IDF similarity of the span to the goal's description;
+- keyword priors for the facts the agent must not miss ("mission",
+  "founded in 1998", "programme", "campaign", ...);
+- a page prior from the URL path (/about, /mission for the profile;
+  /projects, /campaigns for movements) and a small bonus for leading spans,
+  where pages usually state what they are about.
+
+Boilerplate repeated across pages (navigation, cookie banners, footers) is
+kept once. Selected spans are put back in page order, and every page keeps
+a short header (title, URL, meta description, headings) so the movement
+agent can still cite source URLs. A crawl that already fits the budget is
+passed through unchanged.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import math
+import re
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Tuple
+from urllib.parse import urlparse
+
+from .utils import CrawledPageData, CrawledWebsiteData
+
+try:
+    import tiktoken
+    _ENCODING = tiktoken.get_encoding("o200k_base")
+except Exception:  # optional: fall back to a characters-per-token estimate
+    _ENCODING = None
+
+CHARS_PER_TOKEN = 4
+SENTENCE_RE = re.compile(r"(?<=[.!?])\s+(?=[A-Z0-9\"'(])")
+MAX_SPAN_CHARS = 400
+MIN_SPAN_CHARS = 25
+MAX_HEADINGS = 12
+
+
+def estimate_tokens(text: str) -> int:
+    if not text:
+        return 0
+    if _ENCODING is not None:
+        return len(_ENCODING.encode(text, disallowed_special=()))
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+@dataclass(frozen=True)
+class PromptGoal:
+    """What an agent is looking for: a description for TF-IDF scoring plus keyword and URL priors."""
+    name: str
+    description: str
+    keyword_priors: Dict[str, float]
+    path_priors: Dict[str, float] = field(default_factory=dict)
+
+
+PROFILE_GOAL = PromptGoal(
+    name="profile",
+    description=(
+        "charity mission vision purpose what we do who we are our work programs services "
+        "founded established history registered charity country headquarters contact director founder"
+    ),
+    keyword_priors={
+        r"\bmission\b|\bvision\b|\bpurpose\b": 2.0,
+        r"\b(founded|established|incorporated|started|since)\b[^.]{0,40}\b(1[89]\d\d|20\d\d)\b": 3.0,
+        r"\b(1[89]\d\d|20\d\d)\b[^.]{0,40}\b(founded|established)\b": 3.0,
+        r"\bwe (are|work|believe|provide|support|help)\b|\bour work\b|\bwho we are\b": 1.5,
+        r"\bprogram(me)?s?\b|\bservices?\b|\bprojects?\b": 1.0,
+        r"\bregistered charity\b|\bcharity (no|number)\b|\bnon-?profit\b|\b501\(c\)": 1.5,
+        r"\b(director|founder|ceo|chair|president|contact)\b": 1.0,
+        r"\bheadquartered\b|\bbased in\b|\boperat(e|es|ing) in\b": 1.5,
+    },
+    path_priors={
+        "about": 1.5, "mission": 1.5, "who-we-are": 1.5, "history": 1.0, "our-work": 1.0,
+        "what-we-do": 1.0, "team": 0.5, "contact": 0.5,
+    },
+)
+
+MOVEMENT_GOAL = PromptGoal(
+    name="movements",
+    description=(
+        "current campaigns initiatives projects programmes appeals launched active ongoing "
+        "partnership impact communities region country target goal join donate support"
+    ),
+    keyword_priors={
+        r"\bcampaigns?\b|\binitiatives?\b|\bappeals?\b|\bmovements?\b": 2.0,
+        r"\bprojects?\b|\bprogram(me)?s?\b": 1.5,
+        r"\b(launch(ed|es)?|ongoing|currently|now|this year)\b": 1.0,
+        r"\b20[12]\d\b": 1.0,
+        r"\b(donate|join|sign|volunteer|fundrais\w*)\b": 0.75,
+        r"\b(children|refugees|families|communities|women|girls|patients)\b": 0.5,
+        r"\b\d[\d,.]*\s*(people|children|families|schools|trees|wells|meals)\b": 1.0,
+    },
+    path_priors={
+        "campaign": 1.5, "project": 1.5, "program": 1.5, "initiative": 1.5, "appeal": 1.5,
+        "what-we-do": 1.0, "our-work": 1.0, "news": 0.75, "impact": 0.75,
+    },
+)
+
+
+@dataclass
+class _Span:
+    page: int
+    position: int
+    text: str
+    tokens: int
+    score: float = 0.0
+
+
+def split_spans(content: str) -> List[str]:
+    """
+    Split page text into sentence-sized spans, breaking overlong ones on word boundaries.
+
+    Sentences shorter than MIN_SPAN_CHARS ("Founded in 1999.", "CEO: Jane
+    Doe.") are merged into the following span - or the previous one at the
+    end of the page - rather than dropped.
+    """
+    spans: List[str] = []
+    pending = ""
+    for sentence in SENTENCE_RE.split(content or ""):
+        sentence = f"{pending} {sentence.strip()}".strip() if pending else sentence.strip()
+        pending = ""
+        while len(sentence) > MAX_SPAN_CHARS:
+            cut = sentence.rfind(" ", 0, MAX_SPAN_CHARS)
+            cut = cut if cut > MAX_SPAN_CHARS // 2 else MAX_SPAN_CHARS
+            spans.append(sentence[:cut].strip())
+            sentence = sentence[cut:].strip()
+        if len(sentence) >= MIN_SPAN_CHARS:
+            spans.append(sentence)
+        else:
+            pending = sentence
+    if pending:
+        if spans and len(spans[-1]) + len(pending) < MAX_SPAN_CHARS:
+            spans[-1] = f"{spans[-1]} {pending}"
+        else:
+            spans.append(pending)
+    return spans
+
+
+def _path_prior(url: str, goal: PromptGoal) -> float:
+    path = urlparse(url).path.lower()
+    if path.strip("/") == "":
+        return 1.0  # the home page usually states the mission
+    return max((weight for hint, weight in goal.path_priors.items() if hint in path), default=0.0)
+
+
+def _collect_spans(pages: Sequence[CrawledPageData]) -> List[_Span]:
+    spans: List[_Span] = []
+    seen = set()
+    for page_index, page in enumerate(pages):
+        for position, text in enumerate(split_spans(page.content)):
+            # Navigation, cookie banners and footers repeat on every page; keep the first copy
+            key = hashlib.sha1(" ".join(text.lower().split()).encode("utf-8")).digest()
+            if key in seen:
+                continue
+            seen.add(key)
+            spans.append(_Span(page=page_index, position=position, text=text, tokens=estimate_tokens(text) + 1))
+    return spans
+
+
+def _score_spans(spans: List[_Span], pages: Sequence[CrawledPageData], goal: PromptGoal) -> None:
+    texts = [s.text for s in spans]
+    similarity = [0.0] * len(spans)
+    try:
+        from sklearn.feature_extraction.text import TfidfVectorizer
+
+        vectorizer = TfidfVectorizer(stop_words="english", sublinear_tf=True)
+        matrix = vectorizer.fit_transform(texts + [goal.description])
+        # Rows are L2-normalized, so the dot product is the cosine similarity
+        similarity = (matrix[:-1] @ matrix[-1].T).toarray().ravel().tolist()
+    except ValueError:
+        pass  # no scorable vocabulary (e.g. only stopwords): fall back to the priors
+
+    priors = [(re.compile(pattern, re.IGNORECASE), weight) for pattern, weight in goal.keyword_priors.items()]
+    page_priors = [_path_prior(p.url, goal) for p in pages]
+    for span, sim in zip(spans, similarity):
+        keyword_score = sum(weight for pattern, weight in priors if pattern.search(span.text))
+        lead_bonus = 0.5 if span.position < 3 else 0.0
+        span.score = 4.0 * sim + keyword_score + page_priors[span.page] + lead_bonus
+
+
+def _page_header(page: CrawledPageData, include_meta: bool, max_headings: Optional[int] = MAX_HEADINGS) -> str:
+    lines = [f"PAGE: {page.title or ''} ({page.url})"]
+    if include_meta:
+        lines.append(f"Meta: {page.meta_description or ''}")
+    lines.append(f"Headings: {', '.join(page.headings[:max_headings])}")
+    return "\n".join(lines)
+
+
+def select_page_content(crawled: CrawledWebsiteData, goal: PromptGoal, token_budget: int,
+                        include_meta: bool = True) -> Tuple[List[str], Dict[str, int]]:
+    """
+    Pack the most relevant spans of every page into `token_budget` tokens.
+
+    Returns the per-page prompt sections, in crawl order, and stats
+    (tokens before/after, spans kept/total). When the whole crawl already
+    fits the budget, every page is returned unchanged.
+    """
+    pages = crawled.pages
+    full_headers = [_page_header(p, include_meta, max_headings=None) for p in pages]
+    full_tokens = sum(estimate_tokens(h) + estimate_tokens(p.content) for h, p in zip(full_headers, pages))
+    if full_tokens <= token_budget:
+        sections = [f"{header}\nContent: {p.content}\n" for header, p in zip(full_headers, pages)]
+        return sections, {"tokens_before": full_tokens, "tokens_after": full_tokens, "spans_total": 0, "spans_kept": 0}
+
+    headers = [_page_header(p, include_meta) for p in pages]
+    used = sum(estimate_tokens(h) for h in headers)
+    spans = _collect_spans(pages)
+    if spans:
+        _score_spans(spans, pages, goal)
+
+    chosen: List[_Span] = []
+    for span in sorted(spans, key=lambda s: s.score, reverse=True):
+        if used + span.tokens > token_budget:
+            continue  # a shorter, lower-ranked span may still fit
+        chosen.append(span)
+        used += span.tokens
+
+    by_page: Dict[int, List[_Span]] = {}
+    for span in sorted(chosen, key=lambda s: (s.page, s.position)):
+        by_page.setdefault(span.page, []).append(span)
+    sections = [
+        f"{header}\nContent: {' '.join(s.text for s in by_page.get(i, []))}\n"
+        for i, header in enumerate(headers)
+    ]
+    stats = {
+        "tokens_before": full_tokens,
+        "tokens_after": used,
+        "spans_total": len(spans),
+        "spans_kept": len(chosen),
+    }
+    return sections, stats
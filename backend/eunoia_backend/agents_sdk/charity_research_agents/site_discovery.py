@@ -0,0 +1,222 @@
+"""
+robots.txt and sitemap discovery for the charity website crawler.
+
+Before following links, the crawler reads the site's robots.txt (Disallow
+rules, Crawl-delay, Sitemap lines) and its sitemaps - falling back to
+/sitemap.xml - so deep program pages can be seeded straight into the
+frontier instead of costing several hops of anchor parsing. Sitemap URLs are
+ranked with the same path priors as links (frontier.score_link) plus a bonus
+for a recent <lastmod>.
+
+robots.txt follows RFC 9309: a missing or forbidden (4xx) file allows
+everything, while a server error (5xx, 429) or an unreachable server means
+complete disallow. That verdict is cached for ROBOTS_ERROR_TTL seconds so
+retried crawls of a failing site do not hammer it.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import html
+import re
+import time
+import zlib
+from dataclasses import dataclass, field
+from datetime import datetime, timezone as dt_timezone
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urljoin
+from urllib.robotparser import RobotFileParser
+
+import httpx
+from django.conf import settings
+
+from .crawl_governor import get_crawl_governor
+from .frontier import canonicalize_url, score_link, site_host as host_of
+
+SITEMAP_ENTRY_RE = re.compile(r"<(url|sitemap)\b[^>]*>(.*?)</\1\s*>", re.IGNORECASE | re.DOTALL)
+LOC_RE = re.compile(r"<loc>\s*(?:<!\[CDATA\[)?\s*(.*?)\s*(?:\]\]>)?\s*</loc>", re.IGNORECASE | re.DOTALL)
+LASTMOD_RE = re.compile(r"<lastmod>\s*(.*?)\s*</lastmod>", re.IGNORECASE | re.DOTALL)
+
+MAX_SITEMAP_BYTES = 10 * 1024 * 1024
+MAX_CHILD_SITEMAPS = 5
+MAX_SITEMAP_URLS = 5000
+RECENCY_WINDOW_DAYS = 365
+RECENCY_BONUS = 1.0
+ROBOTS_ERROR_TTL = 300  # seconds a host stays disallowed after its robots.txt failed with a server error
+
+# host -> monotonic time its disallow-all verdict expires
+_robots_errors: Dict[str, float] = {}
+
+
+@dataclass
+class SiteRules:
+    """What robots.txt allows for our user agent, plus the sitemaps it lists."""
+    parser: Optional[RobotFileParser] = None
+    user_agent: str = '*'
+    crawl_delay: float = 0.0
+    sitemaps: List[str] = field(default_factory=list)
+    disallow_all: bool = False
+
+    def can_fetch(self, url: str) -> bool:
+        if self.disallow_all:
+            return False
+        return self.parser is None or self.parser.can_fetch(self.user_agent, url)
+
+
+async def _get(client: httpx.AsyncClient, url: str) -> Optional[httpx.Response]:
+    try:
+        return await get_crawl_governor().get(client, url)
+    except Exception:
+        return None
+
+
+def _crawl_delay(robots_text: str, user_agent: str) -> float:
+    """
+    Crawl-delay for `user_agent`: its own group first, then the '*' group.
+
+    Parsed here because RobotFileParser only accepts whole seconds, and
+    fractional delays ("Crawl-delay: 0.5") are common.
+    """
+    groups: List[Tuple[List[str], Optional[float]]] = []
+    agents: List[str] = []
+    delay: Optional[float] = None
+    in_rules = False
+    for raw_line in robots_text.splitlines():
+        line = raw_line.split('#', 1)[0].strip()
+        if ':' not in line:
+            continue
+        key, value = (part.strip() for part in line.split(':', 1))
+        key = key.lower()
+        if key == 'user-agent':
+            if in_rules:
+                groups.append((agents, delay))
+                agents, delay, in_rules = [], None, False
+            agents.append(value.lower())
+        else:
+            in_rules = True
+            if key == 'crawl-delay':
+                try:
+                    delay = float(value)
+                except ValueError:
+                    pass
+    groups.append((agents, delay))
+
+    name = user_agent.lower()
+    for wildcard in (False, True):
+        for group_agents, group_delay in groups:
+            matches = '*' in group_agents if wildcard else any(a != '*' and a in name for a in group_agents)
+            if matches and group_delay is not None:
+                return max(0.0, group_delay)
+    return 0.0
+
+
+async def fetch_site_rules(client: httpx.AsyncClient, root_url: str) -> SiteRules:
+    user_agent = getattr(settings, 'CRAWL_ROBOTS_USER_AGENT', 'EunoiaBot')
+    host = host_of(root_url)
+    now = time.monotonic()
+    if _robots_errors.get(host, 0.0) > now:
+        return SiteRules(user_agent=user_agent, disallow_all=True)
+    resp = await _get(client, urljoin(root_url, '/robots.txt'))
+    if resp is not None and 400 <= resp.status_code < 500 and resp.status_code != 429:
+        return SiteRules(user_agent=user_agent)  # no robots.txt: everything is allowed
+    if resp is None or resp.status_code != 200:
+        print(f"robots.txt for {host} is unavailable "
+              f"({resp.status_code if resp is not None else 'unreachable'}); not crawling it for {ROBOTS_ERROR_TTL}s.")
+        if len(_robots_errors) > 1000:
+            for expired in [h for h, until in _robots_errors.items() if until <= now]:
+                del _robots_errors[expired]
+        _robots_errors[host] = now + ROBOTS_ERROR_TTL
+        return SiteRules(user_agent=user_agent, disallow_all=True)
+    _robots_errors.pop(host, None)
+
+    parser = RobotFileParser()
+    parser.parse(resp.text.splitlines())
+    delay = _crawl_delay(resp.text, user_agent)
+    if not delay:
+        rate = parser.request_rate(user_agent)
+        delay = rate.seconds / rate.requests if rate and rate.requests else 0
+    max_delay = getattr(settings, 'CRAWL_MAX_CRAWL_DELAY', 10)
+    return SiteRules(
+        parser=parser,
+        user_agent=user_agent,
+        crawl_delay=min(float(delay), max_delay),
+        sitemaps=list(parser.site_maps() or []),
+    )
+
+
+def _parse_lastmod(value: str) -> Optional[datetime]:
+    try:
+        parsed = datetime.fromisoformat(value.strip().replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=dt_timezone.utc)
+
+
+def parse_sitemap(body: bytes) -> Tuple[List[Tuple[str, Optional[datetime]]], List[Tuple[str, Optional[datetime]]]]:
+    """
+    Parse a sitemap or sitemap index into ([(page url, lastmod)], [(child sitemap url, lastmod)]).
+
+    Regex-based rather than an XML parser: tolerant of the malformed sitemaps
+    plugins produce, and never expands entities.
+    """
+    if body[:2] == b'\x1f\x8b':
+        # .xml.gz sitemaps; bounded so a compression bomb cannot exhaust memory
+        body = zlib.decompressobj(16 + zlib.MAX_WBITS).decompress(body, MAX_SITEMAP_BYTES)
+    text = body.decode('utf-8', errors='replace')
+    pages: List[Tuple[str, Optional[datetime]]] = []
+    children: List[Tuple[str, Optional[datetime]]] = []
+    for match in SITEMAP_ENTRY_RE.finditer(text):
+        loc = LOC_RE.search(match.group(2))
+        if not loc:
+            continue
+        lastmod = LASTMOD_RE.search(match.group(2))
+        entry = (html.unescape(loc.group(1)), _parse_lastmod(lastmod.group(1)) if lastmod else None)
+        (children if match.group(1).lower() == 'sitemap' else pages).append(entry)
+        if len(pages) >= MAX_SITEMAP_URLS:
+            break
+    return pages, children
+
+
+def _recency_bonus(lastmod: Optional[datetime], now: datetime) -> float:
+    if lastmod is None:
+        return 0.0
+    age_days = max(0.0, (now - lastmod).total_seconds() / 86400)
+    return RECENCY_BONUS * max(0.0, 1.0 - age_days / RECENCY_WINDOW_DAYS)
+
+
+async def discover_sitemap_pages(client: httpx.AsyncClient, root_url: str, rules: SiteRules,
+                                 site_host: str) -> List[Tuple[str, float]]:
+    """
+    Candidate pages from the site's sitemaps as (canonical url, score), best first.
+
+    Sitemap indexes are followed one level down, into at most
+    MAX_CHILD_SITEMAPS children, preferring page/program sitemaps and recent ones.
+    """
+    if rules.disallow_all:
+        return []
+    sitemap_urls = rules.sitemaps or [urljoin(root_url, '/sitemap.xml')]
+    now = datetime.now(dt_timezone.utc)
+    entries: List[Tuple[str, Optional[datetime]]] = []
+    children: List[Tuple[str, Optional[datetime]]] = []
+    for resp in await asyncio.gather(*(_get(client, u) for u in sitemap_urls[:MAX_CHILD_SITEMAPS])):
+        if resp is not None and resp.status_code == 200:
+            pages, nested = parse_sitemap(resp.content[:MAX_SITEMAP_BYTES])
+            entries.extend(pages)
+            children.extend(nested)
+
+    if children:
+        children.sort(key=lambda c: score_link(c[0].lower()) + _recency_bonus(c[1], now), reverse=True)
+        chosen = [u for u, _ in children[:MAX_CHILD_SITEMAPS] if rules.can_fetch(u)]
+        for resp in await asyncio.gather(*(_get(client, u) for u in chosen)):
+            if resp is not None and resp.status_code == 200:
+                entries.extend(parse_sitemap(resp.content[:MAX_SITEMAP_BYTES])[0])
+
+    candidates = {}
+    for loc, lastmod in entries[:MAX_SITEMAP_URLS]:
+        canonical = canonicalize_url(loc)
+        if not canonical or host_of(canonical) != site_host or not rules.can_fetch(canonical):
+            continue
+        score = score_link(canonical) + _recency_bonus(lastmod, now)
+        if score > candidates.get(canonical, float('-inf')):
+            candidates[canonical] = score
+    return sorted(candidates.items(), key=lambda item: item[1], reverse=True)
@@ -1,12 +1,22 @@
 from __future__ import annotations
 
-from typing import List, Optional, Set
+import asyncio
+import weakref
+from typing import Dict, List, Optional, Tuple
 from urllib.parse import urlparse, urljoin
 
+import httpx
+from asgiref.sync import sync_to_async
+from django.conf import settings
 from pydantic import BaseModel
-import requests
 from bs4 import BeautifulSoup
 
+from main.openai_client import HTTP2_AVAILABLE
+from . import crawl_cache
+from .crawl_governor import get_crawl_governor
+from .frontier import CrawlFrontier, canonicalize_url, score_link, site_host
+from .site_discovery import SiteRules, discover_sitemap_pages, fetch_site_rules
+
 
 class CrawledPageData(BaseModel):
     url: str
@@ -24,23 +34,12 @@ class CrawledWebsiteData(BaseModel):
     crawl_method: str = "requests"
 
 
-def _is_same_domain(base_netloc: str, link_url: str) -> bool:
-    try:
-        parsed = urlparse(link_url)
-        if not parsed.netloc:
-            return True  # relative URL
-        return parsed.netloc == base_netloc
-    except Exception:
-        return False
-
-
 def _clean_text(text: str, max_len: int = 8000) -> str:
     cleaned = " ".join(text.split())
     return cleaned[:max_len]
 
 
-def _extract_page_data(url: str, html: str) -> CrawledPageData:
-    soup = BeautifulSoup(html, 'html.parser')
+def _extract_page_data(url: str, soup: BeautifulSoup) -> CrawledPageData:
     title_tag = soup.find('title')
     title = title_tag.text.strip() if title_tag else None
     meta_desc_tag = soup.find('meta', attrs={'name': 'description'})
@@ -53,57 +52,172 @@ def _extract_page_data(url: str, html: str) -> CrawledPageData:
     return CrawledPageData(url=url, title=title, meta_description=meta_description, headings=headings, content=content)
 
 
-def _fetch_url(url: str, timeout: int = 10) -> Optional[str]:
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0 Safari/537.36',
-        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,*/*;q=0.8',
-        'Accept-Language': 'en-US,en;q=0.9'
-    }
+def _parse_page(url: str, html: str, crawl_host: str) -> Tuple[CrawledPageData, List[Tuple[str, float]]]:
+    """Parse a page once: its extracted data plus the canonical in-site links to follow, with their priority."""
+    soup = BeautifulSoup(html, 'html.parser')
+    links: List[Tuple[str, float]] = []
+    for a in soup.find_all('a', href=True):
+        href = a['href'].strip()
+        if href.startswith('#') or href.startswith('mailto:') or href.startswith('tel:'):
+            continue
+        canonical = canonicalize_url(urljoin(url, href))
+        if canonical and site_host(canonical) == crawl_host:
+            links.append((canonical, score_link(canonical, a.get_text(" ", strip=True))))
+    return _extract_page_data(url, soup), links
+
+
+def crawl_user_agent() -> str:
+    """
+    User-Agent sent by the crawler. It starts with the same product token that
+    robots.txt rules are evaluated for (CRAWL_ROBOTS_USER_AGENT), so a site's
+    rules for our bot apply to our actual traffic.
+    """
+    token = getattr(settings, 'CRAWL_ROBOTS_USER_AGENT', 'EunoiaBot')
+    contact = getattr(settings, 'CRAWL_CONTACT_URL', '')
+    return f"{token}/1.0 (+{contact})" if contact else f"{token}/1.0 (charity research crawler)"
+
+
+async def _apply_crawl_user_agent(request: httpx.Request) -> None:
+    # Set per request rather than at import, so settings overrides and env changes take effect
+    request.headers['User-Agent'] = crawl_user_agent()
+
+
+CRAWL_HEADERS = {
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,*/*;q=0.8',
+    'Accept-Language': 'en-US,en;q=0.9'
+}
+
+# httpx clients are bound to the event loop they were first used on
+_crawl_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+
+
+def get_crawl_client() -> httpx.AsyncClient:
+    """
+    Shared pooled client for crawling, one per event loop.
+
+    Keep-alive connections (HTTP/2 when h2 is installed) are reused across
+    pages and crawls of the same site, so DNS lookups and TLS handshakes are
+    paid once per host rather than once per page.
+    """
+    loop = asyncio.get_running_loop()
+    client = _crawl_clients.get(loop)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(
+            headers=CRAWL_HEADERS,
+            event_hooks={'request': [_apply_crawl_user_agent]},
+            follow_redirects=True,
+            http2=HTTP2_AVAILABLE,
+            limits=httpx.Limits(
+                max_connections=getattr(settings, 'CRAWL_MAX_CONNECTIONS', 50),
+                max_keepalive_connections=getattr(settings, 'CRAWL_MAX_KEEPALIVE_CONNECTIONS', 20),
+                keepalive_expiry=30,
+            ),
+            timeout=httpx.Timeout(getattr(settings, 'CRAWL_TIMEOUT', 10), connect=5),
+        )
+        _crawl_clients[loop] = client
+    return client
+
+
+async def _fetch_url(url: str) -> Optional[str]:
+    """
+    GET a canonical URL through the crawl governor, revalidating against the
+    crawl cache: a 304 reuses the stored body.
+    """
+    use_cache = crawl_cache.is_enabled()
+    cached = await sync_to_async(crawl_cache.read_cached_page)(url) if use_cache else None
     try:
-        resp = requests.get(url, headers=headers, timeout=timeout)
-        if resp.status_code == 200 and 'text/html' in resp.headers.get('Content-Type', ''):
-            return resp.text
-        return None
+        resp = await get_crawl_governor().get(get_crawl_client(), url, headers=crawl_cache.conditional_headers(cached))
     except Exception:
         return None
-
-
-async def smart_website_crawler(url: str, max_pages: int = 6) -> CrawledWebsiteData:
+    if resp.status_code == 304 and cached is not None:
+        await sync_to_async(crawl_cache.mark_revalidated)(url, cached)
+        return cached.text
+    content_type = resp.headers.get('Content-Type', '')
+    if resp.status_code == 200 and 'text/html' in content_type:
+        text = resp.text
+        if use_cache:
+            await sync_to_async(crawl_cache.store_page)(
+                url, text, content_type, resp.headers.get('ETag', ''), resp.headers.get('Last-Modified', ''),
+                wire_bytes=resp.num_bytes_downloaded,
+            )
+        return text
+    return None
+
+
+async def smart_website_crawler(url: str, max_pages: int = 6, concurrency: Optional[int] = None) -> CrawledWebsiteData:
+    """
+    Crawl `url`'s site best-first, fetching up to `concurrency` frontier URLs at once.
+
+    robots.txt is read first: disallowed URLs are never fetched and its
+    Crawl-delay caps the site's request rate in the process-wide crawl
+    governor (see crawl_governor.py), which also enforces the global
+    concurrency cap, per-domain rate limits and 429/503 backoff. While the start page is fetched, the
+    sitemaps are read and their pages seeded into the frontier (see
+    site_discovery.py); after that the frontier hands out the
+    highest-priority canonical URL (see frontier.py), whether it came from a
+    sitemap or a link. Pages are returned in the order they were scheduled.
+    """
     parsed = urlparse(url)
     base_netloc = parsed.netloc
-    base_root = f"{parsed.scheme}://{parsed.netloc}"
-
-    queue: List[str] = [url]
-    seen: Set[str] = set()
+    start_url = canonicalize_url(url) or url
+    crawl_host = site_host(start_url)
+    concurrency = max(1, concurrency or getattr(settings, 'CRAWL_CONCURRENCY', 4))
+    client = get_crawl_client()
+
+    rules = await fetch_site_rules(client, start_url) if getattr(settings, 'CRAWL_RESPECT_ROBOTS', True) else SiteRules()
+    get_crawl_governor().set_crawl_delay(crawl_host, rules.crawl_delay)
+    discovery: Optional[asyncio.Task] = None
+    if getattr(settings, 'CRAWL_USE_SITEMAPS', True):
+        discovery = asyncio.ensure_future(discover_sitemap_pages(client, start_url, rules, crawl_host))
+
+    frontier = CrawlFrontier()
+    frontier.push(start_url, float('inf'))
+    order: Dict[str, int] = {}
     pages: List[CrawledPageData] = []
+    in_flight: Dict[asyncio.Task, str] = {}
 
-    while queue and len(pages) < max_pages:
-        current = queue.pop(0)
-        if current in seen:
-            continue
-        seen.add(current)
-
-        html = _fetch_url(current)
-        if not html:
-            continue
-        page_data = _extract_page_data(current, html)
-        pages.append(page_data)
-
-        soup = BeautifulSoup(html, 'html.parser')
-        for a in soup.find_all('a', href=True):
-            href = a['href'].strip()
-            if href.startswith('#') or href.startswith('mailto:') or href.startswith('tel:'):
-                continue
-            absolute = urljoin(current, href)
-            if _is_same_domain(base_netloc, absolute) and absolute.startswith(base_root):
-                if absolute not in seen and absolute not in queue:
-                    queue.append(absolute)
-
+    try:
+        while (frontier or in_flight or discovery) and len(pages) < max_pages:
+            # Never have more fetches outstanding than pages still needed. Until the
+            # sitemaps are in, only the start page goes out, so they can outrank its links.
+            while (frontier and len(in_flight) < concurrency and len(pages) + len(in_flight) < max_pages
+                   and (discovery is None or not order)):
+                current = frontier.pop()
+                if current is None or not rules.can_fetch(current):
+                    continue
+                order[current] = len(order)
+                in_flight[asyncio.ensure_future(_fetch_url(current))] = current
+            waiting = set(in_flight) | ({discovery} if discovery is not None else set())
+            if not waiting:
+                break
+            done, _ = await asyncio.wait(waiting, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task is discovery:
+                    discovery = None
+                    candidates = task.result() if not task.cancelled() and task.exception() is None else []
+                    for link, score in candidates:
+                        frontier.push(link, score)
+                    continue
+                current = in_flight.pop(task)
+                html = task.result()
+                if not html or len(pages) >= max_pages:
+                    continue
+                # HTML parsing is CPU-bound: keep it off the loop shared with the OpenAI calls
+                page_data, links = await asyncio.to_thread(_parse_page, current, html, crawl_host)
+                pages.append(page_data)
+                for link, score in links:
+                    frontier.push(link, score)
+    finally:
+        for task in in_flight:
+            task.cancel()
+        if discovery is not None:
+            discovery.cancel()
+
+    pages.sort(key=lambda p: order[p.url])
     return CrawledWebsiteData(
         domain=base_netloc,
         main_url=url,
         pages=pages,
         total_pages_crawled=len(pages),
+        crawl_method="httpx",
     )
-
-
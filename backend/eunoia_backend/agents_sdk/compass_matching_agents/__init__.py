@@ -1,7 +1,8 @@
-from .manager import match_top_movements_sync
+from .manager import match_top_movements, match_top_movements_sync
 from .selector_agent import movement_selector_agent, CompassRecommendation, CompassRecommendationList
 
 __all__ = [
+    'match_top_movements',
     'match_top_movements_sync',
     'CompassRecommendation',
     'CompassRecommendationList',
@@ -1,15 +1,16 @@
 from __future__ import annotations
 
-import asyncio
 from typing import Any, Dict, List, Tuple
 
-import numpy as np
 from asgiref.sync import sync_to_async
 
 from agents import Runner
 from .selector_agent import movement_selector_agent, CompassRecommendationList
 from main.models import Movement, Charity
-from main.utils import get_embedding
+from main.openai_client import run_sync
+from main.utils import get_query_embedding
+from main.local_embeddings import get_local_movement_index, resolve_backend
+from main.vector_index import get_movement_index
 
 
 def _group_matches_by_charity(matches: List[Tuple[Movement, float]]) -> Dict[str, Dict[str, Any]]:
@@ -32,41 +33,33 @@ def _group_matches_by_charity(matches: List[Tuple[Movement, float]]) -> Dict[str
 
 
 async def _match_top_movements_async(query: str, top_k: int = 10) -> Dict[str, Any]:
-    query_emb = await sync_to_async(get_embedding)(query)
-    if not query_emb:
+    backend = resolve_backend('COMPASS_EMBEDDING_BACKEND')
+    if backend == 'local':
+        # In-process, but loading the model and the TF-IDF/SVD transform are CPU-bound: keep them off the shared loop
+        query_emb = await sync_to_async(get_query_embedding, thread_sensitive=False)(query, backend='local')
+    else:
+        query_emb = await sync_to_async(get_query_embedding)(query)
+    if query_emb is None:
         return {
             'query': query,
             'grouped_matches': {},
             'raw_matches': [],
         }
 
-    # Fetch active movements with embeddings
-    # Evaluate queryset with related charity eagerly loaded to avoid DB hits in async context
-    def _load_movements():
-        return list(
-            Movement.objects
-            .filter(is_active=True, embedding__isnull=False)
-            .select_related('charity')
-        )
-    movements = await sync_to_async(_load_movements)()
-    valid: List[Movement] = []
-    all_embeddings: List[List[float]] = []
-    for m in movements:
-        if isinstance(m.embedding, list) and len(m.embedding) > 0 and all(isinstance(v, (int, float)) for v in m.embedding):
-            valid.append(m)
-            all_embeddings.append(m.embedding)
-
-    if not valid:
+    # Score against the resident movement index (exact below COMPASS_ANN_MIN_SIZE, IVF above),
+    # then load only the winning movements with their charity eagerly for the async context
+    movement_index = await sync_to_async(get_local_movement_index if backend == 'local' else get_movement_index)()
+    if movement_index is None:
+        # The local model disappeared between resolve_backend() and here
+        return {'query': query, 'grouped_matches': {}, 'raw_matches': []}
+    top = movement_index.search(query_emb, top_k=top_k)
+    if not top:
         return {'query': query, 'grouped_matches': {}, 'raw_matches': []}
 
-    query_np = np.array(query_emb).reshape(1, -1)
-    mov_np = np.array(all_embeddings)
-    sims = (query_np @ mov_np.T) / (np.linalg.norm(query_np) * np.linalg.norm(mov_np, axis=1))
-    sims = sims.flatten()
-
-    k = min(top_k, len(valid))
-    top_idx = np.argsort(sims)[-k:][::-1]
-    matches = [(valid[i], float(sims[i])) for i in top_idx]
+    def _load_movements(ids: List[int]) -> Dict[int, Movement]:
+        return Movement.objects.select_related('charity').filter(is_active=True).in_bulk(ids)
+    movements_by_id = await sync_to_async(_load_movements)([movement_id for movement_id, _ in top])
+    matches = [(movements_by_id[movement_id], score) for movement_id, score in top if movement_id in movements_by_id]
     grouped = _group_matches_by_charity(matches)
 
     return {
@@ -99,10 +92,7 @@ async def match_top_movements(query: str, top_k: int = 10) -> Dict[str, Any]:
 
 
 def match_top_movements_sync(query: str, top_k: int = 10) -> Dict[str, Any]:
-    loop = asyncio.new_event_loop()
-    try:
-        return loop.run_until_complete(match_top_movements(query, top_k))
-    finally:
-        loop.close()
+    # Runs on the shared OpenAI event loop so the agent reuses its pooled connections
+    return run_sync(match_top_movements(query, top_k))
 
 
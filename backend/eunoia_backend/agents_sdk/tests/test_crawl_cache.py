@@ -0,0 +1,69 @@
+from unittest import mock
+
+import httpx
+from asgiref.sync import sync_to_async
+from django.test import TestCase, override_settings
+
+from agents_sdk.charity_research_agents import crawl_cache
+from main.models import CrawlCache
+
+from .test_crawler import FakeSite, html_page
+
+
+class RevalidatingSite(FakeSite):
+    """Answers 304 when the request's If-None-Match matches the page's ETag."""
+
+    def __init__(self, pages, etags):
+        super().__init__(pages)
+        self.etags = etags
+
+    def respond(self, request):
+        etag = self.etags.get(request.url.path)
+        if etag and request.headers.get('If-None-Match') == etag:
+            return httpx.Response(304, headers={'ETag': etag})
+        response = super().respond(request)
+        if etag and response.status_code == 200:
+            response.headers['ETag'] = etag
+        return response
+
+
+@override_settings(CRAWL_CACHE_ENABLED=True, CRAWL_RESPECT_ROBOTS=False, CRAWL_USE_SITEMAPS=False)
+class CrawlCacheTests(TestCase):
+    def setUp(self):
+        patcher = mock.patch.dict(crawl_cache._counters, {'hits': 0, 'misses': 0, 'bytes_fetched': 0, 'bytes_reused': 0})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def test_unchanged_pages_are_revalidated_and_reused(self):
+        pages = {'/': html_page("Home", "Clean water.", [("/about", "About")]), '/about': html_page("About")}
+        site = RevalidatingSite(pages, etags={'/': '"v1"', '/about': '"v1"'})
+        first = await site.acrawl(max_pages=2)
+        self.assertEqual(await CrawlCache.objects.acount(), 2)
+        self.assertNotIn('If-None-Match', site.requests[0].headers)
+
+        site.requests.clear()
+        second = await site.acrawl(max_pages=2)
+        self.assertEqual([r.headers['If-None-Match'] for r in site.requests], ['"v1"', '"v1"'])
+        self.assertEqual(second.pages, first.pages)  # parsed from the stored bodies
+        stats = crawl_cache.crawl_cache_stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['hit_rate']), (2, 2, 0.5))
+        self.assertGreater(stats['bytes_reused'], 0)
+
+    async def test_changed_pages_replace_the_stored_body(self):
+        site = RevalidatingSite({'/': html_page("Old")}, etags={'/': '"v1"'})
+        await site.acrawl(max_pages=1)
+        site.pages['/'] = html_page("New")
+        site.etags['/'] = '"v2"'
+        crawled = await site.acrawl(max_pages=1)
+        self.assertEqual(crawled.pages[0].title, "New")
+        row = await CrawlCache.objects.aget(url="https://example.org/")
+        self.assertEqual(row.etag, '"v2"')
+        cached = await sync_to_async(crawl_cache.read_cached_page)("https://example.org/")
+        self.assertIn("<title>New</title>", cached.text)
+
+    def test_conditional_headers(self):
+        cached = crawl_cache.CachedPage(text="x", etag='"a"', last_modified="Mon, 01 Jan 2024 00:00:00 GMT",
+                                        content_hash="h")
+        self.assertEqual(crawl_cache.conditional_headers(cached),
+                         {'If-None-Match': '"a"', 'If-Modified-Since': "Mon, 01 Jan 2024 00:00:00 GMT"})
+        self.assertEqual(crawl_cache.conditional_headers(None), {})
@@ -0,0 +1,147 @@
+import asyncio
+from unittest import mock
+
+import httpx
+from django.test import SimpleTestCase
+
+from agents_sdk.charity_research_agents import crawl_governor
+from agents_sdk.charity_research_agents.crawl_governor import CrawlGovernor
+
+
+class FakeClock:
+    """A monotonic clock that only moves when the governor sleeps, recording each wait.
+
+    `on_sleep` runs once, after the first sleep, to simulate another request's response arriving meanwhile.
+    """
+
+    def __init__(self):
+        self.now = 0.0
+        self.waits = []
+        self.on_sleep = None
+
+    def __call__(self):
+        return self.now
+
+    async def sleep(self, seconds):
+        self.waits.append(seconds)
+        self.now += seconds
+        if self.on_sleep is not None:
+            callback, self.on_sleep = self.on_sleep, None
+            callback()
+        await asyncio.sleep(0)
+
+
+class CrawlGovernorTests(SimpleTestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+
+    def governor(self, **kwargs):
+        return CrawlGovernor(clock=self.clock, sleep=self.clock.sleep, **kwargs)
+
+    def requests(self, governor, host, count):
+        async def run():
+            for _ in range(count):
+                async with governor.slot(host):
+                    pass
+        self.clock.waits = []
+        asyncio.run(run())
+        return self.clock.waits
+
+    def assertWaits(self, waits, expected):
+        self.assertEqual(len(waits), len(expected), waits)
+        for wait, value in zip(waits, expected):
+            self.assertAlmostEqual(wait, value)
+
+    def test_burst_then_domain_rate(self):
+        governor = self.governor(domain_rate=20.0, domain_burst=2.0)
+        self.assertWaits(self.requests(governor, "example.org", 2), [])
+        self.assertWaits(self.requests(governor, "example.org", 4), [0.05] * 4)  # bucket empty: one per 1/20 s
+        self.assertWaits(self.requests(governor, "example.com", 2), [])  # other hosts have their own bucket
+        stats = governor.stats()
+        self.assertEqual(stats['requests'], 8)
+        self.assertAlmostEqual(stats['waited_seconds'], 0.2)
+
+    def test_crawl_delay_caps_rate_and_burst(self):
+        governor = self.governor(domain_rate=100.0, domain_burst=10.0)
+        governor.set_crawl_delay("example.org", 0.5)
+        governor.set_crawl_delay("example.org", 0)  # ignored
+        self.assertWaits(self.requests(governor, "example.org", 3), [0.5, 0.5])
+
+    def test_throttle_pauses_host_and_halves_rate(self):
+        governor = self.governor(domain_rate=50.0, domain_burst=5.0, max_backoff=1.0)
+        self.assertEqual(governor.report("example.org", 429, retry_after="0.2"), 0.2)
+        self.assertEqual(governor.stats()['backed_off_hosts'], 1)
+        # One request when the pause ends, then the next at the halved rate (25/s)
+        self.assertWaits(self.requests(governor, "example.org", 2), [0.2, 0.04])
+
+        self.assertIsNone(governor.report("example.org", 200))
+        self.assertAlmostEqual(governor._buckets["example.org"].rate, 30.0)  # recovers a step per success
+
+        self.assertEqual(governor.report("example.org", 503, retry_after="120"), 120.0)  # caller gives up
+        self.assertAlmostEqual(governor._pause_remaining("example.org"), 1.0)  # applied capped at max_backoff
+
+    def test_backoff_without_retry_after_doubles_per_strike(self):
+        governor = self.governor(max_backoff=60.0)
+        with mock.patch.object(crawl_governor.random, 'uniform', return_value=1.0):
+            pauses = [governor.report("example.org", 429) for _ in range(3)]
+        self.assertEqual(pauses, [1.0, 2.0, 4.0])
+        governor.report("example.org", 200)
+        with mock.patch.object(crawl_governor.random, 'uniform', return_value=1.0):
+            self.assertEqual(governor.report("example.org", 429), 1.0)  # a success resets the strikes
+
+    def test_pause_reported_while_waiting_extends_the_wait(self):
+        governor = self.governor(domain_rate=1.0, domain_burst=1.0)
+        self.clock.on_sleep = lambda: governor.report("example.org", 429, retry_after="3")
+        self.assertWaits(self.requests(governor, "example.org", 2), [1.0, 3.0])
+
+    def test_get_retries_throttled_responses_after_the_pause(self):
+        governor = self.governor(domain_rate=2.0, domain_burst=4.0, max_backoff=60.0)
+        responses = [httpx.Response(429, headers={'Retry-After': '0.5'}), httpx.Response(200)]
+        client = httpx.AsyncClient(transport=httpx.MockTransport(lambda request: responses.pop(0)))
+        resp = asyncio.run(governor.get(client, "https://example.org/", max_retries=2))
+        self.assertEqual(resp.status_code, 200)
+        self.assertWaits(self.clock.waits, [0.5])
+        self.assertEqual(governor.stats()['throttled'], 1)
+
+    def test_get_gives_up_when_asked_to_wait_longer_than_max_backoff(self):
+        governor = self.governor(max_backoff=60.0)
+        calls = []
+
+        def handler(request):
+            calls.append(request)
+            return httpx.Response(503, headers={'Retry-After': '120'})
+
+        client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        resp = asyncio.run(governor.get(client, "https://example.org/", max_retries=2))
+        self.assertEqual(resp.status_code, 503)
+        self.assertEqual(len(calls), 1)
+        self.assertWaits(self.clock.waits, [])
+
+    def test_global_concurrency_cap(self):
+        governor = self.governor(max_concurrency=2, domain_rate=1000.0, domain_burst=1000.0)
+
+        async def run():
+            release = asyncio.Event()
+            peak = 0
+
+            async def request(host):
+                nonlocal peak
+                async with governor.slot(host):
+                    peak = max(peak, governor.stats()['active'])
+                    await release.wait()
+
+            tasks = [asyncio.ensure_future(request(f"site{i}.org")) for i in range(5)]
+            for _ in range(5):
+                await asyncio.sleep(0)
+            stats = governor.stats()
+            self.assertEqual((stats['active'], stats['waiting']), (2, 3))
+
+            tasks[-1].cancel()  # a cancelled waiter leaves the queue without taking a slot
+            release.set()
+            results = await asyncio.gather(*tasks, return_exceptions=True)
+            self.assertIsInstance(results[-1], asyncio.CancelledError)
+            return peak
+
+        self.assertEqual(asyncio.run(run()), 2)
+        stats = governor.stats()
+        self.assertEqual((stats['active'], stats['waiting'], stats['requests']), (0, 0, 4))
@@ -0,0 +1,100 @@
+import asyncio
+from unittest import mock
+
+import httpx
+from django.test import SimpleTestCase, override_settings
+
+from agents_sdk.charity_research_agents import site_discovery, utils
+from agents_sdk.charity_research_agents.crawl_governor import CrawlGovernor
+
+
+def html_page(title, body="", links=()):
+    anchors = "".join(f'<a href="{href}">{text}</a>' for href, text in links)
+    return f"<html><head><title>{title}</title></head><body><h1>{title}</h1><p>{body}</p>{anchors}</body></html>"
+
+
+class FakeSite:
+    """Serves `pages` ({path: html}) through httpx.MockTransport, recording each request."""
+
+    def __init__(self, pages, delay=0.0):
+        self.pages = pages
+        self.delay = delay
+        self.requests = []
+        self.active = self.peak = 0
+
+    async def handle(self, request):
+        self.requests.append(request)
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        try:
+            await asyncio.sleep(self.delay)
+            return self.respond(request)
+        finally:
+            self.active -= 1
+
+    def respond(self, request):
+        body = self.pages.get(request.url.path)
+        if body is None:
+            return httpx.Response(404, text="not found")
+        if isinstance(body, httpx.Response):
+            return body
+        return httpx.Response(200, text=body, headers={'Content-Type': 'text/html; charset=utf-8'})
+
+    def paths(self):
+        return [request.url.path for request in self.requests]
+
+    async def acrawl(self, url="https://example.org/", **kwargs):
+        # The production client, with only its network transport swapped out
+        client = utils.get_crawl_client()
+        client._transport = httpx.MockTransport(self.handle)
+        governor = CrawlGovernor(domain_rate=1000.0, domain_burst=1000.0)
+        with mock.patch.object(utils, 'get_crawl_governor', return_value=governor), \
+                mock.patch.object(site_discovery, 'get_crawl_governor', return_value=governor):
+            return await utils.smart_website_crawler(url, **kwargs)
+
+    def crawl(self, url="https://example.org/", **kwargs):
+        return asyncio.run(self.acrawl(url, **kwargs))
+
+
+@override_settings(CRAWL_CACHE_ENABLED=False, CRAWL_RESPECT_ROBOTS=False, CRAWL_USE_SITEMAPS=False)
+class CrawlerTests(SimpleTestCase):
+    def test_crawls_best_links_first_up_to_max_pages(self):
+        site = FakeSite({
+            '/': html_page("Home", "Welcome.", [("/blog/post-1", "Post"), ("/about", "About us"), ("/report.pdf", "PDF"),
+                                               ("https://elsewhere.org/about", "Partner"), ("/programs", "Our programs")]),
+            '/about': html_page("About", "Our mission is clean water."),
+            '/programs': html_page("Programs", "Wells."),
+            '/blog/post-1': html_page("Post", "News."),
+        })
+        crawled = site.crawl(max_pages=3, concurrency=1)
+        self.assertEqual([p.url for p in crawled.pages],
+                         ["https://example.org/", "https://example.org/about", "https://example.org/programs"])
+        self.assertEqual(site.paths(), ["/", "/about", "/programs"])  # no off-site, PDF or surplus fetches
+        self.assertEqual(crawled.pages[1].title, "About")
+        self.assertIn("Our mission is clean water.", crawled.pages[1].content)
+        self.assertEqual((crawled.total_pages_crawled, crawled.crawl_method), (3, "httpx"))
+
+    def test_fetches_run_concurrently_up_to_the_limit(self):
+        links = [(f"/page-{i}", f"Page {i}") for i in range(6)]
+        pages = {'/': html_page("Home", links=links)}
+        pages.update({path: html_page(text) for path, text in links})
+        site = FakeSite(pages, delay=0.01)
+        crawled = site.crawl(max_pages=7, concurrency=3)
+        self.assertEqual(len(crawled.pages), 7)
+        self.assertEqual(site.peak, 3)
+
+    def test_non_html_and_failed_pages_are_skipped(self):
+        site = FakeSite({
+            '/': html_page("Home", links=[("/data", "Data"), ("/missing", "Missing"), ("/about", "About")]),
+            '/data': httpx.Response(200, json={"a": 1}),
+            '/about': html_page("About"),
+        })
+        crawled = site.crawl(max_pages=5)
+        self.assertEqual([p.title for p in crawled.pages], ["Home", "About"])
+
+    @override_settings(CRAWL_ROBOTS_USER_AGENT='TestBot', CRAWL_CONTACT_URL='https://example.com/bot')
+    def test_requests_carry_the_configured_user_agent(self):
+        site = FakeSite({'/': html_page("Home")})
+        site.crawl(max_pages=1)
+        self.assertEqual(site.requests[0].headers['User-Agent'], "TestBot/1.0 (+https://example.com/bot)")
+        self.assertIn('text/html', site.requests[0].headers['Accept'])
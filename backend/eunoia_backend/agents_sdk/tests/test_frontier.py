@@ -0,0 +1,45 @@
+from django.test import SimpleTestCase
+
+from agents_sdk.charity_research_agents.frontier import CrawlFrontier, canonicalize_url, score_link, site_host
+
+
+class FrontierTests(SimpleTestCase):
+    def test_canonicalize_url(self):
+        cases = {
+            "HTTPS://Example.org:443/About/": "https://example.org/About",
+            "https://example.org//about#team": "https://example.org/about",
+            "https://example.org/about?utm_source=x&b=2&a=1&fbclid=y": "https://example.org/about?a=1&b=2",
+            "http://example.org:8080": "http://example.org:8080/",
+        }
+        for url, expected in cases.items():
+            self.assertEqual(canonicalize_url(url), expected, url)
+        for url in ("mailto:info@example.org", "javascript:void(0)", "https://example.org/report.pdf", "/relative"):
+            self.assertIsNone(canonicalize_url(url), url)
+
+    def test_site_host_ignores_www(self):
+        self.assertEqual(site_host("https://www.example.org/about"), site_host("http://example.org/"))
+
+    def test_score_link_prefers_about_pages_over_archives(self):
+        about = score_link("https://example.org/about")
+        programs = score_link("https://example.org/x", anchor_text="Our programs")
+        tag_page = score_link("https://example.org/tag/news")
+        login = score_link("https://example.org/login")
+        self.assertGreater(about, programs)
+        self.assertGreater(programs, tag_page)
+        self.assertGreater(tag_page, login)
+
+    def test_frontier_pops_by_priority_and_deduplicates(self):
+        frontier = CrawlFrontier()
+        self.assertTrue(frontier.push("https://example.org/blog", 0.0))
+        self.assertTrue(frontier.push("https://example.org/about", 3.0))
+        self.assertTrue(frontier.push("https://example.org/contact", 0.0))
+        self.assertFalse(frontier.push("http://www.example.org/about", 1.0))  # same page, lower score
+        self.assertTrue(frontier.push("https://example.org/contact", 5.0))  # raises priority
+        self.assertEqual(len(frontier), 3)
+
+        popped = [frontier.pop(), frontier.pop(), frontier.pop()]
+        self.assertEqual(popped, [
+            "https://example.org/contact", "https://example.org/about", "https://example.org/blog",
+        ])
+        self.assertIsNone(frontier.pop())
+        self.assertFalse(frontier.push("https://example.org/about", 10.0))  # already fetched
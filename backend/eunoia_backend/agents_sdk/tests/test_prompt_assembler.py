@@ -0,0 +1,68 @@
+from django.test import SimpleTestCase
+
+from agents_sdk.charity_research_agents.prompt_assembler import (
+    MAX_SPAN_CHARS,
+    MIN_SPAN_CHARS,
+    MOVEMENT_GOAL,
+    PROFILE_GOAL,
+    estimate_tokens,
+    select_page_content,
+    split_spans,
+)
+from agents_sdk.charity_research_agents.utils import CrawledPageData, CrawledWebsiteData
+
+
+def crawl(contents):
+    pages = [
+        CrawledPageData(url=f"https://example.org/{path}", title=path.title(), headings=[path], content=content)
+        for path, content in contents.items()
+    ]
+    return CrawledWebsiteData(domain="example.org", main_url="https://example.org", pages=pages,
+                              total_pages_crawled=len(pages))
+
+
+FILLER = " ".join(f"Our shop sells item number {i} with free delivery on weekends." for i in range(80))
+
+
+class PromptAssemblyTests(SimpleTestCase):
+    def test_short_sentences_are_merged_not_dropped(self):
+        spans = split_spans("Founded in 1999. Based in Kenya. CEO: Jane Doe.")
+        self.assertEqual(" ".join(spans), "Founded in 1999. Based in Kenya. CEO: Jane Doe.")
+        self.assertTrue(all(len(span) >= MIN_SPAN_CHARS for span in spans))
+
+    def test_overlong_sentences_break_on_word_boundaries(self):
+        sentence = " ".join(["water"] * 200) + "."
+        spans = split_spans(sentence)
+        self.assertGreater(len(spans), 1)
+        self.assertTrue(all(len(span) <= MAX_SPAN_CHARS for span in spans))
+        self.assertEqual(" ".join(spans), sentence)
+
+    def test_under_budget_passes_pages_through_unchanged(self):
+        sections, stats = select_page_content(
+            crawl({"about": "Founded in 1999. Based in Kenya.", "news": "Short update."}), PROFILE_GOAL, token_budget=10_000)
+        self.assertEqual(len(sections), 2)
+        self.assertIn("Content: Founded in 1999. Based in Kenya.", sections[0])
+        self.assertIn("Content: Short update.", sections[1])
+        self.assertEqual(stats['tokens_before'], stats['tokens_after'])
+        self.assertEqual(stats['spans_total'], 0)
+
+    def test_over_budget_keeps_relevant_spans_within_budget(self):
+        pages = crawl({"about": "Our mission is to provide clean water to rural communities. " + FILLER, "shop": FILLER})
+        budget = 200
+        sections, stats = select_page_content(pages, PROFILE_GOAL, token_budget=budget)
+        self.assertGreater(stats['tokens_before'], budget)
+        self.assertLessEqual(stats['tokens_after'], budget)
+        self.assertLess(stats['spans_kept'], stats['spans_total'])
+        self.assertIn("Our mission is to provide clean water", sections[0])
+        self.assertTrue(all(section.startswith("PAGE: ") for section in sections))
+        self.assertLessEqual(sum(estimate_tokens(s) for s in sections), budget + 20)
+
+    def test_goal_decides_which_spans_survive(self):
+        pages = crawl({
+            "about": "Our mission is to end hunger, founded in 1987 in Nairobi. " + FILLER,
+            "campaigns": "We launched the Wells for Schools campaign in 2023 to reach 40 schools. " + FILLER,
+        })
+        profile, _ = select_page_content(pages, PROFILE_GOAL, token_budget=120)
+        movements, _ = select_page_content(pages, MOVEMENT_GOAL, token_budget=120)
+        self.assertIn("founded in 1987", "".join(profile))
+        self.assertIn("Wells for Schools campaign", "".join(movements))
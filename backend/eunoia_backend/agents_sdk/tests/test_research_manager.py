@@ -0,0 +1,90 @@
+import asyncio
+from types import SimpleNamespace
+from unittest import mock
+
+from django.test import TestCase, override_settings
+
+from agents_sdk.charity_research_agents import manager
+from agents_sdk.charity_research_agents.charity_profile_agent import CharityProfile, charity_profile_agent
+from agents_sdk.charity_research_agents.movement_finder_agent import MovementAnalysisResult, MovementData
+from agents_sdk.charity_research_agents.utils import CrawledPageData, CrawledWebsiteData
+from main.models import Charity, Movement
+
+CRAWL = CrawledWebsiteData(
+    domain="example.org", main_url="https://example.org", total_pages_crawled=1,
+    pages=[CrawledPageData(url="https://example.org/about", title="About", content="We dig wells in Kenya.")],
+)
+PROFILE = CharityProfile(tagline="Water for all", summary="We dig wells in rural Kenya.", keywords=["water"], category="hea")
+MOVEMENTS = MovementAnalysisResult(movements=[MovementData(title="Wells for Schools", summary="Wells at 40 schools.")])
+
+
+class FakeRunner:
+    """Replaces agents.Runner: both stages must be in flight at once before either returns."""
+
+    def __init__(self, movement_behaviour=None):
+        self.started = []
+        self.both_started = asyncio.Event()
+        self.movement_behaviour = movement_behaviour
+
+    async def run(self, agent, agent_input):
+        is_profile = agent is charity_profile_agent
+        self.started.append('profile' if is_profile else 'movements')
+        if len(self.started) == 2:
+            self.both_started.set()
+        await asyncio.wait_for(self.both_started.wait(), timeout=5)
+        if not is_profile and self.movement_behaviour is not None:
+            await self.movement_behaviour()
+        output = PROFILE if is_profile else MOVEMENTS
+        return SimpleNamespace(final_output_as=lambda output_type: output)
+
+
+class ResearchManagerTests(TestCase):
+    def setUp(self):
+        charity = Charity.objects.create(name="Well Done", aptos_wallet_address="0x1", contact_email="a@example.com")
+        Charity.objects.filter(id=charity.id).update(website_url="https://example.org")  # skips the post_save crawl
+        self.charity_id = charity.id
+        for patcher in (
+            mock.patch.object(manager, 'smart_website_crawler', mock.AsyncMock(return_value=CRAWL)),
+            mock.patch.object(manager, 'get_embeddings', side_effect=lambda texts: [[1.0, 0.0]] * len(texts)),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    async def research(self, runner):
+        with mock.patch.object(manager, 'Runner', runner):
+            return await manager.CharityResearchManager().research_charity(self.charity_id)
+
+    async def test_profile_and_movement_stages_run_concurrently(self):
+        result = await self.research(FakeRunner())
+        self.assertTrue(result['success'])
+        self.assertNotIn('partial', result)
+        self.assertEqual(result['movements_found'], 1)
+        self.assertTrue({'crawl', 'profile', 'movements', 'save', 'total'} <= set(result['durations']))
+
+        charity = await Charity.objects.aget(id=self.charity_id)
+        self.assertEqual((charity.tagline, charity.category), ("Water for all", "HEA"))
+        movement = await Movement.objects.aget(charity_id=self.charity_id)
+        self.assertEqual((movement.title, movement.slug), ("Wells for Schools", "wells-for-schools"))
+
+    async def test_failed_movement_stage_still_saves_the_profile(self):
+        async def fail():
+            raise RuntimeError("model overloaded")
+
+        result = await self.research(FakeRunner(movement_behaviour=fail))
+        self.assertTrue(result['success'])
+        self.assertTrue(result['partial'])
+        self.assertEqual(result['errors'], {'movements': "RuntimeError: model overloaded"})
+        self.assertEqual((await Charity.objects.aget(id=self.charity_id)).tagline, "Water for all")
+        self.assertFalse(await Movement.objects.filter(charity_id=self.charity_id).aexists())
+
+    @override_settings(RESEARCH_MOVEMENT_TIMEOUT=0.05)
+    async def test_each_stage_has_its_own_timeout(self):
+        result = await self.research(FakeRunner(movement_behaviour=asyncio.Event().wait))
+        self.assertEqual(result['errors'], {'movements': "timed out after 0.05s"})
+        self.assertEqual(result['movements_found'], 0)
+
+    async def test_both_stages_failing_is_an_error(self):
+        runner = mock.Mock(run=mock.AsyncMock(side_effect=RuntimeError("no key")))
+        result = await self.research(runner)
+        self.assertFalse(result['success'])
+        self.assertEqual(set(result['errors']), {'profile', 'movements'})
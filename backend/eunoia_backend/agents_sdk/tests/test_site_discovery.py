@@ -0,0 +1,107 @@
+import asyncio
+import gzip
+from unittest import mock
+
+import httpx
+from django.test import SimpleTestCase, override_settings
+
+from agents_sdk.charity_research_agents import site_discovery
+from agents_sdk.charity_research_agents.crawl_governor import CrawlGovernor
+from agents_sdk.charity_research_agents.site_discovery import _crawl_delay, fetch_site_rules, parse_sitemap
+
+from .test_crawler import FakeSite, html_page
+
+ROBOTS = """
+User-agent: *
+Disallow: /admin
+Crawl-delay: 2
+
+User-agent: TestBot
+Disallow: /private
+Crawl-delay: 0.5
+
+Sitemap: https://example.org/sitemap_index.xml
+"""
+
+
+def urlset(*paths):
+    entries = "".join(f"<url><loc>https://example.org{path}</loc></url>" for path in paths)
+    return f'<?xml version="1.0"?><urlset>{entries}</urlset>'
+
+
+def xml(body):
+    return httpx.Response(200, text=body, headers={'Content-Type': 'application/xml'})
+
+
+@override_settings(CRAWL_ROBOTS_USER_AGENT='TestBot', CRAWL_CACHE_ENABLED=False)
+class SiteDiscoveryTests(SimpleTestCase):
+    def setUp(self):
+        patcher = mock.patch.dict(site_discovery._robots_errors, clear=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def rules(self, site):
+        async def fetch():
+            client = httpx.AsyncClient(transport=httpx.MockTransport(site.handle))
+            return await fetch_site_rules(client, "https://example.org/")
+
+        with mock.patch.object(site_discovery, 'get_crawl_governor', return_value=CrawlGovernor(max_backoff=0)):
+            return asyncio.run(fetch())
+
+    def test_rules_for_our_bot_token(self):
+        rules = self.rules(FakeSite({'/robots.txt': ROBOTS}))
+        self.assertFalse(rules.can_fetch("https://example.org/private/report"))
+        self.assertTrue(rules.can_fetch("https://example.org/admin"))  # only the '*' group disallows it
+        self.assertEqual(rules.crawl_delay, 0.5)
+        self.assertEqual(rules.sitemaps, ["https://example.org/sitemap_index.xml"])
+
+    def test_crawl_delay_falls_back_to_the_wildcard_group(self):
+        self.assertEqual(_crawl_delay(ROBOTS, "OtherBot"), 2.0)
+        self.assertEqual(_crawl_delay("User-agent: *\nDisallow: /", "TestBot"), 0.0)
+
+    def test_missing_robots_allows_everything(self):
+        for status in (404, 403):
+            rules = self.rules(FakeSite({'/robots.txt': httpx.Response(status)}))
+            self.assertFalse(rules.disallow_all, status)
+            self.assertTrue(rules.can_fetch("https://example.org/anything"))
+
+    def test_server_errors_disallow_the_site_for_a_while(self):
+        site = FakeSite({'/robots.txt': httpx.Response(500)})
+        self.assertTrue(self.rules(site).disallow_all)
+        self.assertTrue(self.rules(site).disallow_all)
+        self.assertEqual(site.paths(), ["/robots.txt"])  # the verdict is cached
+
+        site_discovery._robots_errors["example.org"] = 0.0  # expired
+        site.pages['/robots.txt'] = ROBOTS
+        self.assertFalse(self.rules(site).disallow_all)
+        self.assertNotIn("example.org", site_discovery._robots_errors)
+
+    def test_parse_sitemap_handles_indexes_gzip_and_cdata(self):
+        index = (b'<sitemapindex><sitemap><loc>https://example.org/pages.xml</loc>'
+                 b'<lastmod>2024-05-01</lastmod></sitemap></sitemapindex>')
+        pages, children = parse_sitemap(index)
+        self.assertEqual(pages, [])
+        self.assertEqual(children[0][0], "https://example.org/pages.xml")
+        self.assertEqual(children[0][1].year, 2024)
+
+        body = gzip.compress(b'<urlset><url><loc><![CDATA[https://example.org/a?x=1&amp;y=2]]></loc></url></urlset>')
+        self.assertEqual(parse_sitemap(body)[0], [("https://example.org/a?x=1&y=2", None)])
+
+    def test_crawl_seeds_sitemap_pages_and_respects_robots(self):
+        site = FakeSite({
+            '/robots.txt': ROBOTS,
+            '/sitemap_index.xml': xml('<sitemapindex><sitemap><loc>https://example.org/pages.xml</loc></sitemap></sitemapindex>'),
+            '/pages.xml': xml(urlset("/programs/clean-water-wells", "/private/donors", "/tag/misc")),
+            '/': html_page("Home", links=[("/private/staff", "Staff")]),
+            '/programs/clean-water-wells': html_page("Wells"),
+            '/tag/misc': html_page("Misc"),
+        })
+        crawled = site.crawl(max_pages=2)
+        self.assertEqual([p.title for p in crawled.pages], ["Home", "Wells"])  # reached without a link to it
+        self.assertFalse([path for path in site.paths() if path.startswith('/private')])
+
+    def test_robots_server_error_stops_the_crawl(self):
+        site = FakeSite({'/robots.txt': httpx.Response(503, headers={'Retry-After': '120'}), '/': html_page("Home")})
+        crawled = site.crawl(max_pages=3)
+        self.assertEqual(crawled.pages, [])
+        self.assertEqual(site.paths(), ["/robots.txt"])
@@ -209,3 +209,118 @@ REST_FRAMEWORK = {
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 10,
 }
+
+# Compass movement matching (IVF-flat approximate nearest-neighbour index)
+# Below COMPASS_ANN_MIN_SIZE movements the index does exact search.
+# COMPASS_ANN_NLIST = 0 picks ~4*sqrt(N) lists; raise COMPASS_ANN_NPROBE for better recall.
+COMPASS_ANN_NLIST = int(os.getenv('COMPASS_ANN_NLIST', '0'))
+COMPASS_ANN_NPROBE = int(os.getenv('COMPASS_ANN_NPROBE', '8'))
+COMPASS_ANN_MIN_SIZE = int(os.getenv('COMPASS_ANN_MIN_SIZE', '2000'))
+
+# Live vector index maintenance: how often (seconds) each web process pulls
+# embedding changes made by other processes, and how often it reconciles
+# deletions and compacts tombstones. Set the sync interval to 0 to disable.
+VECTOR_INDEX_SYNC_INTERVAL = float(os.getenv('VECTOR_INDEX_SYNC_INTERVAL', '5'))
+VECTOR_INDEX_COMPACT_INTERVAL = float(os.getenv('VECTOR_INDEX_COMPACT_INTERVAL', '300'))
+
+# Memory-mapped embedding snapshots shared by all web workers on a host.
+# Publish with `python manage.py export_embedding_snapshot`; workers open the
+# CURRENT version on startup and swap to newer ones as they are published.
+EMBEDDING_SNAPSHOT_DIR = os.getenv('EMBEDDING_SNAPSHOT_DIR', os.path.join(BASE_DIR, 'embedding_snapshots'))
+
+# Interactive query caches (query -> enhanced query, query -> embedding):
+# bounded in-process LRU with TTL, optionally shared through a Django cache alias.
+QUERY_CACHE_MAXSIZE = int(os.getenv('QUERY_CACHE_MAXSIZE', '2048'))
+QUERY_CACHE_TTL = float(os.getenv('QUERY_CACHE_TTL', '3600'))
+QUERY_CACHE_BACKEND = os.getenv('QUERY_CACHE_BACKEND') or None
+
+# Latency budget (seconds) for LLM query enhancement in charity search. When it
+# runs out, search proceeds with the raw query and the enhancement finishes in
+# the background into the query cache. The timeout caps the OpenAI call itself.
+QUERY_ENHANCEMENT_BUDGET = float(os.getenv('QUERY_ENHANCEMENT_BUDGET', '1.5'))
+QUERY_ENHANCEMENT_TIMEOUT = float(os.getenv('QUERY_ENHANCEMENT_TIMEOUT', '20'))
+
+# Combined mission statements for semantic search are generated after the
+# response is sent and fetched by token (stored in main.models.MissionToken, so
+# any worker can resolve it; clients poll, the endpoint never blocks): how long
+# (seconds) a token stays valid.
+MISSION_TOKEN_TTL = float(os.getenv('MISSION_TOKEN_TTL', '600'))
+# Generated statements are reused for the same normalized query and charity set
+# until the TTL passes or one of the charities' names or descriptions changes.
+MISSION_CACHE_MAXSIZE = int(os.getenv('MISSION_CACHE_MAXSIZE', '1024'))
+MISSION_CACHE_TTL = float(os.getenv('MISSION_CACHE_TTL', '86400'))
+
+# Shared OpenAI client (main/openai_client.py): one AsyncOpenAI on a persistent
+# event loop with a bounded keep-alive connection pool (HTTP/2 when h2 is installed).
+# OPENAI_TIMEOUT is the default per-call timeout; the others override it per call site.
+OPENAI_MAX_CONNECTIONS = int(os.getenv('OPENAI_MAX_CONNECTIONS', '20'))
+OPENAI_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv('OPENAI_MAX_KEEPALIVE_CONNECTIONS', '10'))
+OPENAI_KEEPALIVE_EXPIRY = float(os.getenv('OPENAI_KEEPALIVE_EXPIRY', '60'))
+OPENAI_HTTP2 = os.getenv('OPENAI_HTTP2', 'true').lower() in ('1', 'true', 'yes')
+OPENAI_MAX_RETRIES = int(os.getenv('OPENAI_MAX_RETRIES', '2'))
+OPENAI_TIMEOUT = float(os.getenv('OPENAI_TIMEOUT', '60'))
+OPENAI_CONNECT_TIMEOUT = float(os.getenv('OPENAI_CONNECT_TIMEOUT', '5'))
+OPENAI_EMBEDDING_TIMEOUT = float(os.getenv('OPENAI_EMBEDDING_TIMEOUT', '30'))
+MISSION_GENERATION_TIMEOUT = float(os.getenv('MISSION_GENERATION_TIMEOUT', '30'))
+
+# Serve the LLM-bound endpoints (semantic search, Compass match) with native async
+# views. Enable only when running under ASGI, e.g.:
+#   ASYNC_API_VIEWS=true uvicorn eunoia_backend.asgi:application --workers 2
+ASYNC_API_VIEWS = os.getenv('ASYNC_API_VIEWS', 'false').lower() in ('1', 'true', 'yes')
+
+# LLM / embedding provider: 'openai', or 'offline' for the deterministic local
+# stand-in used in load tests (main/offline_provider.py). The offline provider
+# sleeps for the given latencies (seconds, +/- jitter fraction) on each call.
+LLM_PROVIDER = os.getenv('LLM_PROVIDER', 'openai').lower()
+OFFLINE_LLM_LATENCY = float(os.getenv('OFFLINE_LLM_LATENCY', '0.5'))
+OFFLINE_EMBEDDING_LATENCY = float(os.getenv('OFFLINE_EMBEDDING_LATENCY', '0.05'))
+OFFLINE_LATENCY_JITTER = float(os.getenv('OFFLINE_LATENCY_JITTER', '0.2'))
+OFFLINE_EMBEDDING_DIM = int(os.getenv('OFFLINE_EMBEDDING_DIM', '1536'))
+
+# Local embedding backend (main/local_embeddings.py): a scikit-learn TF-IDF/hashing
+# + SVD model fitted and refreshed with `python manage.py fit_local_embeddings`.
+# Each call site uses 'openai' or 'local'; 'local' falls back to OpenAI until a
+# model has been fitted. Local cosine scores run lower, hence their own threshold.
+LOCAL_EMBEDDING_MODEL_PATH = os.getenv('LOCAL_EMBEDDING_MODEL_PATH', os.path.join(BASE_DIR, 'local_embeddings', 'model.joblib'))
+CHARITY_SEARCH_EMBEDDING_BACKEND = os.getenv('CHARITY_SEARCH_EMBEDDING_BACKEND', 'openai').lower()
+COMPASS_EMBEDDING_BACKEND = os.getenv('COMPASS_EMBEDDING_BACKEND', 'openai').lower()
+LOCAL_EMBEDDING_MIN_SCORE = float(os.getenv('LOCAL_EMBEDDING_MIN_SCORE', '0.3'))
+
+# Research agent prompts (agents_sdk/charity_research_agents/prompt_assembler.py):
+# the most relevant sentences of the crawled pages are packed into these token
+# budgets instead of sending every page in full. 0 sends full pages.
+RESEARCH_PROFILE_TOKEN_BUDGET = int(os.getenv('RESEARCH_PROFILE_TOKEN_BUDGET', '3000'))
+RESEARCH_MOVEMENT_TOKEN_BUDGET = int(os.getenv('RESEARCH_MOVEMENT_TOKEN_BUDGET', '4000'))
+# The profile and movement agents run concurrently, each with its own timeout (seconds);
+# if one fails or times out, the other's results are still saved.
+RESEARCH_PROFILE_TIMEOUT = float(os.getenv('RESEARCH_PROFILE_TIMEOUT', '120'))
+RESEARCH_MOVEMENT_TIMEOUT = float(os.getenv('RESEARCH_MOVEMENT_TIMEOUT', '120'))
+
+# Website crawler for charity research (agents_sdk/charity_research_agents/utils.py):
+# pages fetched at once per crawl, per-request timeout (seconds), and the shared
+# keep-alive connection pool.
+CRAWL_CONCURRENCY = int(os.getenv('CRAWL_CONCURRENCY', '4'))
+CRAWL_TIMEOUT = float(os.getenv('CRAWL_TIMEOUT', '10'))
+CRAWL_MAX_CONNECTIONS = int(os.getenv('CRAWL_MAX_CONNECTIONS', '50'))
+CRAWL_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv('CRAWL_MAX_KEEPALIVE_CONNECTIONS', '20'))
+# Persistent crawl cache (main.models.CrawlCache): re-crawls send conditional
+# requests (If-None-Match / If-Modified-Since) and reuse stored bodies on 304.
+CRAWL_CACHE_ENABLED = os.getenv('CRAWL_CACHE_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+# Crawler politeness and discovery: honour robots.txt (Disallow, Crawl-delay -
+# capped at CRAWL_MAX_CRAWL_DELAY seconds) for this user-agent token, and seed the
+# frontier from the site's sitemaps. Requests identify as "<token>/1.0 (+<contact URL>)",
+# so site owners can match our traffic to their rules and reach us.
+CRAWL_RESPECT_ROBOTS = os.getenv('CRAWL_RESPECT_ROBOTS', 'true').lower() in ('1', 'true', 'yes')
+CRAWL_ROBOTS_USER_AGENT = os.getenv('CRAWL_ROBOTS_USER_AGENT', 'EunoiaBot')
+CRAWL_CONTACT_URL = os.getenv('CRAWL_CONTACT_URL', '')
+CRAWL_MAX_CRAWL_DELAY = float(os.getenv('CRAWL_MAX_CRAWL_DELAY', '10'))
+CRAWL_USE_SITEMAPS = os.getenv('CRAWL_USE_SITEMAPS', 'true').lower() in ('1', 'true', 'yes')
+# Process-wide crawl governor (agents_sdk/charity_research_agents/crawl_governor.py),
+# shared by every crawl in the process: in-flight request cap, per-domain token
+# bucket (requests/second and burst), longest backoff honoured after a 429/503,
+# and how many times a throttled request is retried.
+CRAWL_GLOBAL_CONCURRENCY = int(os.getenv('CRAWL_GLOBAL_CONCURRENCY', '16'))
+CRAWL_DOMAIN_RATE = float(os.getenv('CRAWL_DOMAIN_RATE', '2'))
+CRAWL_DOMAIN_BURST = float(os.getenv('CRAWL_DOMAIN_BURST', '4'))
+CRAWL_MAX_BACKOFF = float(os.getenv('CRAWL_MAX_BACKOFF', '60'))
+CRAWL_MAX_RETRIES = int(os.getenv('CRAWL_MAX_RETRIES', '2'))
@@ -2,7 +2,7 @@ import subprocess
 import json
 from django.contrib import admin
 from django.contrib import messages
-from .models import Charity, Impact, MarketingCampaign, SocialPost, Movement
+from .models import Charity, Impact, MarketingCampaign, SocialPost, Movement, EmbeddingCache, CrawlCache, MissionToken
 
 @admin.register(Charity)
 class CharityAdmin(admin.ModelAdmin):
@@ -227,3 +227,28 @@ class MovementAdmin(admin.ModelAdmin):
     def charity_name(self, obj):
         return obj.charity.name
     charity_name.short_description = 'Charity'
+
+
+@admin.register(EmbeddingCache)
+class EmbeddingCacheAdmin(admin.ModelAdmin):
+    list_display = ('text_hash', 'model_name', 'created_at')
+    list_filter = ('model_name',)
+    search_fields = ('text_hash',)
+    readonly_fields = ('model_name', 'text_hash', 'created_at')
+    fields = ('model_name', 'text_hash', 'created_at')
+
+
+@admin.register(CrawlCache)
+class CrawlCacheAdmin(admin.ModelAdmin):
+    list_display = ('url', 'content_type', 'fetched_at', 'validated_at')
+    search_fields = ('url',)
+    readonly_fields = ('url', 'url_hash', 'content_type', 'etag', 'last_modified', 'content_hash', 'fetched_at', 'validated_at')
+    fields = ('url', 'url_hash', 'content_type', 'etag', 'last_modified', 'content_hash', 'fetched_at', 'validated_at')
+
+
+@admin.register(MissionToken)
+class MissionTokenAdmin(admin.ModelAdmin):
+    list_display = ('token', 'created_at', 'completed_at')
+    search_fields = ('token',)
+    readonly_fields = ('token', 'statement', 'created_at', 'completed_at')
+    fields = ('token', 'statement', 'created_at', 'completed_at')
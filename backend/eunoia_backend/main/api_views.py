@@ -1,5 +1,6 @@
 from rest_framework import viewsets, views, status
 from rest_framework.response import Response
+from django.urls import reverse
 from .models import Charity, Impact, MarketingCampaign, SocialPost, DonationTransaction, Movement
 from .serializers import (
     CharitySerializer, 
@@ -103,9 +104,42 @@ class PrepareDonationTransactionView(views.APIView):
         
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST) 
 
-from .utils import enhance_query_and_search, generate_combined_mission_statement # Import new function
+from .utils import (
+    DEFAULT_RESONATING_STATEMENT, MISSION_RETRY_AFTER, cached_combined_mission, get_combined_mission,
+    hybrid_charity_search, start_combined_mission,
+)
 # import asyncio # No longer needed for this view
 
+def semantic_search_payload(request, query, matched_charities, search_info) -> dict:
+    """Response body shared by the sync and async semantic search views."""
+    # The combined mission is a second LLM call; unless it is cached, generate it
+    # in the background and let the client fetch it with the token instead of waiting here.
+    charities_data_for_prompt = [
+        {
+            "id": charity.id,
+            "name": charity.name,
+            "description": charity.description or "",
+        }
+        for charity in matched_charities[:3]
+    ]
+    combined_mission = cached_combined_mission(query, charities_data_for_prompt)
+    mission_token = None
+    if combined_mission is None:
+        mission_token = start_combined_mission(query, charities_data_for_prompt)
+
+    charity_serializer = CharitySerializer(matched_charities, many=True, context={'request': request})
+    return {
+        "matched_charities": charity_serializer.data,
+        # Cached statements are inlined (no token); otherwise a placeholder until the mission token resolves
+        "combined_mission": combined_mission or DEFAULT_RESONATING_STATEMENT,
+        "mission_token": mission_token,
+        "mission_url": (
+            request.build_absolute_uri(reverse('main:charity-search-mission', args=[mission_token]))
+            if mission_token else None
+        ),
+        "query_path": search_info['query_path'],
+    }
+
 class CharitySemanticSearchView(views.APIView):
     permission_classes = [] # Or your preferred permissions
 
@@ -115,37 +149,34 @@ class CharitySemanticSearchView(views.APIView):
             return Response({"error": "Query parameter is required."}, status=status.HTTP_400_BAD_REQUEST)
 
         try:
-            matched_charities_qs = enhance_query_and_search(query) 
-            
-            resonating_statement = "Explore these charities that align with your vision."
-            # contributing_charity_names = [] # This variable was defined but not used
-
-            if matched_charities_qs:
-                charities_data_for_prompt = [
-                    {
-                        "name": charity.name,
-                        "description": charity.description or "",
-                    }
-                    for charity in matched_charities_qs[:3]
-                ]
-                
-                if charities_data_for_prompt:
-                    combined_mission_result = generate_combined_mission_statement(query, charities_data_for_prompt)
-                    if combined_mission_result and combined_mission_result.resonating_statement:
-                        resonating_statement = combined_mission_result.resonating_statement
+            matched_charities_qs, search_info = hybrid_charity_search(query)
             
-            charity_serializer = CharitySerializer(matched_charities_qs, many=True, context={'request': request})
-            
-            response_data = {
-                "matched_charities": charity_serializer.data,
-                "combined_mission": resonating_statement,
-            }
+            response_data = semantic_search_payload(request, query, matched_charities_qs, search_info)
             return Response(response_data, status=status.HTTP_200_OK)
         
         except Exception as e:
             print(f"Error in CharitySemanticSearchView: {e}") 
             return Response({"error": f"An error occurred during search: {str(e)}"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+class CombinedMissionView(views.APIView):
+    """
+    Resolve a mission token from CharitySemanticSearchView.
+
+    Returns 200 with the statement once ready, 202 while it is still being
+    generated and 404 for unknown or expired tokens. It never waits: clients
+    poll again after the 202's Retry-After.
+    """
+    permission_classes = []
+
+    def get(self, request, token, *args, **kwargs):
+        mission_status, statement = get_combined_mission(token)
+        if mission_status == 'ready':
+            return Response({"status": "ready", "combined_mission": statement}, status=status.HTTP_200_OK)
+        if mission_status == 'pending':
+            return Response({"status": "pending"}, status=status.HTTP_202_ACCEPTED,
+                            headers={"Retry-After": str(MISSION_RETRY_AFTER)})
+        return Response({"error": "Unknown or expired mission token."}, status=status.HTTP_404_NOT_FOUND)
+
 # New ViewSet for DonationTransaction
 class DonationTransactionViewSet(viewsets.ModelViewSet):
     queryset = DonationTransaction.objects.all().order_by('-timestamp')
@@ -7,3 +7,6 @@ class MainConfig(AppConfig):
 
     def ready(self):
         from . import utils # Use relative import for utils.py within the same app
+        from . import vector_index # Registers the live index signal hooks
+        from . import lexical_index # Registers the text index signal hooks
+        from . import local_embeddings # Registers the local embedding index signal hooks
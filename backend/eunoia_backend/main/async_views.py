@@ -0,0 +1,65 @@
+"""
+Native async versions of the LLM-bound API views, for serving under ASGI.
+
+Each request awaits the search / agent pipeline instead of blocking a worker
+thread, so one uvicorn worker can hold many in-flight LLM calls. They are
+routed in place of the DRF views in api_views.py when ASYNC_API_VIEWS is on
+(see main/urls.py); run them with
+
+    ASYNC_API_VIEWS=true uvicorn eunoia_backend.asgi:application --workers 2
+
+Under WSGI, keep ASYNC_API_VIEWS off: Django would run each async view in a
+fresh event loop per request.
+"""
+
+import json
+
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+
+from agents_sdk.compass_matching_agents import match_top_movements
+from .api_views import semantic_search_payload
+from .openai_client import run_async
+from .utils import hybrid_charity_search_async
+
+
+class AsyncCharitySemanticSearchView(View):
+    async def get(self, request, *args, **kwargs):
+        query = request.GET.get('query')
+        if not query:
+            return JsonResponse({"error": "Query parameter is required."}, status=400)
+
+        try:
+            matched_charities, search_info = await hybrid_charity_search_async(query)
+            response_data = await sync_to_async(semantic_search_payload)(request, query, matched_charities, search_info)
+            return JsonResponse(response_data)
+        except Exception as e:
+            print(f"Error in AsyncCharitySemanticSearchView: {e}")
+            return JsonResponse({"error": f"An error occurred during search: {str(e)}"}, status=500)
+
+
+@method_decorator(csrf_exempt, name='dispatch') # Token-less JSON API, like the DRF views
+class AsyncCompassMatchView(View):
+    async def post(self, request, *args, **kwargs):
+        if request.content_type == 'application/json':
+            try:
+                data = json.loads(request.body or b'{}')
+            except json.JSONDecodeError:
+                return JsonResponse({"error": "Invalid JSON body"}, status=400)
+            if not isinstance(data, dict):
+                return JsonResponse({"error": "JSON body must be an object"}, status=400)
+        else:
+            data = request.POST
+        query = data.get('query')
+        if not query:
+            return JsonResponse({"error": "Missing 'query'"}, status=400)
+        try:
+            top_k = int(data.get('top_k', 10))
+            # The agent pipeline runs on the shared OpenAI event loop (pooled connections)
+            result = await run_async(match_top_movements(query, top_k))
+            return JsonResponse(result)
+        except Exception as e:
+            return JsonResponse({"error": str(e)}, status=500)
@@ -0,0 +1,132 @@
+"""
+Small in-process caches for the interactive search endpoints.
+
+TTLCache is a bounded LRU whose entries also expire after `ttl` seconds.
+It can be backed by one of Django's configured caches (e.g. Redis or
+Memcached), so a value computed in one worker is reused by the others;
+the in-process layer still answers repeat lookups without a network hop.
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+from django.conf import settings
+
+_MISSING = object()
+
+
+class TTLCache:
+    def __init__(self, name: str, maxsize: int = 1024, ttl: float = 3600, backend_alias: Optional[str] = None):
+        self.name = name
+        self.maxsize = max(1, maxsize)
+        self.ttl = ttl
+        self.backend_alias = backend_alias
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def _backend(self):
+        if not self.backend_alias:
+            return None
+        from django.core.cache import caches
+        return caches[self.backend_alias]
+
+    def _backend_key(self, key: Hashable) -> str:
+        return f"{self.name}:{hashlib.sha256(repr(key).encode('utf-8')).hexdigest()}"
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > now:
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+
+        backend = self._backend()
+        if backend is not None:
+            try:
+                value = backend.get(self._backend_key(key), _MISSING)
+            except Exception as e:
+                print(f"[{self.name}] Cache backend read failed: {e}")
+                value = _MISSING
+            if value is not _MISSING:
+                self._store(key, value)
+                with self._lock:
+                    self.hits += 1
+                return value
+
+        with self._lock:
+            self.misses += 1
+        return default
+
+    def _store(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def set(self, key: Hashable, value: Any) -> None:
+        self._store(key, value)
+        backend = self._backend()
+        if backend is not None:
+            try:
+                backend.set(self._backend_key(key), value, timeout=self.ttl)
+            except Exception as e:
+                print(f"[{self.name}] Cache backend write failed: {e}")
+
+    def delete(self, key: Hashable) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+        backend = self._backend()
+        if backend is not None:
+            try:
+                backend.delete(self._backend_key(key))
+            except Exception as e:
+                print(f"[{self.name}] Cache backend delete failed: {e}")
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {'size': len(self._data), 'maxsize': self.maxsize, 'hits': self.hits, 'misses': self.misses}
+
+
+def normalize_query(text: str) -> str:
+    """Case- and whitespace-insensitive form of a user query, used as a cache key."""
+    return " ".join((text or "").lower().split())
+
+
+# Shared by charity semantic search and Compass matching
+query_enhancement_cache = TTLCache(
+    'query-enhancement',
+    maxsize=getattr(settings, 'QUERY_CACHE_MAXSIZE', 2048),
+    ttl=getattr(settings, 'QUERY_CACHE_TTL', 3600),
+    backend_alias=getattr(settings, 'QUERY_CACHE_BACKEND', None),
+)
+query_embedding_cache = TTLCache(
+    'query-embedding',
+    maxsize=getattr(settings, 'QUERY_CACHE_MAXSIZE', 2048),
+    ttl=getattr(settings, 'QUERY_CACHE_TTL', 3600),
+    backend_alias=getattr(settings, 'QUERY_CACHE_BACKEND', None),
+)
+# Resonating statements keyed by (normalized query, charity ids, name+description fingerprints)
+mission_statement_cache = TTLCache(
+    'combined-mission',
+    maxsize=getattr(settings, 'MISSION_CACHE_MAXSIZE', 1024),
+    ttl=getattr(settings, 'MISSION_CACHE_TTL', 86400),
+    backend_alias=getattr(settings, 'QUERY_CACHE_BACKEND', None),
+)
@@ -0,0 +1,132 @@
+"""
+Versioned, memory-mapped snapshots of the vector indexes.
+
+`python manage.py export_embedding_snapshot` writes each index's normalized
+float32 matrix and id map as .npy files into a new version directory under
+EMBEDDING_SNAPSHOT_DIR, then flips the CURRENT pointer atomically. Web
+workers open the current version as read-only memmaps, so every gunicorn
+worker on a host shares one page-cache copy of the vectors and starts
+without reading embeddings from the database. The mapped rows are never
+written: a worker's own upserts go to a small in-memory overlay that
+VectorIndex searches alongside the snapshot (see VectorIndex.attach()).
+"""
+
+import json
+import os
+import shutil
+import tempfile
+from datetime import datetime
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, Optional
+
+import numpy as np
+from django.conf import settings
+
+if TYPE_CHECKING:
+    from .vector_index import VectorIndex
+
+CURRENT_FILE = 'CURRENT'
+MANIFEST_FILE = 'manifest.json'
+
+
+def snapshot_root() -> Optional[Path]:
+    root = getattr(settings, 'EMBEDDING_SNAPSHOT_DIR', None)
+    return Path(root) if root else None
+
+
+def current_version() -> Optional[str]:
+    """Return the published snapshot version, or None if there is none."""
+    root = snapshot_root()
+    if root is None:
+        return None
+    try:
+        return (root / CURRENT_FILE).read_text().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def read_manifest(version: str) -> Optional[dict]:
+    try:
+        return json.loads((snapshot_root() / version / MANIFEST_FILE).read_text())
+    except (FileNotFoundError, json.JSONDecodeError, TypeError):
+        return None
+
+
+def write_snapshot(indexes: Dict[str, "VectorIndex"], created_at: datetime, keep: int = 3) -> str:
+    """
+    Write `indexes` to a new version directory and publish it as CURRENT.
+
+    `created_at` must be taken before the indexes were loaded; workers replay
+    database changes from that point on top of the snapshot.
+    """
+    root = snapshot_root()
+    if root is None:
+        raise ValueError("EMBEDDING_SNAPSHOT_DIR is not configured.")
+    root.mkdir(parents=True, exist_ok=True)
+
+    version = created_at.strftime('%Y%m%dT%H%M%S%f')
+    tmp_dir = Path(tempfile.mkdtemp(prefix=f'.{version}-', dir=root))
+    os.chmod(tmp_dir, 0o755)
+    manifest = {'version': version, 'created_at': created_at.isoformat(), 'indexes': {}}
+    try:
+        for name, index in indexes.items():
+            arrays = index.export_arrays()
+            if not arrays:
+                manifest['indexes'][name] = {'size': 0}
+                continue
+            vectors = arrays['vectors']
+            size, dim = vectors.shape
+            np.save(tmp_dir / f'{name}.vectors.npy', np.ascontiguousarray(vectors, dtype=np.float32))
+            np.save(tmp_dir / f'{name}.ids.npy', arrays['ids'])
+            is_ivf = 'centroids' in arrays
+            if is_ivf:
+                np.save(tmp_dir / f'{name}.centroids.npy', arrays['centroids'])
+                np.save(tmp_dir / f'{name}.assignment.npy', arrays['assignment'])
+            manifest['indexes'][name] = {'size': size, 'dim': dim, 'ivf': is_ivf}
+        (tmp_dir / MANIFEST_FILE).write_text(json.dumps(manifest, indent=2))
+        os.replace(tmp_dir, root / version)
+    except Exception:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+    pointer_tmp = root / f'.{CURRENT_FILE}.{os.getpid()}'
+    pointer_tmp.write_text(version)
+    os.replace(pointer_tmp, root / CURRENT_FILE)
+    _prune_versions(root, keep=keep, current=version)
+    return version
+
+
+def _prune_versions(root: Path, keep: int, current: str) -> None:
+    # Workers still mapping a pruned version keep reading it until they swap; unlinked files stay valid
+    versions = sorted(p.name for p in root.iterdir() if p.is_dir() and not p.name.startswith('.'))
+    for name in versions[:-max(keep, 1)]:
+        if name != current:
+            shutil.rmtree(root / name, ignore_errors=True)
+
+
+def load_snapshot_into(index: "VectorIndex", name: str, version: str) -> Optional[datetime]:
+    """
+    Attach `index` to the read-only memmapped arrays of snapshot `version`.
+
+    Returns the snapshot's creation time (the point to replay changes from),
+    or None if the snapshot does not contain this index.
+    """
+    from .vector_index import IVFFlatIndex
+
+    manifest = read_manifest(version)
+    if manifest is None or name not in manifest.get('indexes', {}):
+        return None
+    entry = manifest['indexes'][name]
+    if entry.get('size'):
+        directory = snapshot_root() / version
+        matrix = np.load(directory / f'{name}.vectors.npy', mmap_mode='r')
+        ids = np.load(directory / f'{name}.ids.npy')
+        if entry.get('ivf') and isinstance(index, IVFFlatIndex):
+            index.attach(
+                matrix, ids,
+                centroids=np.load(directory / f'{name}.centroids.npy'),
+                assignment=np.load(directory / f'{name}.assignment.npy'),
+            )
+        else:
+            index.attach(matrix, ids)
+    return datetime.fromisoformat(manifest['created_at'])
@@ -0,0 +1,133 @@
+"""
+Custom model fields for the Eunoia platform.
+
+EmbeddingField stores embedding vectors as packed little-endian floats in a
+binary column instead of JSON text, and hands them back as NumPy arrays.
+"""
+
+import base64
+from typing import Optional, Tuple
+
+import numpy as np
+from django.core.exceptions import ValidationError
+from django.db import models
+
+EMBEDDING_DTYPES = {
+    'float32': np.dtype('<f4'),
+    'float16': np.dtype('<f2'),
+}
+
+
+# Vectors whose norm is this close to 1 are treated as already normalized
+UNIT_NORM_TOLERANCE = 1e-4
+
+
+def l2_normalize(vector) -> Tuple[Optional[np.ndarray], float]:
+    """
+    Return (unit-length float32 copy of `vector`, original L2 norm).
+
+    The vector is None when it is empty, non-finite or all zeros.
+    """
+    try:
+        arr = np.asarray(vector, dtype=np.float32).reshape(-1)
+    except (TypeError, ValueError):
+        return None, 0.0
+    if arr.size == 0 or not np.all(np.isfinite(arr)):
+        return None, 0.0
+    norm = float(np.linalg.norm(arr))
+    if norm == 0.0:
+        return None, 0.0
+    return arr / norm, norm
+
+
+class EmbeddingField(models.BinaryField):
+    """
+    A vector of floats packed as raw little-endian bytes.
+
+    Assigning a list, tuple or array is accepted; values read back from the
+    database are read-only NumPy views over the stored bytes. Empty vectors
+    are stored as NULL.
+
+    With `norm_field`, vectors are L2-normalized when the model is saved and
+    their original norm is written to that (FloatField) attribute, so a
+    non-NULL norm marks a row as stored unit-length and cosine similarity
+    against it is a plain dot product.
+    """
+
+    description = "Packed little-endian float embedding vector"
+
+    def __init__(self, *args, dtype: str = 'float32', norm_field: Optional[str] = None, **kwargs):
+        if dtype not in EMBEDDING_DTYPES:
+            raise ValueError(f"Unsupported embedding dtype '{dtype}'. Choose from: {', '.join(EMBEDDING_DTYPES)}")
+        self.dtype = dtype
+        self.norm_field = norm_field
+        super().__init__(*args, **kwargs)
+
+    @property
+    def numpy_dtype(self) -> np.dtype:
+        return EMBEDDING_DTYPES[self.dtype]
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        if self.dtype != 'float32':
+            kwargs['dtype'] = self.dtype
+        if self.norm_field:
+            kwargs['norm_field'] = self.norm_field
+        return name, path, args, kwargs
+
+    def pre_save(self, model_instance, add):
+        value = super().pre_save(model_instance, add)
+        if not self.norm_field:
+            return value
+        if value is None:
+            setattr(model_instance, self.norm_field, None)
+            return None
+        unit, norm = l2_normalize(self.to_python(value))
+        if unit is None:
+            setattr(model_instance, self.norm_field, None)
+            setattr(model_instance, self.attname, None)
+            return None
+        # Re-saving a stored unit vector must not overwrite the norm it was saved with
+        if abs(norm - 1.0) > UNIT_NORM_TOLERANCE or getattr(model_instance, self.norm_field, None) is None:
+            setattr(model_instance, self.norm_field, norm)
+        setattr(model_instance, self.attname, unit)
+        return unit
+
+    def _unpack(self, raw) -> np.ndarray:
+        return np.frombuffer(raw, dtype=self.numpy_dtype)
+
+    def _pack(self, value) -> Optional[bytes]:
+        if value is None:
+            return None
+        if isinstance(value, (bytes, bytearray, memoryview)):
+            value = self._unpack(value)
+        try:
+            arr = np.asarray(value, dtype=self.numpy_dtype).reshape(-1)
+        except (TypeError, ValueError) as e:
+            raise ValidationError(f"Invalid embedding value: {e}")
+        if arr.size == 0:
+            return None
+        return arr.tobytes()
+
+    def from_db_value(self, value, expression, connection):
+        if value is None:
+            return None
+        return self._unpack(value)
+
+    def to_python(self, value):
+        if value is None or isinstance(value, np.ndarray):
+            return value
+        if isinstance(value, str):
+            # Serialized (dumpdata/loaddata) form is base64 of the packed bytes
+            value = base64.b64decode(value.encode('ascii'))
+        if isinstance(value, (bytes, bytearray, memoryview)):
+            return self._unpack(value) if len(value) else None
+        packed = self._pack(value)
+        return self._unpack(packed) if packed is not None else None
+
+    def get_prep_value(self, value):
+        return self._pack(value)
+
+    def value_to_string(self, obj):
+        packed = self._pack(self.value_from_object(obj))
+        return base64.b64encode(packed).decode('ascii') if packed is not None else None
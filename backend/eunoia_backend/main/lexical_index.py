@@ -0,0 +1,253 @@
+"""
+In-process BM25 inverted index over charity text.
+
+Covers name, tagline, keywords, description and the crawled
+`extracted_text_data`, with per-field weights. It answers keyword queries
+without touching the database and is fused with the vector ranking by
+reciprocal-rank fusion in `enhance_query_and_search`, so lexical matches
+still come back when the embedding call fails or is skipped.
+
+Freshness follows the vector indexes: saves in this process are applied
+through model signals, and the vector-index maintenance thread syncs rows
+updated elsewhere (see vector_index._maintenance_loop).
+"""
+
+import heapq
+import math
+import re
+import threading
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+STOPWORDS = frozenset("""
+a an and are as at be by for from has have in is it its of on or that the this to was were will with
+we our you your they their i me my charity charities organization organizations
+""".split())
+
+# Field -> term-frequency weight; names and curated keywords say more than page text
+FIELD_WEIGHTS = {
+    'name': 3.0,
+    'tagline': 2.0,
+    'keywords': 2.0,
+    'description': 1.0,
+    'extracted_text_data': 1.0,
+}
+
+# Crawled page text can be very long; only its head is indexed
+MAX_FIELD_TOKENS = 5000
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    if not text:
+        return []
+    return [t for t in TOKEN_RE.findall(text.lower()) if t not in STOPWORDS and len(t) > 1]
+
+
+def document_terms(fields: Dict[str, object]) -> Dict[str, float]:
+    """Weighted term frequencies for one charity, from a {field name: value} mapping."""
+    terms: Dict[str, float] = {}
+    for field, weight in FIELD_WEIGHTS.items():
+        value = fields.get(field)
+        if isinstance(value, (list, tuple)):
+            value = " ".join(str(v) for v in value)
+        for term, count in Counter(tokenize(value)[:MAX_FIELD_TOKENS]).items():
+            terms[term] = terms.get(term, 0.0) + weight * count
+    return terms
+
+
+class BM25Index:
+    """
+    Okapi BM25 over weighted term frequencies, updated one document at a time.
+
+    Postings map term -> {doc id: weighted tf}. Upserts replace a document's
+    postings in place; the average document length is maintained as a
+    running total, so no rebuild is ever needed. Each document's length
+    normalization is cached against the average it was computed with and
+    only recomputed once the average drifts by more than NORM_DRIFT.
+    """
+
+    NORM_DRIFT = 0.05
+
+    def __init__(self, name: str, k1: float = 1.2, b: float = 0.75):
+        self.name = name
+        self.k1 = k1
+        self.b = b
+        self._postings: Dict[str, Dict[int, float]] = {}
+        self._doc_terms: Dict[int, Tuple[str, ...]] = {}
+        self._doc_len: Dict[int, float] = {}
+        self._total_len = 0.0
+        self._doc_norm: Dict[int, float] = {}
+        self._norm_avg_len = 0.0
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._doc_len)
+
+    def __contains__(self, doc_id: int) -> bool:
+        return doc_id in self._doc_len
+
+    def ids(self) -> Set[int]:
+        with self._lock:
+            return set(self._doc_len)
+
+    def upsert(self, doc_id: int, terms: Dict[str, float]) -> bool:
+        """Index (or re-index) `doc_id` from weighted term frequencies. An empty document is removed."""
+        with self._lock:
+            self.remove(doc_id)
+            if not terms:
+                return False
+            for term, tf in terms.items():
+                self._postings.setdefault(term, {})[doc_id] = tf
+            self._doc_terms[doc_id] = tuple(terms)
+            length = sum(terms.values())
+            self._doc_len[doc_id] = length
+            self._total_len += length
+            if self._norm_avg_len:
+                self._doc_norm[doc_id] = self._length_norm(length, self._norm_avg_len)
+            return True
+
+    def remove(self, doc_id: int) -> bool:
+        with self._lock:
+            terms = self._doc_terms.pop(doc_id, None)
+            if terms is None:
+                return False
+            for term in terms:
+                posting = self._postings.get(term)
+                if posting is not None:
+                    posting.pop(doc_id, None)
+                    if not posting:
+                        del self._postings[term]
+            self._total_len -= self._doc_len.pop(doc_id)
+            self._doc_norm.pop(doc_id, None)
+            return True
+
+    def _length_norm(self, length: float, avg_len: float) -> float:
+        return self.k1 * (1.0 - self.b + self.b * length / avg_len)
+
+    def _refresh_norms(self) -> None:
+        avg_len = self._total_len / len(self._doc_len)
+        if self._norm_avg_len and abs(avg_len - self._norm_avg_len) <= self.NORM_DRIFT * self._norm_avg_len:
+            return
+        self._doc_norm = {doc_id: self._length_norm(length, avg_len) for doc_id, length in self._doc_len.items()}
+        self._norm_avg_len = avg_len
+
+    def apply(self, changes: Iterable[Tuple[int, Optional[Dict[str, float]]]]) -> Tuple[int, int]:
+        """Apply (id, terms) changes, where None terms remove the id. Returns (upserted, removed)."""
+        upserted = removed = 0
+        with self._lock:
+            for doc_id, terms in changes:
+                if terms is not None and self.upsert(doc_id, terms):
+                    upserted += 1
+                elif self.remove(doc_id):
+                    removed += 1
+        return upserted, removed
+
+    def search(self, query: str, top_k: int = 20) -> List[Tuple[int, float]]:
+        """Return up to `top_k` (id, BM25 score) pairs, best first."""
+        query_terms = set(tokenize(query))
+        if not query_terms or top_k <= 0:
+            return []
+        scores: Dict[int, float] = {}
+        with self._lock:
+            n_docs = len(self._doc_len)
+            if not n_docs:
+                return []
+            self._refresh_norms()
+            doc_norm = self._doc_norm
+            k1_plus_1 = self.k1 + 1.0
+            for term in query_terms:
+                posting = self._postings.get(term)
+                if not posting:
+                    continue
+                df = len(posting)
+                weight = math.log(1.0 + (n_docs - df + 0.5) / (df + 0.5)) * k1_plus_1
+                for doc_id, tf in posting.items():
+                    scores[doc_id] = scores.get(doc_id, 0.0) + weight * tf / (tf + doc_norm[doc_id])
+        return heapq.nlargest(top_k, scores.items(), key=lambda item: item[1])
+
+
+def reciprocal_rank_fusion(rankings: Iterable[List[int]], k: int = 60) -> List[Tuple[int, float]]:
+    """
+    Fuse several best-first id rankings into one: score(id) = sum 1 / (k + rank).
+
+    Only ranks matter, so BM25 and cosine scores never need calibrating
+    against each other. Ties keep the order in which ids were first seen.
+    """
+    fused: Dict[int, float] = {}
+    for ranking in rankings:
+        for rank, item_id in enumerate(ranking, start=1):
+            fused[item_id] = fused.get(item_id, 0.0) + 1.0 / (k + rank)
+    return sorted(fused.items(), key=lambda item: item[1], reverse=True)
+
+
+# --- Process-wide charity index ---
+
+CHARITY_TEXT_FIELDS = ('name', 'tagline', 'keywords', 'description', 'extracted_text_data')
+
+_charity_index: Optional[BM25Index] = None
+_charity_index_lock = threading.Lock()
+_watermark: Optional[datetime] = None
+
+
+def _charity_documents(since: Optional[datetime] = None):
+    from .models import Charity
+
+    qs = Charity.objects.all()
+    if since is not None:
+        qs = qs.filter(updated_at__gte=since)
+    for row in qs.values('id', *CHARITY_TEXT_FIELDS).iterator(chunk_size=500):
+        yield row['id'], document_terms(row)
+
+
+def get_charity_text_index() -> BM25Index:
+    """Return the process-wide charity BM25 index, building it from the database on first use."""
+    global _charity_index, _watermark
+    from .vector_index import _ensure_maintenance_thread
+
+    if _charity_index is not None:
+        return _charity_index
+    with _charity_index_lock:
+        if _charity_index is None:
+            index = BM25Index('charity-text')
+            watermark = timezone.now()
+            upserted, _ = index.apply(_charity_documents())
+            print(f"Built charity text index with {upserted} documents.")
+            _charity_index, _watermark = index, watermark
+    _ensure_maintenance_thread()
+    return _charity_index
+
+
+def sync_text_index_changes(reconcile: bool = False) -> Tuple[int, int]:
+    """Apply charities updated since the last sync; with `reconcile`, also drop rows deleted elsewhere."""
+    global _watermark
+    index = _charity_index
+    if index is None:
+        return 0, 0
+    started = timezone.now()
+    since = (_watermark or started) - timedelta(seconds=1)
+    upserted, removed = index.apply(_charity_documents(since))
+    _watermark = started
+    if reconcile:
+        from .models import Charity
+        for stale_id in index.ids() - set(Charity.objects.values_list('id', flat=True)):
+            removed += index.remove(stale_id)
+    return upserted, removed
+
+
+@receiver(post_save, sender='main.Charity')
+def charity_text_index_post_save(sender, instance, **kwargs):
+    if _charity_index is not None:
+        _charity_index.upsert(instance.id, document_terms({f: getattr(instance, f) for f in CHARITY_TEXT_FIELDS}))
+
+
+@receiver(post_delete, sender='main.Charity')
+def charity_text_index_post_delete(sender, instance, **kwargs):
+    if _charity_index is not None:
+        _charity_index.remove(instance.id)
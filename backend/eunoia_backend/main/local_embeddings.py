@@ -0,0 +1,386 @@
+"""
+Optional local embedding backend built on scikit-learn.
+
+A TF-IDF + TruncatedSVD (LSA) model - or a hashing vectorizer + SVD, which
+keeps no vocabulary - is fitted on charity and movement text by
+
+    python manage.py fit_local_embeddings
+
+and saved to LOCAL_EMBEDDING_MODEL_PATH. Embedding a query is then a
+tokenization plus a weighted sum of projection rows, in-process: tens of
+microseconds and no network hop.
+
+Local vectors live in their own indexes ('charity-local', 'movement-local')
+alongside the OpenAI ones in vector_index.py. They are computed from the
+model rather than stored, so they are built in memory on first use, kept
+fresh by model signals and the vector-index maintenance thread, and rebuilt
+when a refitted model is written. Each call site picks its backend
+(CHARITY_SEARCH_EMBEDDING_BACKEND, COMPASS_EMBEDDING_BACKEND); 'local' falls
+back to OpenAI until a model has been fitted.
+"""
+
+import math
+import os
+import threading
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import joblib
+import numpy as np
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .vector_index import IVFFlatIndex, VectorIndex
+
+METHODS = ('tfidf', 'hashing')
+
+# Crawled page text can be very long; the head carries most of the signal
+MAX_DOCUMENT_CHARS = 20000
+
+
+def charity_text(fields: Dict) -> str:
+    """Text a charity is embedded from: the same fields its OpenAI embedding and BM25 entry use."""
+    keywords = fields.get('keywords') or []
+    if isinstance(keywords, str):
+        keywords = [keywords]
+    parts = [
+        fields.get('name') or '', fields.get('tagline') or '', " ".join(str(k) for k in keywords),
+        fields.get('description') or '', (fields.get('extracted_text_data') or '')[:MAX_DOCUMENT_CHARS],
+    ]
+    return "\n".join(p for p in parts if p)
+
+
+def movement_text(fields: Dict) -> str:
+    return "\n".join(p for p in (fields.get('title') or '', fields.get('summary') or '') if p)
+
+
+class LocalEmbeddingModel:
+    """
+    Sparse term weights projected onto a TruncatedSVD basis, returned unit-length.
+
+    'tfidf' stores the fitted vocabulary and IDF weights; 'hashing' hashes
+    terms into a fixed feature space (no vocabulary to store or drift) and
+    learns IDF weights on top.
+    """
+
+    def __init__(self, method: str, vectorizer, transformer, projection: np.ndarray,
+                 documents: int, explained_variance: float):
+        self.method = method
+        self.vectorizer = vectorizer
+        self.transformer = transformer
+        self.projection = projection
+        self.documents = documents
+        self.explained_variance = explained_variance
+        self.fitted_at = timezone.now()
+
+    @property
+    def dim(self) -> int:
+        return self.projection.shape[1]
+
+    @classmethod
+    def fit(cls, texts: Sequence[str], method: str = 'tfidf', dim: int = 256,
+            max_features: int = 50000, min_df: int = 1, seed: int = 0) -> 'LocalEmbeddingModel':
+        from sklearn.decomposition import TruncatedSVD
+        from sklearn.feature_extraction.text import HashingVectorizer, TfidfTransformer, TfidfVectorizer
+
+        if method not in METHODS:
+            raise ValueError(f"Unknown local embedding method '{method}' (choose from {', '.join(METHODS)}).")
+        if method == 'tfidf':
+            vectorizer = TfidfVectorizer(
+                stop_words='english', ngram_range=(1, 2), sublinear_tf=True,
+                max_features=max_features, min_df=min_df, dtype=np.float32,
+            )
+            transformer = None
+            matrix = vectorizer.fit_transform(texts)
+        else:
+            vectorizer = HashingVectorizer(
+                stop_words='english', ngram_range=(1, 2), n_features=2 ** 18,
+                alternate_sign=False, norm=None, dtype=np.float32,
+            )
+            transformer = TfidfTransformer(sublinear_tf=True)
+            matrix = transformer.fit_transform(vectorizer.transform(texts))
+
+        # TruncatedSVD needs fewer components than either side of the matrix
+        components = max(1, min(dim, min(matrix.shape) - 1))
+        svd = TruncatedSVD(n_components=components, random_state=seed)
+        svd.fit(matrix)
+        projection = np.ascontiguousarray(svd.components_.T, dtype=np.float32)
+        return cls(method, vectorizer, transformer, projection, len(texts), float(svd.explained_variance_ratio_.sum()))
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state.pop('_analyzer', None)  # rebuilt lazily; the analyzer is a closure
+        return state
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        """Embed a batch: (len(texts), dim) float32, unit rows (all-zero for texts with no known terms)."""
+        weights = self.vectorizer.transform(texts)
+        if self.transformer is not None:
+            weights = self.transformer.transform(weights)
+        vectors = np.asarray(weights @ self.projection, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        np.divide(vectors, norms, out=vectors, where=norms > 0)
+        return vectors
+
+    def embed_one(self, text: str) -> Optional[np.ndarray]:
+        """Embed a single query; None if it has no known terms."""
+        if self.method != 'tfidf':
+            vector = self.embed([text])[0]
+            return vector if vector.any() else None
+
+        # Fast path: skip building a sparse matrix for one row. Sublinear TF times IDF,
+        # summed over the projection rows; the TF-IDF row norm cancels in the final normalization.
+        analyzer = getattr(self, '_analyzer', None)
+        if analyzer is None:
+            analyzer = self._analyzer = self.vectorizer.build_analyzer()
+        vocabulary = self.vectorizer.vocabulary_
+        counts = Counter(vocabulary[term] for term in analyzer(text or '') if term in vocabulary)
+        if not counts:
+            return None
+        columns = np.fromiter(counts.keys(), dtype=np.int64, count=len(counts))
+        tf = np.fromiter((1.0 + math.log(c) for c in counts.values()), dtype=np.float32, count=len(counts))
+        vector = (tf * self.vectorizer.idf_[columns].astype(np.float32)) @ self.projection[columns]
+        norm = float(np.linalg.norm(vector))
+        return vector / norm if norm > 0 else None
+
+    def save(self, path: str) -> None:
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp_path = f"{path}.tmp-{os.getpid()}"
+        joblib.dump(self, tmp_path)
+        os.replace(tmp_path, path)  # readers never see a half-written model
+
+    @staticmethod
+    def load(path: str) -> 'LocalEmbeddingModel':
+        return joblib.load(path)
+
+
+def _embed_rows(model: LocalEmbeddingModel, rows: Iterable[Tuple[int, Optional[str]]],
+                batch_size: int = 1000):
+    """Yield (id, unit vector or None) for (id, text or None) rows, embedding texts in batches."""
+    batch: List[Tuple[int, Optional[str]]] = []
+
+    def _flush():
+        texts = [text for _, text in batch if text is not None]
+        vectors = iter(model.embed(texts)) if texts else iter(())
+        for item_id, text in batch:
+            vector = next(vectors) if text is not None else None
+            yield item_id, (vector if vector is not None and vector.any() else None)
+
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            yield from _flush()
+            batch = []
+    if batch:
+        yield from _flush()
+
+
+# --- Process-wide model and local indexes ---
+
+_model: Optional[LocalEmbeddingModel] = None
+_model_mtime: Optional[float] = None
+_indexes: Dict[str, VectorIndex] = {}
+_watermarks: Dict[str, datetime] = {}
+_lock = threading.RLock()
+_warned_missing = False
+
+CHARITY_TEXT_FIELDS = ('name', 'tagline', 'keywords', 'description', 'extracted_text_data')
+MOVEMENT_TEXT_FIELDS = ('title', 'summary')
+
+
+def model_path() -> str:
+    return getattr(settings, 'LOCAL_EMBEDDING_MODEL_PATH', '') or ''
+
+
+def _model_file_mtime() -> Optional[float]:
+    try:
+        return os.stat(model_path()).st_mtime
+    except OSError:
+        return None
+
+
+def get_local_model() -> Optional[LocalEmbeddingModel]:
+    """Return the fitted local model, loading it on first use; None if none has been fitted."""
+    global _model, _model_mtime
+    if _model is not None:
+        return _model
+    mtime = _model_file_mtime()
+    if mtime is None:
+        return None
+    with _lock:
+        if _model is None:
+            _model = LocalEmbeddingModel.load(model_path())
+            _model_mtime = mtime
+            print(f"Loaded local embedding model ({_model.method}, {_model.dim} dims, fitted on {_model.documents} documents).")
+    return _model
+
+
+def resolve_backend(setting_name: str) -> str:
+    """The embedding backend configured for a call site, falling back to 'openai' while no local model exists."""
+    global _warned_missing
+    backend = getattr(settings, setting_name, 'openai')
+    if backend != 'local':
+        return 'openai'
+    if get_local_model() is None:
+        if not _warned_missing:
+            print(f"{setting_name} is 'local' but no model was found at '{model_path()}'; "
+                  f"using OpenAI embeddings. Run `manage.py fit_local_embeddings`.")
+            _warned_missing = True
+        return 'openai'
+    return 'local'
+
+
+def embed_query(text: str) -> Optional[np.ndarray]:
+    model = get_local_model()
+    return model.embed_one(text) if model is not None else None
+
+
+def _charity_texts(since: Optional[datetime] = None):
+    from .models import Charity
+
+    qs = Charity.objects.all()
+    if since is not None:
+        qs = qs.filter(updated_at__gte=since)
+    for row in qs.values('id', *CHARITY_TEXT_FIELDS).iterator(chunk_size=500):
+        yield row['id'], charity_text(row)
+
+
+def _movement_texts(since: Optional[datetime] = None):
+    from .models import Movement
+
+    qs = Movement.objects.filter(is_active=True) if since is None else Movement.objects.filter(updated_at__gte=since)
+    for row in qs.values('id', 'is_active', *MOVEMENT_TEXT_FIELDS).iterator(chunk_size=2000):
+        yield row['id'], (movement_text(row) if row['is_active'] else None)
+
+
+def _live_ids(name: str):
+    from .models import Charity, Movement
+
+    if name == 'charity-local':
+        return set(Charity.objects.values_list('id', flat=True))
+    return set(Movement.objects.filter(is_active=True).values_list('id', flat=True))
+
+
+def _new_index(name: str) -> VectorIndex:
+    if name == 'charity-local':
+        return VectorIndex(name)
+    return IVFFlatIndex(
+        name,
+        nlist=getattr(settings, 'COMPASS_ANN_NLIST', 0),
+        nprobe=getattr(settings, 'COMPASS_ANN_NPROBE', 8),
+        min_train_size=getattr(settings, 'COMPASS_ANN_MIN_SIZE', 2000),
+    )
+
+
+_TEXT_SOURCES = {'charity-local': _charity_texts, 'movement-local': _movement_texts}
+
+
+def _build_index(name: str, model: LocalEmbeddingModel) -> Tuple[VectorIndex, datetime]:
+    index = _new_index(name)
+    watermark = timezone.now()
+    rows = _embed_rows(model, _TEXT_SOURCES[name]())
+    loaded = index.bulk_load(((item_id, vector) for item_id, vector in rows if vector is not None), normalized=True)
+    print(f"Built {name} vector index with {loaded} local embeddings.")
+    return index, watermark
+
+
+def _get_or_build(name: str) -> Optional[VectorIndex]:
+    from .vector_index import _ensure_maintenance_thread
+
+    index = _indexes.get(name)
+    if index is not None:
+        return index
+    model = get_local_model()
+    if model is None:
+        return None
+    with _lock:
+        index = _indexes.get(name)
+        if index is None:
+            index, _watermarks[name] = _build_index(name, model)
+            _indexes[name] = index
+    _ensure_maintenance_thread()
+    return index
+
+
+def get_local_charity_index() -> Optional[VectorIndex]:
+    """Return the process-wide charity index of local embeddings (None until a model is fitted)."""
+    return _get_or_build('charity-local')
+
+
+def get_local_movement_index() -> Optional[IVFFlatIndex]:
+    """Return the process-wide movement index of local embeddings (None until a model is fitted)."""
+    return _get_or_build('movement-local')
+
+
+def reload_if_refitted() -> bool:
+    """Pick up a model refitted by another process and rebuild the live local indexes from it."""
+    global _model, _model_mtime
+    mtime = _model_file_mtime()
+    if mtime is None or mtime == _model_mtime or (_model is None and not _indexes):
+        return False
+    model = LocalEmbeddingModel.load(model_path())
+    rebuilt = {name: _build_index(name, model) for name in list(_indexes)}
+    with _lock:
+        _model, _model_mtime = model, mtime
+        for name, (index, watermark) in rebuilt.items():
+            _indexes[name] = index
+            _watermarks[name] = watermark
+    print(f"Reloaded refitted local embedding model ({model.dim} dims).")
+    return True
+
+
+def sync_local_index_changes(reconcile: bool = False) -> None:
+    """Embed rows updated since the last sync into the live local indexes; with `reconcile`, drop deleted rows and compact."""
+    if reload_if_refitted():
+        return
+    model = _model
+    if model is None:
+        return
+    for name in list(_indexes):
+        index = _indexes[name]
+        started = timezone.now()
+        since = _watermarks.get(name, started) - timedelta(seconds=1)
+        index.apply(_embed_rows(model, _TEXT_SOURCES[name](since)), normalized=True)
+        _watermarks[name] = started
+        if reconcile:
+            for stale_id in index.ids() - _live_ids(name):
+                index.remove(stale_id)
+            index.compact()
+        # Trained here, in the maintenance thread, never on the search path
+        if isinstance(index, IVFFlatIndex) and index.needs_training:
+            index.train()
+
+
+# --- Model signal hooks ---
+
+def _apply_text(name: str, item_id: int, text: Optional[str]) -> None:
+    index = _indexes.get(name)
+    model = _model
+    if index is None or model is None:
+        return
+    vector = model.embed([text])[0] if text else None
+    index.apply([(item_id, vector if vector is not None and vector.any() else None)], normalized=True)
+
+
+@receiver(post_save, sender='main.Charity')
+def charity_local_index_post_save(sender, instance, **kwargs):
+    _apply_text('charity-local', instance.id, charity_text({f: getattr(instance, f) for f in CHARITY_TEXT_FIELDS}))
+
+
+@receiver(post_delete, sender='main.Charity')
+def charity_local_index_post_delete(sender, instance, **kwargs):
+    _apply_text('charity-local', instance.id, None)
+
+
+@receiver(post_save, sender='main.Movement')
+def movement_local_index_post_save(sender, instance, **kwargs):
+    text = movement_text({f: getattr(instance, f) for f in MOVEMENT_TEXT_FIELDS}) if instance.is_active else None
+    _apply_text('movement-local', instance.id, text)
+
+
+@receiver(post_delete, sender='main.Movement')
+def movement_local_index_post_delete(sender, instance, **kwargs):
+    _apply_text('movement-local', instance.id, None)
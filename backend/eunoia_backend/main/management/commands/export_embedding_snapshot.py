@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from main import embedding_snapshot
+from main.vector_index import INDEX_NAMES, IVFFlatIndex, build_index
+
+
+class Command(BaseCommand):
+    help = "Write the charity and movement embedding indexes to a versioned memory-mapped snapshot shared by web workers"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--keep',
+            type=int,
+            default=3,
+            help='Number of snapshot versions to keep on disk (default: 3)'
+        )
+
+    def handle(self, *args, **options):
+        root = embedding_snapshot.snapshot_root()
+        if root is None:
+            raise CommandError("EMBEDDING_SNAPSHOT_DIR is not configured.")
+
+        created_at = timezone.now()
+        indexes = {}
+        for name in INDEX_NAMES:
+            index, _ = build_index(name)
+            if isinstance(index, IVFFlatIndex) and index.needs_training:
+                index.train()  # ship the IVF lists so workers never train on attach
+            indexes[name] = index
+            self.stdout.write(f"{name}: {len(index)} embeddings")
+
+        version = embedding_snapshot.write_snapshot(indexes, created_at, keep=options['keep'])
+        self.stdout.write(self.style.SUCCESS(f"Published embedding snapshot {version} to {root}"))
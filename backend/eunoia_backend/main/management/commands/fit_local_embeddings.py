@@ -0,0 +1,163 @@
+import statistics
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+
+from main.local_embeddings import (
+    METHODS, LocalEmbeddingModel, _charity_texts, _movement_texts, model_path,
+)
+from main.models import Charity, Movement
+from main.vector_index import _stored_unit_vector, similarity_scores
+
+
+class Command(BaseCommand):
+    help = ("Fit (or refresh) the local scikit-learn embedding model on charity and movement text, "
+            "and compare its nearest neighbours with the OpenAI embeddings")
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--method',
+            choices=METHODS,
+            default='tfidf',
+            help='tfidf: TF-IDF + TruncatedSVD; hashing: hashing vectorizer + TruncatedSVD (default: tfidf)'
+        )
+        parser.add_argument(
+            '--dim',
+            type=int,
+            default=256,
+            help='Embedding dimensions (SVD components, default: 256)'
+        )
+        parser.add_argument(
+            '--max-features',
+            type=int,
+            default=50000,
+            help='Vocabulary size cap for the tfidf method (default: 50000)'
+        )
+        parser.add_argument(
+            '--min-df',
+            type=int,
+            default=1,
+            help='Ignore terms found in fewer documents than this (tfidf method, default: 1)'
+        )
+        parser.add_argument(
+            '--eval-sample',
+            type=int,
+            default=200,
+            help='Items per table used for the recall comparison; 0 skips it (default: 200)'
+        )
+        parser.add_argument(
+            '--top-k',
+            type=int,
+            default=10,
+            help='Neighbours compared for recall@k (default: 10)'
+        )
+        parser.add_argument(
+            '--query',
+            action='append',
+            default=[],
+            help='Also compare charity search results for this query (repeatable; embeds it with OpenAI once)'
+        )
+
+    def handle(self, *args, **options):
+        charity_rows = list(_charity_texts())
+        movement_rows = [(item_id, text) for item_id, text in _movement_texts() if text]
+        texts = [text for _, text in charity_rows + movement_rows if text]
+        if not texts:
+            raise CommandError("No charity or movement text to fit on.")
+
+        started = time.perf_counter()
+        model = LocalEmbeddingModel.fit(
+            texts, method=options['method'], dim=options['dim'],
+            max_features=options['max_features'], min_df=options['min_df'],
+        )
+        fit_seconds = time.perf_counter() - started
+        path = model_path()
+        if not path:
+            raise CommandError("LOCAL_EMBEDDING_MODEL_PATH is not configured.")
+        model.save(path)
+        self.stdout.write(
+            f"Fitted {model.method} model on {len(charity_rows)} charities and {len(movement_rows)} movements "
+            f"in {fit_seconds:.1f}s: {model.dim} dims, {model.explained_variance:.1%} variance explained."
+        )
+
+        self._report_latency(model, [text.split('\n', 1)[0] for _, text in movement_rows + charity_rows])
+        if options['eval_sample'] > 0:
+            top_k = options['top_k']
+            self._report_recall('charities', model, Charity.objects.all(), dict(charity_rows),
+                                options['eval_sample'], top_k)
+            self._report_recall('movements', model, Movement.objects.filter(is_active=True), dict(movement_rows),
+                                options['eval_sample'], top_k)
+            for query in options['query']:
+                self._report_query_recall(model, query, dict(charity_rows), top_k)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Saved local embedding model to {path}; running workers reload it on their next index sync."
+        ))
+
+    def _report_latency(self, model, queries):
+        queries = [q for q in queries if q][:500]
+        if not queries:
+            return
+        timings = []
+        for query in queries:
+            started = time.perf_counter()
+            model.embed_one(query)
+            timings.append((time.perf_counter() - started) * 1e6)
+        timings.sort()
+        p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+        self.stdout.write(f"Query embedding latency over {len(timings)} queries: "
+                          f"median {statistics.median(timings):.0f}us, p95 {p95:.0f}us")
+
+    @staticmethod
+    def _openai_vectors(queryset):
+        rows = queryset.filter(embedding__isnull=False).values_list('id', 'embedding', 'embedding_norm')
+        return {item_id: _stored_unit_vector(emb, norm) for item_id, emb, norm in rows.iterator(chunk_size=2000)}
+
+    def _report_recall(self, label, model, queryset, texts_by_id, sample_size, top_k):
+        """recall@k of each sampled item's local neighbours against its OpenAI neighbours (excluding itself)."""
+        openai_vectors = self._openai_vectors(queryset)
+        ids = [item_id for item_id in openai_vectors if texts_by_id.get(item_id)]
+        if len(ids) <= top_k:
+            self.stdout.write(f"{label}: too few items with OpenAI embeddings for recall@{top_k} ({len(ids)}).")
+            return
+        ids_array = np.asarray(ids, dtype=np.int64)
+        reference = np.vstack([openai_vectors[item_id] for item_id in ids]).astype(np.float32)
+        local = model.embed([texts_by_id[item_id] for item_id in ids])
+
+        rng = np.random.default_rng(0)
+        sample = rng.choice(len(ids), min(sample_size, len(ids)), replace=False)
+        recalls = []
+        for row in sample:
+            expected = self._neighbours(similarity_scores(reference, reference[row]), row, top_k)
+            found = self._neighbours(similarity_scores(local, local[row]), row, top_k)
+            recalls.append(len(set(ids_array[expected]) & set(ids_array[found])) / top_k)
+        self.stdout.write(f"{label}: recall@{top_k} of local vs OpenAI neighbours = {np.mean(recalls):.3f} "
+                          f"(over {len(recalls)} of {len(ids)} items)")
+
+    @staticmethod
+    def _neighbours(scores, row, top_k):
+        scores = scores.copy()
+        scores[row] = -np.inf
+        return np.argpartition(-scores, top_k - 1)[:top_k]
+
+    def _report_query_recall(self, model, query, texts_by_id, top_k):
+        from main.utils import get_query_embedding
+
+        openai_query = get_query_embedding(query)
+        local_query = model.embed_one(query)
+        if openai_query is None or local_query is None:
+            self.stdout.write(f"'{query}': could not embed with both backends.")
+            return
+        openai_vectors = self._openai_vectors(Charity.objects.all())
+        ids = [item_id for item_id in openai_vectors if texts_by_id.get(item_id)]
+        if not ids:
+            return
+        k = min(top_k, len(ids))
+        ids_array = np.asarray(ids, dtype=np.int64)
+        reference = np.vstack([openai_vectors[item_id] for item_id in ids]).astype(np.float32)
+        local = model.embed([texts_by_id[item_id] for item_id in ids])
+        unit_query = np.asarray(openai_query, dtype=np.float32) / np.linalg.norm(openai_query)
+        expected = set(ids_array[np.argsort(-similarity_scores(reference, unit_query))[:k]])
+        found = set(ids_array[np.argsort(-similarity_scores(local, local_query))[:k]])
+        self.stdout.write(f"'{query}': charity recall@{k} of local vs OpenAI = {len(expected & found) / k:.2f}")
@@ -82,6 +82,9 @@ class Command(BaseCommand):
             self.stdout.write(self.style.SUCCESS(
                 f"Research completed. Pages crawled: {result.get('pages_crawled')}"
             ))
+            if result.get('partial'):
+                self.stdout.write(self.style.WARNING(f"Partial results: {result.get('errors')}"))
+            self.stdout.write(f"Stage durations (s): {result.get('durations')}")
         else:
             self.stdout.write(self.style.WARNING(
                 f"Research failed: {result.get('error')}"
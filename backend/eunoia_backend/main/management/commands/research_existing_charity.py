@@ -1,6 +1,9 @@
 from django.core.management.base import BaseCommand
 from main.models import Charity
 from agents_sdk import launch_charity_research_in_background, research_charity_sync
+from main.utils import embedding_cache_stats
+from agents_sdk.charity_research_agents.crawl_cache import crawl_cache_stats
+from agents_sdk.charity_research_agents.crawl_governor import get_crawl_governor
 
 
 class Command(BaseCommand):
@@ -177,6 +180,22 @@ class Command(BaseCommand):
         self.stdout.write(self.style.SUCCESS(f"✅ Triggered research for {success_count} charities"))
         if error_count > 0:
             self.stdout.write(self.style.ERROR(f"❌ Failed for {error_count} charities"))
-        if not sync_mode:
+        if sync_mode:
+            stats = embedding_cache_stats()
+            self.stdout.write(
+                f"🧠 Embedding cache: {stats['hits']} hits, {stats['misses']} misses "
+                f"(hit rate {stats['hit_rate']:.0%})"
+            )
+            crawl_stats = crawl_cache_stats()
+            self.stdout.write(
+                f"🌐 Crawl cache: {crawl_stats['hits']} pages revalidated (304), {crawl_stats['misses']} downloaded; "
+                f"{crawl_stats['bytes_fetched'] / 1024:.0f} KiB fetched, {crawl_stats['bytes_reused'] / 1024:.0f} KiB reused"
+            )
+            governor_stats = get_crawl_governor().stats()
+            self.stdout.write(
+                f"🚦 Crawl governor: {governor_stats['requests']} requests, {governor_stats['throttled']} throttled "
+                f"(429/503), {governor_stats['waited_seconds']:.1f}s queued"
+            )
+        else:
             self.stdout.write("\n💡 Research is running in background. Check logs for progress.")
 
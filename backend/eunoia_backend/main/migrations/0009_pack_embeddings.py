@@ -0,0 +1,90 @@
+# Converts Charity.embedding and Movement.embedding from JSON float lists to packed float32 bytes.
+
+import numpy as np
+from django.db import migrations
+
+import main.fields
+
+CHUNK_SIZE = 500
+
+
+def _is_float_list(value) -> bool:
+    return isinstance(value, list) and len(value) > 0 and all(isinstance(v, (int, float)) for v in value)
+
+
+def _convert_in_chunks(model, source: str, target: str, convert) -> None:
+    # Keyset pagination so each chunk is a short read followed by one bulk_update
+    last_id = 0
+    while True:
+        rows = list(
+            model.objects
+            .filter(id__gt=last_id)
+            .exclude(**{f"{source}__isnull": True})
+            .order_by('id')
+            .only('id', source)[:CHUNK_SIZE]
+        )
+        if not rows:
+            break
+        for row in rows:
+            setattr(row, target, convert(getattr(row, source)))
+        model.objects.bulk_update(rows, [target], batch_size=CHUNK_SIZE)
+        last_id = rows[-1].id
+
+
+def _pack(value):
+    return np.asarray(value, dtype='<f4') if _is_float_list(value) else None
+
+
+def _unpack(value):
+    return [float(v) for v in value] if value is not None else None
+
+
+def pack_embeddings(apps, schema_editor):
+    for model_name in ('Charity', 'Movement'):
+        model = apps.get_model('main', model_name)
+        _convert_in_chunks(model, 'embedding', 'embedding_packed', _pack)
+
+
+def unpack_embeddings(apps, schema_editor):
+    for model_name in ('Charity', 'Movement'):
+        model = apps.get_model('main', model_name)
+        _convert_in_chunks(model, 'embedding_packed', 'embedding', _unpack)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0008_movement_embedding'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='charity',
+            name='embedding_packed',
+            field=main.fields.EmbeddingField(blank=True, null=True, help_text='Embedding of the charity description (packed float32)'),
+        ),
+        migrations.AddField(
+            model_name='movement',
+            name='embedding_packed',
+            field=main.fields.EmbeddingField(blank=True, null=True, help_text='Embedding of the movement summary for semantic matching (packed float32)'),
+        ),
+        migrations.RunPython(pack_embeddings, unpack_embeddings),
+        migrations.RemoveField(
+            model_name='charity',
+            name='embedding',
+        ),
+        migrations.RemoveField(
+            model_name='movement',
+            name='embedding',
+        ),
+        migrations.RenameField(
+            model_name='charity',
+            old_name='embedding_packed',
+            new_name='embedding',
+        ),
+        migrations.RenameField(
+            model_name='movement',
+            old_name='embedding_packed',
+            new_name='embedding',
+        ),
+    ]
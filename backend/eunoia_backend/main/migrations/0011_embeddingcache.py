@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:43
+
+import main.fields
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0010_charity_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EmbeddingCache',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model_name', models.CharField(max_length=100)),
+                ('text_hash', models.CharField(max_length=64)),
+                ('embedding', main.fields.EmbeddingField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Embedding Cache Entry',
+                'verbose_name_plural': 'Embedding Cache',
+                'unique_together': {('model_name', 'text_hash')},
+            },
+        ),
+    ]
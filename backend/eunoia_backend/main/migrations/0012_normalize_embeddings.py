@@ -0,0 +1,82 @@
+# Stores Charity and Movement embeddings unit-length, recording each vector's original norm.
+
+import numpy as np
+from django.db import migrations, models
+
+import main.fields
+
+CHUNK_SIZE = 500
+
+
+def _rescale_in_chunks(model, only_normalized: bool, rescale) -> None:
+    # Keyset pagination, as in 0009_pack_embeddings
+    last_id = 0
+    while True:
+        rows = list(
+            model.objects
+            .filter(id__gt=last_id, embedding__isnull=False, embedding_norm__isnull=not only_normalized)
+            .order_by('id')
+            .only('id', 'embedding', 'embedding_norm')[:CHUNK_SIZE]
+        )
+        if not rows:
+            break
+        for row in rows:
+            rescale(row)
+        # bulk_update skips EmbeddingField.pre_save, so rows are rescaled explicitly above
+        model.objects.bulk_update(rows, ['embedding', 'embedding_norm'], batch_size=CHUNK_SIZE)
+        last_id = rows[-1].id
+
+
+def _normalize(row) -> None:
+    vector = np.asarray(row.embedding, dtype='<f4')
+    norm = float(np.linalg.norm(vector))
+    if norm == 0.0 or not np.isfinite(norm):
+        row.embedding, row.embedding_norm = None, None
+    else:
+        row.embedding, row.embedding_norm = vector / norm, norm
+
+
+def _denormalize(row) -> None:
+    row.embedding = np.asarray(row.embedding, dtype='<f4') * row.embedding_norm
+    row.embedding_norm = None
+
+
+def normalize_embeddings(apps, schema_editor):
+    for model_name in ('Charity', 'Movement'):
+        _rescale_in_chunks(apps.get_model('main', model_name), only_normalized=False, rescale=_normalize)
+
+
+def denormalize_embeddings(apps, schema_editor):
+    for model_name in ('Charity', 'Movement'):
+        _rescale_in_chunks(apps.get_model('main', model_name), only_normalized=True, rescale=_denormalize)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0011_embeddingcache'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='charity',
+            name='embedding_norm',
+            field=models.FloatField(blank=True, editable=False, help_text='L2 norm of the embedding before normalization; set means the stored vector is unit length', null=True),
+        ),
+        migrations.AddField(
+            model_name='movement',
+            name='embedding_norm',
+            field=models.FloatField(blank=True, editable=False, help_text='L2 norm of the embedding before normalization; set means the stored vector is unit length', null=True),
+        ),
+        migrations.AlterField(
+            model_name='charity',
+            name='embedding',
+            field=main.fields.EmbeddingField(blank=True, help_text='Embedding of the charity description (packed float32, unit length)', norm_field='embedding_norm', null=True),
+        ),
+        migrations.AlterField(
+            model_name='movement',
+            name='embedding',
+            field=main.fields.EmbeddingField(blank=True, help_text='Embedding of the movement summary for semantic matching (packed float32, unit length)', norm_field='embedding_norm', null=True),
+        ),
+        migrations.RunPython(normalize_embeddings, denormalize_embeddings),
+    ]
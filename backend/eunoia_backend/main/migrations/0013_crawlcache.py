@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0012_normalize_embeddings'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CrawlCache',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('url_hash', models.CharField(max_length=64, unique=True)),
+                ('url', models.TextField()),
+                ('body', models.BinaryField(help_text='zlib-compressed UTF-8 page body')),
+                ('content_type', models.CharField(blank=True, max_length=255)),
+                ('etag', models.CharField(blank=True, max_length=512)),
+                ('last_modified', models.CharField(blank=True, max_length=64)),
+                ('content_hash', models.CharField(help_text='SHA-256 of the uncompressed body', max_length=64)),
+                ('fetched_at', models.DateTimeField(help_text='Last full (200) download')),
+                ('validated_at', models.DateTimeField(help_text='Last time the server confirmed the body (200 or 304)')),
+            ],
+            options={
+                'verbose_name': 'Crawl Cache Entry',
+                'verbose_name_plural': 'Crawl Cache',
+            },
+        ),
+    ]
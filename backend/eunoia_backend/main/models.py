@@ -11,6 +11,8 @@ Author: Eunoia Team
 from django.db import models
 from django.utils.translation import gettext_lazy as _
 
+from .fields import EmbeddingField
+
 class Charity(models.Model):
     """
     Represents a charitable organization in the Eunoia platform.
@@ -29,9 +31,11 @@ class Charity(models.Model):
     logo = models.ImageField(upload_to='charity_logos/', blank=True, null=True)
     is_verified = models.BooleanField(default=False)
     date_registered = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     extracted_text_data = models.TextField(blank=True, null=True, help_text="Raw text extracted from the charity's website")
-    embedding = models.JSONField(blank=True, null=True, help_text="Embedding of the charity description")
+    embedding = EmbeddingField(blank=True, null=True, norm_field='embedding_norm', help_text="Embedding of the charity description (packed float32, unit length)")
+    embedding_norm = models.FloatField(blank=True, null=True, editable=False, help_text="L2 norm of the embedding before normalization; set means the stored vector is unit length")
     keywords = models.JSONField(blank=True, null=True, help_text="Keywords describing the charity's focus, extracted by AI")
 
     # New fields
@@ -180,15 +184,82 @@ class Movement(models.Model):
     start_date = models.DateField(blank=True, null=True)
     source_urls = models.JSONField(blank=True, null=True, default=list)
     confidence_score = models.DecimalField(max_digits=4, decimal_places=3, blank=True, null=True)
-    embedding = models.JSONField(blank=True, null=True, help_text="Embedding of the movement summary for semantic matching")
+    embedding = EmbeddingField(blank=True, null=True, norm_field='embedding_norm', help_text="Embedding of the movement summary for semantic matching (packed float32, unit length)")
+    embedding_norm = models.FloatField(blank=True, null=True, editable=False, help_text="L2 norm of the embedding before normalization; set means the stored vector is unit length")
     is_active = models.BooleanField(default=True)
     last_seen = models.DateTimeField(auto_now=True)
     created_at = models.DateTimeField(auto_now_add=True)
-    updated_at = models.DateTimeField(auto_now=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     def __str__(self):
         return f"{self.title} ({self.charity.name})"
 
     class Meta:
         unique_together = ('charity', 'slug')
-        ordering = ['charity', '-created_at']
\ No newline at end of file
+        ordering = ['charity', '-created_at']
+
+class EmbeddingCache(models.Model):
+    """
+    Content-addressed cache of embedding vectors.
+
+    Keyed by (embedding model, SHA-256 of the whitespace-normalized text), so
+    unchanged charity and movement texts are never sent to the embeddings API twice.
+    """
+    model_name = models.CharField(max_length=100)
+    text_hash = models.CharField(max_length=64)
+    embedding = EmbeddingField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.model_name}:{self.text_hash[:12]}"
+
+    class Meta:
+        verbose_name = _("Embedding Cache Entry")
+        verbose_name_plural = _("Embedding Cache")
+        unique_together = ('model_name', 'text_hash')
+
+class CrawlCache(models.Model):
+    """
+    Persistent HTTP cache for the charity website crawler.
+
+    Keyed by SHA-256 of the canonical URL. Page bodies are stored
+    zlib-compressed with the ETag / Last-Modified validators, so a re-crawl
+    sends a conditional request and unchanged pages come back as a bodyless 304.
+    """
+    url_hash = models.CharField(max_length=64, unique=True)
+    url = models.TextField()
+    body = models.BinaryField(help_text="zlib-compressed UTF-8 page body")
+    content_type = models.CharField(max_length=255, blank=True)
+    etag = models.CharField(max_length=512, blank=True)
+    last_modified = models.CharField(max_length=64, blank=True)
+    content_hash = models.CharField(max_length=64, help_text="SHA-256 of the uncompressed body")
+    fetched_at = models.DateTimeField(help_text="Last full (200) download")
+    validated_at = models.DateTimeField(help_text="Last time the server confirmed the body (200 or 304)")
+
+    def __str__(self):
+        return self.url
+
+    class Meta:
+        verbose_name = _("Crawl Cache Entry")
+        verbose_name_plural = _("Crawl Cache")
+
+class MissionToken(models.Model):
+    """
+    Deferred combined mission statement for one semantic search response.
+
+    The search returns the token straight away and the statement is written
+    here once generated, so whichever worker serves CombinedMissionView can
+    resolve it. `statement` stays NULL while generation is pending; tokens
+    older than MISSION_TOKEN_TTL are treated as expired and pruned.
+    """
+    token = models.CharField(max_length=64, unique=True)
+    statement = models.TextField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return self.token
+
+    class Meta:
+        verbose_name = _("Mission Token")
+        verbose_name_plural = _("Mission Tokens")
@@ -0,0 +1,262 @@
+"""
+Deterministic offline stand-in for the OpenAI API, for load testing.
+
+With LLM_PROVIDER = 'offline' the shared client (main/openai_client.py) is
+built on OfflineTransport instead of the network, so every call site -
+embeddings, the Responses API tool calls in main.utils and the Agents SDK
+runs - gets a local answer without code changes:
+
+- /embeddings: unit vectors built from hash-seeded per-token vectors, so equal
+  texts embed identically and texts sharing words land close together;
+- /responses: schema-valid output for the requested tool (CharityInfo,
+  EnhancedQuery, CombinedCharityMission) or structured output format
+  (CharityProfile, MovementAnalysisResult, CompassRecommendationList),
+  generated from the JSON schema and seeded by the request content.
+
+Latency is injected per call (OFFLINE_LLM_LATENCY, OFFLINE_EMBEDDING_LATENCY,
+OFFLINE_LATENCY_JITTER) so end-to-end timings include a realistic model wait
+while everything else measured is our own overhead.
+"""
+
+import asyncio
+import base64
+import hashlib
+import json
+import random
+import re
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+
+import httpx
+import numpy as np
+from django.conf import settings
+
+WORD_RE = re.compile(r"[A-Za-z][A-Za-z-]{3,}")
+MOVEMENT_ID_RE = re.compile(r'"movement_id"\s*:\s*(\d+)')
+
+CATEGORY_CODES = ["ENV", "EDU", "HEA", "ANI", "ART", "HUM", "COM", "DIS", "OTH"]
+
+FALLBACK_VOCABULARY = [
+    "community", "education", "health", "water", "climate", "children", "relief",
+    "support", "access", "local", "families", "programs", "impact", "wellbeing",
+]
+
+# Property-name fragments that get a sentence / a short phrase when generating strings
+LONG_TEXT_FIELDS = ('summary', 'reason', 'statement', 'description')
+SHORT_TEXT_FIELDS = ('title', 'name', 'tagline', 'query', 'geography', 'country', 'person')
+
+
+def _seed(*parts: str) -> int:
+    digest = hashlib.sha256("\x1f".join(parts).encode('utf-8')).digest()
+    return int.from_bytes(digest[:8], 'little')
+
+
+@lru_cache(maxsize=50_000)
+def _token_vector(token: str, dim: int) -> np.ndarray:
+    vector = np.random.default_rng(_seed('token', token)).standard_normal(dim).astype(np.float32)
+    vector.setflags(write=False)
+    return vector
+
+
+def offline_embedding(text: str, dim: int) -> np.ndarray:
+    """Deterministic unit embedding: the normalized sum of hash-seeded token vectors."""
+    tokens = re.findall(r"[a-z0-9]+", (text or "").lower())
+    if tokens:
+        vector = np.sum([_token_vector(t, dim) for t in tokens], axis=0)
+    else:
+        vector = _token_vector(text or "", dim).copy()
+    norm = float(np.linalg.norm(vector))
+    return vector / norm if norm else vector
+
+
+def _collect_text(value: Any, out: List[str]) -> None:
+    if isinstance(value, str):
+        out.append(value)
+    elif isinstance(value, dict):
+        for key in ('text', 'content', 'input', 'instructions', 'output'):
+            if key in value:
+                _collect_text(value[key], out)
+    elif isinstance(value, list):
+        for item in value:
+            _collect_text(item, out)
+
+
+class SchemaSampler:
+    """Builds a JSON instance that validates against a (pydantic-generated) JSON schema."""
+
+    def __init__(self, root_schema: Dict[str, Any], rng: random.Random, context: str):
+        self.root = root_schema
+        self.rng = rng
+        self.context = context
+        # Words come from the request input, so generated text stays on-topic
+        words = [w.lower() for w in WORD_RE.findall(context)]
+        self.vocabulary = list(dict.fromkeys(words))[:500] or FALLBACK_VOCABULARY
+        self.movement_ids = [int(m) for m in MOVEMENT_ID_RE.findall(context)]
+
+    def _resolve(self, schema: Dict[str, Any]) -> Dict[str, Any]:
+        ref = schema.get('$ref')
+        while ref:
+            node: Any = self.root
+            for part in ref.lstrip('#/').split('/'):
+                node = node[part]
+            schema = node
+            ref = schema.get('$ref')
+        return schema
+
+    def _words(self, count: int) -> str:
+        return " ".join(self.rng.choice(self.vocabulary) for _ in range(count))
+
+    def sample(self, schema: Dict[str, Any], name: str = "") -> Any:
+        schema = self._resolve(schema)
+        for key in ('anyOf', 'oneOf'):
+            if key in schema:
+                options = [s for s in schema[key] if self._resolve(s).get('type') != 'null'] or schema[key]
+                return self.sample(options[0], name)
+        if 'allOf' in schema:
+            return self.sample(schema['allOf'][0], name)
+        if 'enum' in schema:
+            return self.rng.choice(schema['enum'])
+        if 'const' in schema:
+            return schema['const']
+
+        kind = schema.get('type')
+        if isinstance(kind, list):
+            kind = next((k for k in kind if k != 'null'), 'null')
+        if kind == 'object' or 'properties' in schema:
+            return {prop: self.sample(sub, prop) for prop, sub in schema.get('properties', {}).items()}
+        if kind == 'array':
+            low = schema.get('minItems', 0)
+            high = schema.get('maxItems', max(low, 6 if name == 'keywords' else 3))
+            count = max(low, min(high, 5 if name == 'keywords' else 3))
+            return [self.sample(schema.get('items', {}), name.rstrip('s')) for _ in range(count)]
+        if kind == 'integer':
+            if name.endswith('_id') and self.movement_ids:
+                return self.rng.choice(self.movement_ids)
+            if 'year' in name:
+                return self.rng.randint(1950, 2020)
+            return self.rng.randint(schema.get('minimum', 1), schema.get('maximum', 100))
+        if kind == 'number':
+            low, high = schema.get('minimum', 0.0), schema.get('maximum', 1.0)
+            if 'score' in name or 'confidence' in name:
+                low = max(low, 0.5)
+            return round(self.rng.uniform(low, high), 3)
+        if kind == 'boolean':
+            return self.rng.random() < 0.5
+        if kind == 'null':
+            return None
+        return self._string(name)
+
+    def _string(self, name: str) -> str:
+        if 'category' in name:
+            return self.rng.choice(CATEGORY_CODES)
+        if 'date' in name:
+            return str(self.rng.randint(2000, 2024))
+        if 'url' in name:
+            return f"https://example.org/{self._words(2).replace(' ', '-')}"
+        if any(part in name for part in LONG_TEXT_FIELDS):
+            return self._words(24).capitalize() + "."
+        if any(part in name for part in SHORT_TEXT_FIELDS):
+            return self._words(4).title()
+        return self._words(3)
+
+
+class OfflineTransport(httpx.AsyncBaseTransport):
+    """httpx transport answering OpenAI API requests locally and deterministically."""
+
+    def __init__(self, llm_latency: float = 0.5, embedding_latency: float = 0.05,
+                 jitter: float = 0.2, embedding_dim: int = 1536):
+        self.llm_latency = llm_latency
+        self.embedding_latency = embedding_latency
+        self.jitter = jitter
+        self.embedding_dim = embedding_dim
+
+    async def _sleep(self, base: float) -> None:
+        if base > 0:
+            await asyncio.sleep(base * (1.0 + random.uniform(-self.jitter, self.jitter)))
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        body = json.loads(request.content or b'{}') if request.method == 'POST' else {}
+        path = request.url.path
+        if path.endswith('/embeddings'):
+            await self._sleep(self.embedding_latency)
+            return httpx.Response(200, json=self._embeddings(body))
+        if path.endswith('/responses'):
+            await self._sleep(self.llm_latency)
+            return httpx.Response(200, json=self._response(body))
+        return httpx.Response(404, json={"error": {"message": f"Offline provider does not implement {path}", "type": "invalid_request_error"}})
+
+    def _embeddings(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        texts = body.get('input', [])
+        if isinstance(texts, str):
+            texts = [texts]
+        as_base64 = body.get('encoding_format') == 'base64'
+        data = []
+        for index, text in enumerate(texts):
+            vector = offline_embedding(str(text), self.embedding_dim).astype('<f4')
+            embedding = base64.b64encode(vector.tobytes()).decode('ascii') if as_base64 else vector.tolist()
+            data.append({"object": "embedding", "index": index, "embedding": embedding})
+        tokens = sum(len(str(t).split()) for t in texts)
+        return {
+            "object": "list", "data": data, "model": body.get('model', 'offline'),
+            "usage": {"prompt_tokens": tokens, "total_tokens": tokens},
+        }
+
+    def _response(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        texts: List[str] = []
+        _collect_text(body.get('input'), texts)
+        context = "\n".join(texts)
+        model = body.get('model', 'offline')
+        request_id = hashlib.sha256(f"{model}\x1f{context}".encode('utf-8')).hexdigest()[:24]
+        rng = random.Random(_seed(model, context))
+
+        tool = self._requested_tool(body)
+        text_format = (body.get('text') or {}).get('format') or {}
+        if tool is not None:
+            arguments = SchemaSampler(tool.get('parameters') or {}, rng, context).sample(tool.get('parameters') or {})
+            output = [{
+                "type": "function_call", "id": f"fc_{request_id}", "call_id": f"call_{request_id}",
+                "name": tool['name'], "arguments": json.dumps(arguments), "status": "completed",
+            }]
+        else:
+            if text_format.get('type') == 'json_schema':
+                schema = text_format.get('schema') or {}
+                text = json.dumps(SchemaSampler(schema, rng, context).sample(schema))
+            else:
+                text = SchemaSampler({}, rng, context)._words(20).capitalize() + "."
+            output = [{
+                "type": "message", "id": f"msg_{request_id}", "role": "assistant", "status": "completed",
+                "content": [{"type": "output_text", "text": text, "annotations": []}],
+            }]
+
+        input_tokens = len(context.split())
+        output_tokens = len(json.dumps(output).split())
+        return {
+            "id": f"resp_{request_id}", "object": "response", "created_at": 0, "model": model,
+            "status": "completed", "output": output, "parallel_tool_calls": True,
+            "tool_choice": body.get('tool_choice', 'auto'), "tools": [],
+            "usage": {
+                "input_tokens": input_tokens, "output_tokens": output_tokens,
+                "total_tokens": input_tokens + output_tokens,
+                "input_tokens_details": {"cached_tokens": 0},
+                "output_tokens_details": {"reasoning_tokens": 0},
+            },
+        }
+
+    @staticmethod
+    def _requested_tool(body: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        tools = [t for t in body.get('tools') or [] if t.get('type') == 'function']
+        if not tools:
+            return None
+        choice = body.get('tool_choice')
+        if isinstance(choice, dict) and choice.get('name'):
+            return next((t for t in tools if t.get('name') == choice['name']), tools[0])
+        return tools[0] if choice == 'required' else None
+
+
+def build_offline_transport() -> OfflineTransport:
+    return OfflineTransport(
+        llm_latency=getattr(settings, 'OFFLINE_LLM_LATENCY', 0.5),
+        embedding_latency=getattr(settings, 'OFFLINE_EMBEDDING_LATENCY', 0.05),
+        jitter=getattr(settings, 'OFFLINE_LATENCY_JITTER', 0.2),
+        embedding_dim=getattr(settings, 'OFFLINE_EMBEDDING_DIM', 1536),
+    )
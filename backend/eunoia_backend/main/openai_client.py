@@ -0,0 +1,154 @@
+"""
+Process-wide async OpenAI client.
+
+Every LLM and embedding call in the backend goes through one
+`openai.AsyncOpenAI` backed by a bounded, keep-alive (HTTP/2 when `h2` is
+installed) httpx connection pool. The client lives on a persistent event
+loop running in a daemon thread, so connections and TLS sessions survive
+between requests instead of dying with a per-call event loop:
+
+- synchronous code (views, signals, management commands) calls `run_sync(coro)`;
+- coroutines on another loop (ASGI views) use `await run_async(coro)`;
+- the Agents SDK is pointed at the same client, so agent runs scheduled with
+  `run_sync` share the pool too.
+
+Per-call timeouts: `get_async_client(timeout=...)` returns a view of the same
+client with a different timeout (see OPENAI_*_TIMEOUT settings).
+
+LLM_PROVIDER = 'offline' swaps the network for the deterministic local stand-in
+in main/offline_provider.py (no API key needed), for load testing.
+"""
+
+import asyncio
+import os
+import threading
+from typing import Any, Awaitable, Optional
+
+import httpx
+import openai
+from django.conf import settings
+
+try:
+    import h2  # noqa: F401  (enables HTTP/2 in httpx)
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_loop_thread: Optional[threading.Thread] = None
+_client: Optional[openai.AsyncOpenAI] = None
+_client_error: Optional[str] = None
+_lock = threading.Lock()
+
+
+def is_offline() -> bool:
+    return getattr(settings, 'LLM_PROVIDER', 'openai') == 'offline'
+
+
+def _api_key() -> Optional[str]:
+    if is_offline():
+        return 'offline'
+    return os.getenv("OPENAI_API_KEY") or getattr(settings, 'OPENAI_API_KEY', None)
+
+
+def _build_http_client() -> httpx.AsyncClient:
+    if is_offline():
+        from .offline_provider import build_offline_transport
+        return httpx.AsyncClient(transport=build_offline_transport())
+    limits = httpx.Limits(
+        max_connections=getattr(settings, 'OPENAI_MAX_CONNECTIONS', 20),
+        max_keepalive_connections=getattr(settings, 'OPENAI_MAX_KEEPALIVE_CONNECTIONS', 10),
+        keepalive_expiry=getattr(settings, 'OPENAI_KEEPALIVE_EXPIRY', 60),
+    )
+    timeout = httpx.Timeout(
+        getattr(settings, 'OPENAI_TIMEOUT', 60),
+        connect=getattr(settings, 'OPENAI_CONNECT_TIMEOUT', 5),
+    )
+    http2 = getattr(settings, 'OPENAI_HTTP2', True) and HTTP2_AVAILABLE
+    return httpx.AsyncClient(limits=limits, timeout=timeout, http2=http2)
+
+
+def _create_client() -> Optional[openai.AsyncOpenAI]:
+    global _client_error
+    api_key = _api_key()
+    if not api_key:
+        _client_error = "OPENAI_API_KEY not found in environment variables or Django settings."
+        return None
+    client = openai.AsyncOpenAI(
+        api_key=api_key,
+        http_client=_build_http_client(),
+        timeout=getattr(settings, 'OPENAI_TIMEOUT', 60),
+        max_retries=getattr(settings, 'OPENAI_MAX_RETRIES', 2),
+    )
+    try:
+        from agents import set_default_openai_client
+        set_default_openai_client(client, use_for_tracing=False)
+    except ImportError:
+        pass
+    return client
+
+
+def get_async_client(timeout: Optional[float] = None) -> Optional[openai.AsyncOpenAI]:
+    """
+    Return the shared AsyncOpenAI client (None if no API key is configured).
+
+    With `timeout`, returns a copy that shares the connection pool but uses
+    that per-call timeout. Only await its calls on the shared loop.
+    """
+    global _client
+    if _client is None and _client_error is None:
+        with _lock:
+            if _client is None and _client_error is None:
+                _client = _create_client()
+    if _client is None or timeout is None:
+        return _client
+    return _client.with_options(timeout=timeout)
+
+
+def client_error() -> Optional[str]:
+    """Why the shared client could not be created, if it could not."""
+    return _client_error
+
+
+def get_loop() -> asyncio.AbstractEventLoop:
+    """Return the persistent event loop the shared client runs on, starting its thread on first use."""
+    global _loop, _loop_thread
+    if _loop is not None and _loop_thread is not None and _loop_thread.is_alive():
+        return _loop
+    with _lock:
+        if _loop is None or _loop_thread is None or not _loop_thread.is_alive():
+            loop = asyncio.new_event_loop()
+            ready = threading.Event()
+
+            def _serve():
+                asyncio.set_event_loop(loop)
+                loop.call_soon(ready.set)
+                loop.run_forever()
+
+            _loop_thread = threading.Thread(target=_serve, name='openai-event-loop', daemon=True)
+            _loop_thread.start()
+            ready.wait()
+            _loop = loop
+    return _loop
+
+
+def run_sync(coro: Awaitable[Any], timeout: Optional[float] = None) -> Any:
+    """
+    Run `coro` on the shared loop and block until it finishes.
+
+    Must not be called from the loop thread itself (that would deadlock);
+    coroutines already on the loop should simply await.
+    """
+    loop = get_loop()
+    if threading.current_thread() is _loop_thread:
+        coro.close()
+        raise RuntimeError("run_sync() called from the shared OpenAI event loop; await the coroutine instead.")
+    return asyncio.run_coroutine_threadsafe(coro, loop).result(timeout)
+
+
+async def run_async(coro: Awaitable[Any]) -> Any:
+    """Await `coro` on the shared loop from any other event loop."""
+    loop = get_loop()
+    if asyncio.get_running_loop() is loop:
+        return await coro
+    return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, loop))
@@ -12,10 +12,10 @@ class CharitySerializer(serializers.ModelSerializer):
             'aptos_wallet_address', 'polkadot_wallet_address', 
             'website_url', 'contact_email', 'logo', 'logo_url',
             'is_verified', 'date_registered', 'extracted_text_data', 
-            'embedding', 'keywords', 'category', 'category_display',
+            'keywords', 'category', 'category_display',
             'country_of_operation', 'year_founded', 'contact_person', 'tagline'
         ]
-        read_only_fields = ['embedding', 'extracted_text_data', 'is_verified', 'date_registered', 'keywords']
+        read_only_fields = ['extracted_text_data', 'is_verified', 'date_registered', 'keywords']
 
     def get_logo_url(self, obj):
         request = self.context.get('request')
@@ -71,7 +71,7 @@ class MovementSerializer(serializers.ModelSerializer):
         model = Movement
         fields = [
             'id', 'charity', 'charity_name', 'title', 'slug', 'summary', 'category',
-            'geography', 'start_date', 'source_urls', 'confidence_score', 'embedding', 'is_active',
+            'geography', 'start_date', 'source_urls', 'confidence_score', 'is_active',
             'last_seen', 'created_at', 'updated_at'
         ]
         read_only_fields = ['last_seen', 'created_at', 'updated_at']
\ No newline at end of file
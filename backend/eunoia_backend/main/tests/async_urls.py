@@ -0,0 +1,14 @@
+# The async views as routed when ASYNC_API_VIEWS is on (see main/urls.py)
+from django.urls import include, path
+
+from main import api_views, async_views
+
+main_patterns = [
+    path('api/charity-semantic-search/', async_views.AsyncCharitySemanticSearchView.as_view(), name='charity-semantic-search'),
+    path('api/charity-semantic-search/mission/<str:token>/', api_views.CombinedMissionView.as_view(), name='charity-search-mission'),
+    path('api/compass/match/', async_views.AsyncCompassMatchView.as_view(), name='compass-match'),
+]
+
+urlpatterns = [
+    path('', include((main_patterns, 'main'), namespace='main')),
+]
@@ -0,0 +1,135 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from main import api_views, utils
+from main.cache import TTLCache
+from main.models import MissionToken
+from main.utils import CombinedCharityMission, DEFAULT_RESONATING_STATEMENT
+
+from .test_fields import create_charity
+
+SEARCH_INFO = {'query_path': 'enhanced', 'search_query': "safe drinking water",
+               'semantic_candidates': 1, 'lexical_candidates': 1}
+
+
+def mission_url(token):
+    return reverse('main:charity-search-mission', args=[token])
+
+
+def wait_for_mission(token):
+    job = utils._mission_jobs.get(token)
+    if job is not None:  # finished jobs are already forgotten
+        job.result(timeout=5)
+
+
+class CombinedMissionViewTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_ready_token_returns_the_statement(self):
+        MissionToken.objects.create(token="ready", statement="Water for everyone.")
+        response = self.client.get(mission_url("ready"))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {"status": "ready", "combined_mission": "Water for everyone."})
+
+    def test_pending_token_returns_202_with_retry_after(self):
+        MissionToken.objects.create(token="pending")
+        response = self.client.get(mission_url("pending"))
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.json(), {"status": "pending"})
+        self.assertEqual(response['Retry-After'], str(utils.MISSION_RETRY_AFTER))
+
+    @override_settings(MISSION_TOKEN_TTL=600)
+    def test_unknown_and_expired_tokens_return_404(self):
+        MissionToken.objects.create(token="old", statement="Stale.")
+        MissionToken.objects.filter(token="old").update(created_at=timezone.now() - timedelta(seconds=601))
+        for token in ("missing", "old"):
+            self.assertEqual(self.client.get(mission_url(token)).status_code, 404)
+
+        MissionToken.objects.create(token="fresh")
+        self.assertEqual(utils.prune_expired_mission_tokens(), 1)
+        self.assertEqual(list(MissionToken.objects.values_list('token', flat=True)), ["fresh"])
+
+
+class SemanticSearchMissionTests(TransactionTestCase):
+    """The search response carries a mission token unless the statement is already cached."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.charity = create_charity(name="Water Aid", description="Clean water for villages.")
+        for patcher in (
+            mock.patch.object(utils, 'mission_statement_cache', TTLCache('test')),
+            mock.patch.object(api_views, 'hybrid_charity_search', return_value=([self.charity], SEARCH_INFO)),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def search(self):
+        return self.client.get(reverse('main:charity-semantic-search'), {'query': "clean water"})
+
+    def test_search_without_query_is_rejected(self):
+        self.assertEqual(self.client.get(reverse('main:charity-semantic-search')).status_code, 400)
+
+    def test_token_resolves_and_repeat_search_is_inlined(self):
+        generate = mock.AsyncMock(return_value=CombinedCharityMission(resonating_statement="Water for everyone."))
+        with mock.patch.object(utils, 'generate_combined_mission_statement_async', generate):
+            response = self.search()
+            self.assertEqual(response.status_code, 200)
+            body = response.json()
+            self.assertEqual([c['id'] for c in body['matched_charities']], [self.charity.id])
+            self.assertEqual(body['combined_mission'], DEFAULT_RESONATING_STATEMENT)
+            self.assertEqual(body['query_path'], 'enhanced')
+            token = body['mission_token']
+            self.assertTrue(body['mission_url'].endswith(mission_url(token)))
+
+            wait_for_mission(token)
+            response = self.client.get(mission_url(token))
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.json()['combined_mission'], "Water for everyone.")
+
+            body = self.search().json()
+        self.assertEqual(body['combined_mission'], "Water for everyone.")
+        self.assertIsNone(body['mission_token'])
+        self.assertIsNone(body['mission_url'])
+        self.assertEqual(MissionToken.objects.count(), 1)
+        generate.assert_awaited_once()
+
+    def test_failed_generation_resolves_to_the_default_statement(self):
+        with mock.patch.object(utils, 'generate_combined_mission_statement_async', mock.AsyncMock(return_value=None)):
+            token = self.search().json()['mission_token']
+            wait_for_mission(token)
+            self.assertEqual(self.client.get(mission_url(token)).json()['combined_mission'],
+                             DEFAULT_RESONATING_STATEMENT)
+            retry_token = self.search().json()['mission_token']  # failures are not cached
+            self.assertIsNotNone(retry_token)
+            wait_for_mission(retry_token)
+
+
+class MissionCacheTests(SimpleTestCase):
+    charities = [{'id': 2, 'name': "Water Aid", 'description': "Wells."}, {'id': 1, 'name': "Book Bus", 'description': ""}]
+
+    def setUp(self):
+        patcher = mock.patch.object(utils, 'mission_statement_cache', TTLCache('test'))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_key_ignores_order_and_query_formatting(self):
+        key = utils._mission_cache_key("Clean  Water", self.charities)
+        self.assertEqual(key, utils._mission_cache_key("clean water", list(reversed(self.charities))))
+        self.assertEqual(key[:2], ("clean water", (1, 2)))
+        self.assertIsNone(utils._mission_cache_key("clean water", [{'name': "No id"}]))
+
+    def test_edited_charity_misses_the_cached_statement(self):
+        utils.mission_statement_cache.set(utils._mission_cache_key("clean water", self.charities), "Water for all.")
+        self.assertEqual(utils.cached_combined_mission("Clean water", self.charities), "Water for all.")
+        edited = [dict(self.charities[0], description="Wells and rainwater tanks."), self.charities[1]]
+        self.assertIsNone(utils.cached_combined_mission("clean water", edited))
+        self.assertIsNone(utils.cached_combined_mission("clean water", self.charities[:1]))
+
+    def test_no_charities_needs_no_generation(self):
+        self.assertEqual(utils.cached_combined_mission("clean water", []), DEFAULT_RESONATING_STATEMENT)
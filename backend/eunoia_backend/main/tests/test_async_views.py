@@ -0,0 +1,82 @@
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from main import async_views, utils
+from main.cache import TTLCache
+
+from .test_api import SEARCH_INFO
+from .test_fields import create_charity
+
+
+@override_settings(ROOT_URLCONF='main.tests.async_urls')
+class AsyncSemanticSearchViewTests(TestCase):
+    def setUp(self):
+        self.charity = create_charity(name="Water Aid", description="Clean water for villages.")
+        cache = TTLCache('test')
+        charities_data = [{'id': self.charity.id, 'name': self.charity.name, 'description': self.charity.description}]
+        cache.set(utils._mission_cache_key("clean water", charities_data), "Water for everyone.")
+        search = mock.AsyncMock(return_value=([self.charity], SEARCH_INFO))
+        for patcher in (mock.patch.object(utils, 'mission_statement_cache', cache),
+                        mock.patch.object(async_views, 'hybrid_charity_search_async', search)):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.search = search
+
+    async def test_search_returns_the_shared_payload(self):
+        response = await self.async_client.get(reverse('main:charity-semantic-search'), {'query': "clean water"})
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual([c['id'] for c in body['matched_charities']], [self.charity.id])
+        self.assertEqual((body['combined_mission'], body['mission_token']), ("Water for everyone.", None))
+        self.assertEqual(body['query_path'], 'enhanced')
+        self.search.assert_awaited_once_with("clean water")
+
+    async def test_missing_query_and_search_errors(self):
+        response = await self.async_client.get(reverse('main:charity-semantic-search'))
+        self.assertEqual(response.status_code, 400)
+        self.search.side_effect = RuntimeError("index unavailable")
+        response = await self.async_client.get(reverse('main:charity-semantic-search'), {'query': "clean water"})
+        self.assertEqual(response.status_code, 500)
+        self.assertIn("index unavailable", response.json()['error'])
+
+
+@override_settings(ROOT_URLCONF='main.tests.async_urls')
+class AsyncCompassMatchViewTests(TestCase):
+    def setUp(self):
+        self.match = mock.AsyncMock(return_value={"matches": [{"movement_id": 1}]})
+        patcher = mock.patch.object(async_views, 'match_top_movements', self.match)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.url = reverse('main:compass-match')
+
+    async def test_json_and_form_bodies(self):
+        response = await self.async_client.post(self.url, {'query': "clean water", 'top_k': 3},
+                                                content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {"matches": [{"movement_id": 1}]})
+        self.match.assert_awaited_once_with("clean water", 3)
+
+        response = await self.async_client.post(self.url, {'query': "trees"})
+        self.assertEqual(response.status_code, 200)
+        self.match.assert_awaited_with("trees", 10)
+
+    async def test_bad_bodies_are_rejected(self):
+        cases = [
+            (b'["clean water"]', "JSON body must be an object"),
+            (b'"clean water"', "JSON body must be an object"),
+            (b'{not json', "Invalid JSON body"),
+            (b'{"top_k": 3}', "Missing 'query'"),
+        ]
+        for body, error in cases:
+            response = await self.async_client.post(self.url, body, content_type='application/json')
+            self.assertEqual(response.status_code, 400, body)
+            self.assertEqual(response.json(), {"error": error})
+        self.match.assert_not_awaited()
+
+    async def test_pipeline_errors_return_500(self):
+        self.match.side_effect = RuntimeError("agent failed")
+        response = await self.async_client.post(self.url, {'query': "clean water"}, content_type='application/json')
+        self.assertEqual(response.status_code, 500)
+        self.assertEqual(response.json(), {"error": "agent failed"})
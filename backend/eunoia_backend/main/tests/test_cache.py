@@ -0,0 +1,88 @@
+from unittest import mock
+
+import numpy as np
+from django.test import SimpleTestCase, override_settings
+
+from main import utils
+from main.cache import TTLCache, normalize_query
+
+LOCMEM_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'shared': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'ttl-cache-tests'},
+}
+
+
+class TTLCacheTests(SimpleTestCase):
+    def test_least_recently_used_entry_is_evicted(self):
+        cache = TTLCache('test', maxsize=2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        self.assertEqual(cache.get('a'), 1)  # 'b' is now least recently used
+        cache.set('c', 3)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual((cache.get('a'), cache.get('c'), len(cache)), (1, 3, 2))
+        self.assertEqual(cache.stats(), {'size': 2, 'maxsize': 2, 'hits': 3, 'misses': 1})
+
+    def test_entries_expire_after_ttl(self):
+        cache = TTLCache('test', ttl=10)
+        with mock.patch('main.cache.time.monotonic', return_value=100.0):
+            cache.set('a', 1)
+        with mock.patch('main.cache.time.monotonic', return_value=109.9):
+            self.assertEqual(cache.get('a'), 1)
+        with mock.patch('main.cache.time.monotonic', return_value=110.0):
+            self.assertEqual(cache.get('a', 'gone'), 'gone')
+        self.assertEqual(len(cache), 0)
+
+    @override_settings(CACHES=LOCMEM_CACHES)
+    def test_backend_shares_values_between_workers(self):
+        writer = TTLCache('test', backend_alias='shared')
+        reader = TTLCache('test', backend_alias='shared')
+        writer.set(('model', 'clean water'), [1.0, 2.0])
+        self.assertEqual(reader.get(('model', 'clean water')), [1.0, 2.0])
+        self.assertEqual(len(reader), 1)  # promoted into the in-process layer
+        writer.delete(('model', 'clean water'))
+        self.assertIsNone(TTLCache('test', backend_alias='shared').get(('model', 'clean water')))
+
+    def test_backend_failures_fall_back_to_the_local_layer(self):
+        cache = TTLCache('test', backend_alias='shared')
+        backend = mock.Mock(**{name + '.side_effect': ConnectionError("down") for name in ('get', 'set', 'delete')})
+        with mock.patch.object(cache, '_backend', return_value=backend):
+            cache.set('a', 1)
+            self.assertEqual(cache.get('a'), 1)
+            self.assertIsNone(cache.get('b'))
+            cache.delete('a')
+        self.assertEqual(len(cache), 0)
+
+    def test_normalize_query(self):
+        self.assertEqual(normalize_query("  Clean\tWATER  now "), "clean water now")
+        self.assertEqual(normalize_query(None), "")
+
+
+class QueryCacheTests(SimpleTestCase):
+    def setUp(self):
+        for name in ('query_embedding_cache', 'query_enhancement_cache'):
+            patcher = mock.patch.object(utils, name, TTLCache(name))
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_query_embedding_is_cached_per_normalized_query(self):
+        with mock.patch.object(utils, 'get_embedding', return_value=[0.6, 0.8]) as get_embedding:
+            first = utils.get_query_embedding("Clean water")
+            second = utils.get_query_embedding("  clean   WATER ")
+        get_embedding.assert_called_once()
+        self.assertIs(first, second)
+        self.assertEqual(first.dtype, np.float32)
+
+    def test_failed_query_embedding_is_not_cached(self):
+        with mock.patch.object(utils, 'get_embedding', return_value=None) as get_embedding:
+            self.assertIsNone(utils.get_query_embedding("clean water"))
+            self.assertIsNone(utils.get_query_embedding("clean water"))
+        self.assertEqual(get_embedding.call_count, 2)
+
+    def test_enhancement_is_served_from_the_cache(self):
+        utils.query_enhancement_cache.set("clean water", "access to safe drinking water")
+        with mock.patch.object(utils, '_request_query_enhancement') as request:
+            self.assertEqual(utils.enhance_query("Clean Water"), "access to safe drinking water")
+        request.assert_not_called()
+        with mock.patch.object(utils, '_request_query_enhancement', return_value=None):
+            self.assertEqual(utils.enhance_query("trees"), "trees")
@@ -0,0 +1,90 @@
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from pathlib import Path
+from unittest import mock
+
+import numpy as np
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+
+from main import embedding_snapshot, vector_index
+from main.vector_index import VectorIndex, build_index
+
+from .test_fields import create_charity
+from .test_vector_index import BruteForceMixin, unit_rows
+
+
+class AttachedSnapshotTests(BruteForceMixin, SimpleTestCase):
+    def setUp(self):
+        self.rng = np.random.default_rng(0)
+
+    def test_attached_snapshot_is_never_written(self):
+        index = VectorIndex('test')
+        vectors = {i: v for i, v in enumerate(unit_rows(self.rng, 100), start=1)}
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / 'vectors.npy'
+            np.save(path, np.stack(list(vectors.values())))
+            matrix = np.load(path, mmap_mode='r')
+            index.attach(matrix, np.array(list(vectors), dtype=np.int64))
+
+            for item_id in range(1, 11):  # overwrite snapshot rows
+                vectors[item_id] = unit_rows(self.rng, 1)[0]
+                index.upsert(item_id, vectors[item_id])
+            for item_id in range(500, 520):  # append
+                vectors[item_id] = unit_rows(self.rng, 1)[0]
+                index.upsert(item_id, vectors[item_id])
+            for item_id in (11, 12, 500, 501):
+                index.remove(item_id)
+                del vectors[item_id]
+            self.check_against_brute_force(index, vectors)
+
+            self.assertEqual(index.compact(), 2)  # only in-memory rows are squeezed
+            self.check_against_brute_force(index, vectors)
+            self.assertFalse(matrix.flags.writeable)
+            del matrix
+            exported = index.export_arrays()
+        self.assertEqual(set(exported['ids'].tolist()), set(vectors))
+
+
+class EmbeddingSnapshotTests(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.root = Path(tmp.name)
+        settings_override = override_settings(EMBEDDING_SNAPSHOT_DIR=tmp.name, VECTOR_INDEX_SYNC_INTERVAL=0)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        patcher = mock.patch.dict(vector_index._indexes, clear=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_export_then_open_replays_later_changes(self):
+        self.assertIsNone(embedding_snapshot.current_version())
+        before = create_charity(name="Water", embedding=[1.0, 0.0, 0.0])
+        call_command('export_embedding_snapshot', stdout=StringIO())
+        version = embedding_snapshot.current_version()
+        self.assertIsNotNone(version)
+        self.assertEqual(embedding_snapshot.read_manifest(version)['indexes']['charity']['size'], 1)
+
+        after = create_charity(name="Trees", embedding=[0.0, 1.0, 0.0])
+        index, _ = build_index('charity', snapshot_version=version)
+        self.assertIsNotNone(index._base)
+        self.assertFalse(index._base.flags.writeable)
+        self.assertEqual(index.ids(), {before.id, after.id})
+        self.assertEqual(index.search([0.0, 1.0, 0.0], top_k=1)[0][0], after.id)
+
+    def test_missing_index_falls_back_to_the_database(self):
+        charity = create_charity(embedding=[1.0, 0.0])
+        version = embedding_snapshot.write_snapshot({}, timezone.now())
+        self.assertIsNone(embedding_snapshot.load_snapshot_into(VectorIndex('charity'), 'charity', version))
+        index, _ = build_index('charity', snapshot_version=version)
+        self.assertIsNone(index._base)
+        self.assertEqual(index.ids(), {charity.id})
+
+    def test_old_versions_are_pruned(self):
+        started = timezone.now()
+        versions = [embedding_snapshot.write_snapshot({}, started + timedelta(seconds=i), keep=2) for i in range(4)]
+        self.assertEqual(embedding_snapshot.current_version(), versions[-1])
+        self.assertEqual(sorted(p.name for p in self.root.iterdir() if p.is_dir()), versions[-2:])
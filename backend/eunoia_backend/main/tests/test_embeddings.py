@@ -0,0 +1,100 @@
+from types import SimpleNamespace
+from unittest import mock
+
+import numpy as np
+from django.test import SimpleTestCase, TestCase
+
+from main import utils
+from main.models import EmbeddingCache
+
+
+class FakeEmbeddingsClient:
+    """Stands in for the AsyncOpenAI client: embeds text as [len(text), 1.0] and records each request's inputs."""
+
+    def __init__(self, reject=()):
+        self.requests = []
+        self.reject = set(reject)
+        self.embeddings = self
+
+    def with_options(self, **kwargs):
+        return self
+
+    async def create(self, input, model):
+        self.requests.append(list(input))
+        if self.reject.intersection(input):
+            raise ValueError("invalid input")
+        return SimpleNamespace(data=[
+            SimpleNamespace(index=i, embedding=[float(len(text)), 1.0]) for i, text in enumerate(input)
+        ])
+
+
+class EmbeddingBatchTests(SimpleTestCase):
+    def test_batches_respect_input_and_token_limits(self):
+        items = list(enumerate(["a" * 40] * 5))  # 11 estimated tokens each
+        with mock.patch.object(utils, 'EMBEDDING_BATCH_MAX_INPUTS', 2):
+            self.assertEqual([len(b) for b in utils._embedding_batches(items)], [2, 2, 1])
+        with mock.patch.object(utils, 'EMBEDDING_BATCH_MAX_TOKENS', 30):
+            self.assertEqual([len(b) for b in utils._embedding_batches(items)], [2, 2, 1])
+        self.assertEqual([item for batch in utils._embedding_batches(items) for item in batch], items)
+
+
+class GetEmbeddingsTests(TestCase):
+    def embed(self, texts, fake):
+        with mock.patch.object(utils, 'client', fake):
+            return utils.get_embeddings(texts)
+
+    def test_one_request_per_batch_in_input_order(self):
+        fake = FakeEmbeddingsClient()
+        texts = ["one", "three", "", "fifteen", "x"]
+        with mock.patch.object(utils, 'EMBEDDING_BATCH_MAX_INPUTS', 2):
+            vectors = self.embed(texts, fake)
+        self.assertEqual(len(fake.requests), 2)
+        self.assertEqual(vectors, [[3.0, 1.0], [5.0, 1.0], None, [7.0, 1.0], [1.0, 1.0]])
+
+    def test_rejected_batch_is_retried_item_by_item(self):
+        fake = FakeEmbeddingsClient(reject={"bad"})
+        vectors = self.embed(["good", "bad", "fine"], fake)
+        self.assertEqual(vectors, [[4.0, 1.0], None, [4.0, 1.0]])
+        self.assertEqual(fake.requests, [["good", "bad", "fine"], ["good"], ["bad"], ["fine"]])
+
+    def test_without_client_every_entry_is_none(self):
+        self.assertEqual(self.embed(["text"], None), [None])
+
+
+class EmbeddingCacheTests(TestCase):
+    def setUp(self):
+        patcher = mock.patch.dict(utils._embedding_cache_counters, {'hits': 0, 'misses': 0})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.fake = FakeEmbeddingsClient()
+        patcher = mock.patch.object(utils, 'client', self.fake)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_repeated_text_is_served_from_the_cache(self):
+        first = utils.get_embeddings(["clean  water", "clean water\n", "trees"])
+        self.assertEqual(self.fake.requests, [["clean water", "trees"]])  # whitespace-normalized and deduplicated
+        self.assertEqual(first[0], first[1])
+
+        again = utils.get_embeddings([" clean water ", "trees"])
+        self.assertEqual(len(self.fake.requests), 1)
+        self.assertEqual(again, [first[0], first[2]])
+        self.assertEqual(utils.embedding_cache_stats(), {'hits': 2, 'misses': 2, 'hit_rate': 0.5})
+
+    def test_entries_are_scoped_to_the_model(self):
+        utils.get_embeddings(["trees"])
+        utils.get_embeddings(["trees"], model="text-embedding-3-large")
+        self.assertEqual(len(self.fake.requests), 2)
+        self.assertEqual(EmbeddingCache.objects.count(), 2)
+
+    def test_failed_items_are_not_cached(self):
+        self.fake.reject = {"bad"}
+        self.assertEqual(utils.get_embeddings(["bad"]), [None])
+        self.fake.reject = set()
+        self.assertEqual(utils.get_embeddings(["bad"]), [[3.0, 1.0]])
+        self.assertEqual(len(self.fake.requests), 2)
+
+    def test_cached_vectors_round_trip_unnormalized(self):
+        entry = EmbeddingCache.objects.create(model_name="m", text_hash="h", embedding=[1.5, -2.0, 0.25])
+        entry.refresh_from_db()
+        np.testing.assert_array_equal(entry.embedding, np.array([1.5, -2.0, 0.25], dtype=np.float32))
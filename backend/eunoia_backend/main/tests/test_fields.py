@@ -0,0 +1,139 @@
+import numpy as np
+from django.core.exceptions import ValidationError
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import SimpleTestCase, TestCase, TransactionTestCase
+
+from main.fields import EmbeddingField, l2_normalize
+from main.models import Charity
+from main.vector_index import _stored_unit_vector
+
+
+def create_charity(**kwargs):
+    fields = {'name': "Test", 'aptos_wallet_address': "0x1", 'contact_email': "a@example.com"}
+    fields.update(kwargs)
+    return Charity.objects.create(**fields)
+
+
+class EmbeddingFieldTests(TestCase):
+    def test_stored_as_packed_little_endian_float32(self):
+        charity = create_charity(embedding=[0.6, 0.8])
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT embedding FROM main_charity WHERE id = %s", [charity.id])
+            raw = bytes(cursor.fetchone()[0])
+        self.assertEqual(raw, np.array([0.6, 0.8], dtype='<f4').tobytes())
+
+    def test_round_trip_returns_read_only_float32_array(self):
+        charity = create_charity(embedding=[0.6, 0.8])
+        charity.refresh_from_db()
+        self.assertIsInstance(charity.embedding, np.ndarray)
+        self.assertEqual(charity.embedding.dtype, np.float32)
+        self.assertFalse(charity.embedding.flags.writeable)
+        np.testing.assert_allclose(charity.embedding, [0.6, 0.8], rtol=1e-6)
+
+    def test_null_and_empty_vectors_are_stored_as_null(self):
+        for value in (None, []):
+            charity = create_charity(embedding=value)
+            charity.refresh_from_db()
+            self.assertIsNone(charity.embedding)
+
+    def test_invalid_values_raise_validation_error(self):
+        field = Charity._meta.get_field('embedding')
+        with self.assertRaises(ValidationError):
+            field.to_python(["not", "numbers"])
+        with self.assertRaises(ValidationError):
+            field.get_prep_value([{"a": 1}])
+
+    def test_serialized_form_round_trips(self):
+        charity = create_charity(embedding=[1.0, 0.0, 0.0])
+        field = Charity._meta.get_field('embedding')
+        restored = field.to_python(field.value_to_string(charity))
+        np.testing.assert_array_equal(restored, charity.embedding)
+        self.assertIsNone(field.to_python(b''))
+
+
+class EmbeddingFieldDtypeTests(SimpleTestCase):
+    def test_float16_packs_two_bytes_per_value(self):
+        field = EmbeddingField(dtype='float16')
+        packed = field.get_prep_value([1.0, -2.0, 0.5])
+        self.assertEqual(len(packed), 6)
+        np.testing.assert_array_equal(field.to_python(packed), np.array([1.0, -2.0, 0.5], dtype=np.float16))
+        self.assertEqual(field.deconstruct()[3]['dtype'], 'float16')
+
+    def test_unknown_dtype_is_rejected(self):
+        with self.assertRaises(ValueError):
+            EmbeddingField(dtype='float64')
+
+
+class EmbeddingNormalizationTests(TestCase):
+    def test_l2_normalize(self):
+        unit, norm = l2_normalize([3, 4])
+        np.testing.assert_allclose(unit, [0.6, 0.8], rtol=1e-6)
+        self.assertEqual((unit.dtype, norm), (np.float32, 5.0))
+        for value in ([], [0.0, 0.0], [float('nan'), 1.0], ["x"]):
+            self.assertEqual(l2_normalize(value), (None, 0.0))
+
+    def test_round_trip_normalizes_and_records_norm(self):
+        charity = create_charity(embedding=[3.0, 4.0])
+        charity.refresh_from_db()
+        np.testing.assert_allclose(charity.embedding, [0.6, 0.8], rtol=1e-6)
+        self.assertAlmostEqual(charity.embedding_norm, 5.0, places=5)
+
+        charity.save()  # re-saving a unit vector keeps the original norm
+        charity.refresh_from_db()
+        self.assertAlmostEqual(charity.embedding_norm, 5.0, places=5)
+
+    def test_zero_and_non_finite_vectors_are_stored_as_null(self):
+        for value in (None, [0.0, 0.0], [float('nan'), 1.0], [float('inf'), 1.0]):
+            charity = create_charity(embedding=value)
+            charity.refresh_from_db()
+            self.assertIsNone(charity.embedding)
+            self.assertIsNone(charity.embedding_norm)
+
+    def test_rows_without_a_norm_are_normalized_when_indexed(self):
+        legacy = np.array([3.0, 4.0], dtype=np.float32)
+        np.testing.assert_allclose(_stored_unit_vector(legacy, None), [0.6, 0.8], rtol=1e-6)
+        self.assertIs(_stored_unit_vector(legacy, 5.0), legacy)
+
+
+class MigrationTestCase(TransactionTestCase):
+    def tearDown(self):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(executor.loader.graph.leaf_nodes())
+
+    def migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(targets)
+        return executor.loader.project_state(targets).apps
+
+
+class PackEmbeddingsMigrationTests(MigrationTestCase):
+    def test_json_lists_are_packed_and_junk_becomes_null(self):
+        OldCharity = self.migrate([('main', '0008_movement_embedding')]).get_model('main', 'Charity')
+        fields = {'aptos_wallet_address': "0x1", 'contact_email': "a@example.com"}
+        good = OldCharity.objects.create(name="good", embedding=[1, 2.5, -3], **fields)
+        junk = OldCharity.objects.create(name="junk", embedding={"not": "a list"}, **fields)
+
+        NewCharity = self.migrate([('main', '0009_pack_embeddings')]).get_model('main', 'Charity')
+        np.testing.assert_array_equal(NewCharity.objects.get(id=good.id).embedding,
+                                      np.array([1, 2.5, -3], dtype=np.float32))
+        self.assertIsNone(NewCharity.objects.get(id=junk.id).embedding)
+
+
+class NormalizeEmbeddingsMigrationTests(MigrationTestCase):
+    def test_existing_vectors_are_rescaled_and_restored(self):
+        OldCharity = self.migrate([('main', '0011_embeddingcache')]).get_model('main', 'Charity')
+        fields = {'aptos_wallet_address': "0x1", 'contact_email': "a@example.com"}
+        raw = OldCharity.objects.create(name="raw", embedding=[3.0, 4.0], **fields)
+        zero = OldCharity.objects.create(name="zero", embedding=[0.0, 0.0], **fields)
+
+        NewCharity = self.migrate([('main', '0012_normalize_embeddings')]).get_model('main', 'Charity')
+        normalized = NewCharity.objects.get(id=raw.id)
+        np.testing.assert_allclose(normalized.embedding, [0.6, 0.8], rtol=1e-6)
+        self.assertAlmostEqual(normalized.embedding_norm, 5.0, places=5)
+        self.assertIsNone(NewCharity.objects.get(id=zero.id).embedding)
+
+        OldCharity = self.migrate([('main', '0011_embeddingcache')]).get_model('main', 'Charity')
+        np.testing.assert_allclose(OldCharity.objects.get(id=raw.id).embedding, [3.0, 4.0], rtol=1e-6)
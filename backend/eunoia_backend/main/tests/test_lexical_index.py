@@ -0,0 +1,78 @@
+from unittest import mock
+
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from main import lexical_index, utils
+from main.lexical_index import BM25Index, document_terms, reciprocal_rank_fusion, tokenize
+
+from .test_fields import create_charity
+
+
+def sample_index():
+    index = BM25Index('test')
+    index.upsert(1, document_terms({'name': 'Ocean Rescue', 'description': 'We clean plastic from the ocean.'}))
+    index.upsert(2, document_terms({'name': 'Forest Fund', 'description': 'Planting trees near the ocean coast.'}))
+    index.upsert(3, document_terms({'name': 'Book Bus', 'description': 'Libraries for rural schools.'}))
+    return index
+
+
+class LexicalSearchTests(SimpleTestCase):
+    def test_tokenize_drops_stopwords_and_single_characters(self):
+        self.assertEqual(tokenize("The Charity for a cleaner OCEAN, 2024!"), ["cleaner", "ocean", "2024"])
+        self.assertEqual(tokenize(None), [])
+
+    def test_bm25_ranks_field_weighted_matches_first(self):
+        index = sample_index()
+        results = index.search("ocean plastic")
+        self.assertEqual([doc_id for doc_id, _ in results], [1, 2])
+        self.assertGreater(results[0][1], results[1][1])
+        self.assertEqual(index.search("the and of"), [])
+
+    def test_bm25_upsert_replaces_and_remove_drops(self):
+        index = sample_index()
+        index.upsert(3, document_terms({'name': 'Ocean Library', 'description': 'Books about the ocean.'}))
+        self.assertIn(3, [doc_id for doc_id, _ in index.search("ocean")])
+        self.assertEqual(index.search("rural"), [])
+        self.assertTrue(index.remove(1))
+        self.assertNotIn(1, [doc_id for doc_id, _ in index.search("ocean")])
+        self.assertEqual(len(index), 2)
+
+    def test_reciprocal_rank_fusion_ordering(self):
+        fused = reciprocal_rank_fusion([[1, 2, 3], [3, 1, 4]], k=60)
+        self.assertEqual([item_id for item_id, _ in fused], [1, 3, 2, 4])
+        self.assertAlmostEqual(fused[0][1], 1 / 61 + 1 / 62)
+
+    def test_reciprocal_rank_fusion_ties_keep_first_seen_order(self):
+        fused = reciprocal_rank_fusion([[5, 6], [6, 5]])
+        self.assertEqual([item_id for item_id, _ in fused], [5, 6])
+
+
+@override_settings(VECTOR_INDEX_SYNC_INTERVAL=0)
+class HybridSearchTests(TestCase):
+    def setUp(self):
+        self.ocean = create_charity(name="Ocean Rescue", description="We clean plastic from the ocean.")
+        self.books = create_charity(name="Book Bus", description="Libraries for rural schools.")
+        patcher = mock.patch.object(lexical_index, '_charity_index', None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.index = lexical_index.get_charity_text_index()
+
+    def test_saves_and_deletes_reach_the_text_index(self):
+        forest = create_charity(name="Forest Fund", description="Planting trees.")
+        self.assertEqual(self.index.search("trees")[0][0], forest.id)
+        forest.delete()
+        self.assertEqual(self.index.search("trees"), [])
+
+    def test_keyword_matches_come_back_without_embeddings(self):
+        with mock.patch.object(utils, 'client', None):
+            charities, info = utils.hybrid_charity_search("ocean plastic")
+        self.assertEqual(charities, [self.ocean])
+        self.assertEqual((info['query_path'], info['semantic_candidates'], info['lexical_candidates']), ('raw', 0, 1))
+
+    def test_semantic_and_lexical_rankings_are_fused(self):
+        with mock.patch.object(utils, 'client', mock.Mock()), \
+                mock.patch.object(utils, '_semantic_charity_ranking', return_value=[self.books.id]), \
+                mock.patch.object(utils, 'enhance_query_within_budget', return_value=("ocean plastic", 'raw')):
+            charities, info = utils.hybrid_charity_search("ocean plastic")
+        self.assertEqual(charities, [self.books, self.ocean])  # equal fused scores keep the semantic one first
+        self.assertEqual((info['semantic_candidates'], info['lexical_candidates']), (1, 1))
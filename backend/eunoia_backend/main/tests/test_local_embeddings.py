@@ -0,0 +1,107 @@
+import asyncio
+import os
+import tempfile
+from io import StringIO
+from unittest import mock
+
+import numpy as np
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from agents_sdk.compass_matching_agents import manager as compass
+from main import local_embeddings, utils
+from main.local_embeddings import LocalEmbeddingModel, resolve_backend
+
+from .test_fields import create_charity
+
+CORPUS = [
+    "Clean water wells for rural villages",
+    "Water filters and sanitation for families",
+    "Planting trees to restore forests",
+    "Forest conservation and tree nurseries",
+    "Mobile libraries bringing books to schools",
+    "Reading programs and books for children",
+]
+
+
+class LocalEmbeddingModelTests(SimpleTestCase):
+    def test_query_fast_path_matches_batch_embedding(self):
+        model = LocalEmbeddingModel.fit(CORPUS, dim=4)
+        self.assertEqual(model.dim, 4)
+        batch = model.embed(["water wells for villages", "books for schools"])
+        np.testing.assert_allclose(np.linalg.norm(batch, axis=1), [1.0, 1.0], rtol=1e-5)
+        np.testing.assert_allclose(model.embed_one("water wells for villages"), batch[0], atol=1e-5)
+        self.assertIsNone(model.embed_one("zebra quantum"))
+
+    def test_similar_texts_land_close_together(self):
+        for method in ('tfidf', 'hashing'):
+            model = LocalEmbeddingModel.fit(CORPUS, method=method, dim=4)
+            water, sanitation, books = model.embed([CORPUS[0], CORPUS[1], CORPUS[4]])
+            self.assertGreater(water @ sanitation, water @ books, method)
+
+    def test_save_and_load_round_trip(self):
+        model = LocalEmbeddingModel.fit(CORPUS, dim=4)
+        model.embed_one("water")  # caches the analyzer, which must not be pickled
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'models', 'local.joblib')
+            model.save(path)
+            loaded = LocalEmbeddingModel.load(path)
+        np.testing.assert_array_equal(loaded.embed_one("forest trees"), model.embed_one("forest trees"))
+
+    def test_unknown_method_is_rejected(self):
+        with self.assertRaises(ValueError):
+            LocalEmbeddingModel.fit(CORPUS, method='word2vec')
+
+
+class LocalBackendTests(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        settings_override = override_settings(
+            LOCAL_EMBEDDING_MODEL_PATH=os.path.join(tmp.name, 'local.joblib'),
+            CHARITY_SEARCH_EMBEDDING_BACKEND='local', VECTOR_INDEX_SYNC_INTERVAL=0,
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        for patcher in (mock.patch.object(local_embeddings, '_model', None),
+                        mock.patch.object(local_embeddings, '_model_mtime', None),
+                        mock.patch.object(local_embeddings, '_warned_missing', True),
+                        mock.patch.dict(local_embeddings._indexes, clear=True),
+                        mock.patch.dict(local_embeddings._watermarks, clear=True)):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.charities = [create_charity(name=f"Charity {i}", description=text) for i, text in enumerate(CORPUS)]
+
+    def fit(self):
+        call_command('fit_local_embeddings', dim=4, eval_sample=0, stdout=StringIO())
+
+    def test_backend_falls_back_to_openai_until_a_model_is_fitted(self):
+        self.assertEqual(resolve_backend('CHARITY_SEARCH_EMBEDDING_BACKEND'), 'openai')
+        self.assertIsNone(local_embeddings.get_local_charity_index())
+        self.fit()
+        self.assertEqual(resolve_backend('CHARITY_SEARCH_EMBEDDING_BACKEND'), 'local')
+        with override_settings(CHARITY_SEARCH_EMBEDDING_BACKEND='openai'):
+            self.assertEqual(resolve_backend('CHARITY_SEARCH_EMBEDDING_BACKEND'), 'openai')
+
+    def test_semantic_ranking_runs_without_openai(self):
+        self.fit()
+        with mock.patch.object(utils, 'get_embedding') as get_embedding:
+            ranked = utils._semantic_charity_ranking("books for children", limit=2)
+        get_embedding.assert_not_called()
+        self.assertEqual(set(ranked), {self.charities[4].id, self.charities[5].id})
+
+    def test_saves_reach_the_local_index(self):
+        self.fit()
+        index = local_embeddings.get_local_charity_index()
+        self.assertEqual(index.ids(), {c.id for c in self.charities})
+        added = create_charity(name="Wells", description="Water wells and sanitation")
+        self.assertIn(added.id, index)
+        added.delete()
+        self.assertNotIn(added.id, index)
+
+    @override_settings(COMPASS_EMBEDDING_BACKEND='local')
+    def test_compass_match_without_a_local_index_is_empty(self):
+        self.fit()
+        with mock.patch.object(compass, 'get_local_movement_index', return_value=None):
+            payload = asyncio.run(compass._match_top_movements_async("clean water", top_k=3))
+        self.assertEqual(payload, {'query': "clean water", 'grouped_matches': {}, 'raw_matches': []})
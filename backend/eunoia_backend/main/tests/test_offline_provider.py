@@ -0,0 +1,85 @@
+import asyncio
+from typing import List
+from unittest import mock
+
+import httpx
+import numpy as np
+import openai
+from django.test import SimpleTestCase, override_settings
+from pydantic import BaseModel
+
+from main import openai_client
+from main.offline_provider import OfflineTransport, offline_embedding
+from main.utils import CombinedCharityMission, EnhancedQuery
+
+
+class Pick(BaseModel):
+    movement_id: int
+    reason: str
+
+
+class PickList(BaseModel):
+    picks: List[Pick]
+
+
+def offline_client():
+    transport = OfflineTransport(llm_latency=0, embedding_latency=0, embedding_dim=32)
+    return openai.AsyncOpenAI(api_key='offline', http_client=httpx.AsyncClient(transport=transport), max_retries=0)
+
+
+def call_tool(model_cls, prompt):
+    async def call():
+        response = await offline_client().responses.create(
+            model="gpt-5", input=prompt,
+            tools=[{"type": "function", "name": "tool", "parameters": model_cls.model_json_schema()}],
+            tool_choice={"type": "function", "name": "tool"},
+        )
+        return response.output[0]
+    return asyncio.run(call())
+
+
+class OfflineProviderTests(SimpleTestCase):
+    def test_embeddings_are_deterministic_unit_vectors(self):
+        async def embed(texts):
+            response = await offline_client().embeddings.create(input=texts, model="text-embedding-3-small")
+            return [np.array(item.embedding) for item in response.data]
+
+        water, wells, books = asyncio.run(embed(["clean water access", "clean water wells", "rural book bus"]))
+        self.assertEqual(water.shape, (32,))
+        self.assertAlmostEqual(float(np.linalg.norm(water)), 1.0, places=5)
+        np.testing.assert_allclose(water, offline_embedding("clean water access", 32), atol=1e-6)
+        self.assertGreater(water @ wells, water @ books)  # shared words land close together
+
+    def test_tool_calls_validate_against_the_requested_schema(self):
+        first = call_tool(EnhancedQuery, "User Query: 'clean water for villages'")
+        self.assertEqual((first.type, first.name), ('function_call', 'tool'))
+        enhanced = EnhancedQuery.model_validate_json(first.arguments)
+        self.assertTrue(set(enhanced.enhanced_query.lower().split()) <= {"user", "query", "clean", "water", "villages"})
+        self.assertEqual(call_tool(EnhancedQuery, "User Query: 'clean water for villages'").arguments, first.arguments)
+        CombinedCharityMission.model_validate_json(call_tool(CombinedCharityMission, "Water charities").arguments)
+
+    def test_structured_output_uses_ids_from_the_input(self):
+        async def call():
+            return await offline_client().responses.parse(
+                model="gpt-5", input='Movements: {"movement_id": 7} {"movement_id": 9}', text_format=PickList,
+            )
+
+        parsed = asyncio.run(call()).output_parsed
+        self.assertTrue(parsed.picks)
+        self.assertTrue({pick.movement_id for pick in parsed.picks} <= {7, 9})
+
+    def test_unknown_endpoints_return_404(self):
+        async def call():
+            return await offline_client().models.list()
+
+        with self.assertRaises(openai.NotFoundError):
+            asyncio.run(call())
+
+    @override_settings(LLM_PROVIDER='offline')
+    def test_shared_client_uses_the_offline_transport(self):
+        with mock.patch.object(openai_client, '_client', None), \
+                mock.patch.object(openai_client, '_client_error', None), \
+                mock.patch('agents.set_default_openai_client'):
+            client = openai_client.get_async_client()
+        self.assertEqual(client.api_key, 'offline')
+        self.assertIsInstance(client._client._transport, OfflineTransport)
@@ -0,0 +1,74 @@
+import asyncio
+import threading
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+
+from main import openai_client
+from main.openai_client import get_async_client, get_loop, run_async, run_sync
+
+
+async def loop_and_thread():
+    return asyncio.get_running_loop(), threading.current_thread()
+
+
+class SharedLoopTests(SimpleTestCase):
+    def test_run_sync_reuses_one_loop_thread(self):
+        first_loop, first_thread = run_sync(loop_and_thread())
+        second_loop, second_thread = run_sync(loop_and_thread())
+        self.assertIs(first_loop, get_loop())
+        self.assertIs(second_loop, first_loop)
+        self.assertIs(second_thread, first_thread)
+        self.assertEqual(first_thread.name, 'openai-event-loop')
+
+    def test_run_sync_propagates_exceptions(self):
+        async def fail():
+            raise ValueError("boom")
+
+        with self.assertRaisesMessage(ValueError, "boom"):
+            run_sync(fail())
+
+    def test_run_sync_refuses_to_block_the_loop(self):
+        async def nested():
+            coro = loop_and_thread()
+            with self.assertRaises(RuntimeError):
+                run_sync(coro)
+            return coro.cr_frame is None  # closed, not left pending
+
+        self.assertTrue(run_sync(nested()))
+
+    def test_run_async_hops_onto_the_shared_loop(self):
+        async def from_another_loop():
+            return await run_async(loop_and_thread())
+
+        loop, _ = asyncio.run(from_another_loop())
+        self.assertIs(loop, get_loop())
+
+
+class SharedClientTests(SimpleTestCase):
+    def setUp(self):
+        for name in ('_client', '_client_error'):
+            patcher = mock.patch.object(openai_client, name, None)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        patcher = mock.patch('agents.set_default_openai_client')
+        self.set_default_client = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    @override_settings(OPENAI_API_KEY=None, LLM_PROVIDER='openai')
+    def test_missing_key_disables_the_client(self):
+        with mock.patch.dict('os.environ', {'OPENAI_API_KEY': ''}):
+            self.assertIsNone(get_async_client())
+        self.assertIn("OPENAI_API_KEY", openai_client.client_error())
+
+    @override_settings(OPENAI_MAX_CONNECTIONS=7, LLM_PROVIDER='openai')
+    def test_client_is_shared_and_timeout_views_share_its_pool(self):
+        with mock.patch.dict('os.environ', {'OPENAI_API_KEY': 'sk-test'}):
+            client = get_async_client()
+            self.assertIs(get_async_client(), client)
+            scoped = get_async_client(timeout=3)
+        self.assertIsNot(scoped, client)
+        self.assertEqual(scoped.timeout, 3)
+        self.assertIs(scoped._client, client._client)
+        self.assertEqual(client._client._transport._pool._max_connections, 7)
+        self.set_default_client.assert_called_once_with(client, use_for_tracing=False)
@@ -0,0 +1,100 @@
+import asyncio
+import threading
+from types import SimpleNamespace
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from main import utils
+from main.cache import TTLCache
+from main.openai_client import run_sync
+
+
+class FakeResponsesClient:
+    """Stands in for the AsyncOpenAI client's Responses API, answering with an enhance_user_query tool call."""
+
+    def __init__(self, enhanced_query, delay=0.0):
+        self.enhanced_query = enhanced_query
+        self.delay = delay
+        self.calls = 0
+        self.responses = self
+
+    def with_options(self, **kwargs):
+        return self
+
+    async def create(self, **kwargs):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        arguments = f'{{"enhanced_query": "{self.enhanced_query}"}}'
+        return SimpleNamespace(output=[SimpleNamespace(type='function_call', name='enhance_user_query', arguments=arguments)])
+
+
+class EnhanceQueryWithinBudgetTests(SimpleTestCase):
+    def setUp(self):
+        self.cache = TTLCache('test')
+        patcher = mock.patch.object(utils, 'query_enhancement_cache', self.cache)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def enhance(self, fake, query="clean water", budget=1.0):
+        with mock.patch.object(utils, 'client', fake):
+            return utils.enhance_query_within_budget(query, budget=budget)
+
+    def test_fresh_enhancement_within_budget_is_used_and_cached(self):
+        fake = FakeResponsesClient("safe drinking water access")
+        self.assertEqual(self.enhance(fake), ("safe drinking water access", 'enhanced'))
+        self.assertEqual(self.enhance(fake, query="  Clean WATER"), ("safe drinking water access", 'cached'))
+        self.assertEqual(fake.calls, 1)
+
+    def test_slow_enhancement_falls_back_and_warms_the_cache(self):
+        fake = FakeResponsesClient("safe drinking water access", delay=0.2)
+        self.assertEqual(self.enhance(fake, budget=0.01), ("clean water", 'raw_timeout'))
+        with mock.patch.object(utils, 'client', fake):
+            future = utils._start_query_enhancement("Clean water")  # joins the enhancement still running
+            self.assertEqual(future.result(timeout=5), "safe drinking water access")
+        self.assertEqual(fake.calls, 1)
+        self.assertEqual(self.enhance(fake), ("safe drinking water access", 'cached'))
+
+    def test_unavailable_or_failed_enhancement_uses_the_raw_query(self):
+        self.assertEqual(self.enhance(None), ("clean water", 'raw'))
+        fake = FakeResponsesClient("ignored")
+        with mock.patch.object(utils, '_request_query_enhancement_async', mock.AsyncMock(return_value=None)):
+            self.assertEqual(self.enhance(fake), ("clean water", 'raw'))  # finishes before its callback is added
+        self.assertEqual(len(self.cache), 0)
+        self.assertEqual(utils._enhancements_in_flight, {})
+
+
+class SpeculativeRankingTests(SimpleTestCase):
+    def rank(self, enhance, semantic_ranking):
+        with mock.patch.object(utils, 'client', mock.Mock()), \
+                mock.patch.object(utils, 'enhance_query_within_budget', side_effect=enhance), \
+                mock.patch.object(utils, '_semantic_charity_ranking', side_effect=semantic_ranking) as semantic, \
+                mock.patch.object(utils, '_lexical_charity_ranking', return_value=[9]):
+            ranked_ids, info = run_sync(utils._rank_charities_async("clean water", top_k=5))
+        return ranked_ids, info, [call.args[0] for call in semantic.call_args_list]
+
+    def test_raw_query_is_searched_while_enhancement_runs(self):
+        raw_search_started = threading.Event()
+
+        def enhance(query):
+            # Only returns once the raw-query search has started alongside it
+            self.assertTrue(raw_search_started.wait(timeout=5))
+            return "safe drinking water", 'enhanced'
+
+        def semantic_ranking(search_text, limit):
+            if search_text == "clean water":
+                raw_search_started.set()
+                return [2, 1]
+            return [1, 3]
+
+        ranked_ids, info, searched = self.rank(enhance, semantic_ranking)
+        self.assertCountEqual(searched, ["clean water", "safe drinking water"])
+        self.assertEqual(ranked_ids, [1, 2, 9, 3])  # 1 is in both semantic rankings; equal scores keep ranking order
+        self.assertEqual(info, {'query_path': 'enhanced', 'search_query': "safe drinking water",
+                                'semantic_candidates': 3, 'lexical_candidates': 1})
+
+    def test_unchanged_query_is_embedded_once(self):
+        ranked_ids, info, searched = self.rank(lambda query: (query, 'raw_timeout'), lambda text, limit: [4])
+        self.assertEqual(searched, ["clean water"])
+        self.assertEqual(ranked_ids, [4, 9])
+        self.assertEqual(info['query_path'], 'raw_timeout')
@@ -0,0 +1,219 @@
+from datetime import timedelta
+from unittest import mock
+
+import numpy as np
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+
+from main import vector_index
+from main.models import Charity, Movement
+from main.vector_index import IVFFlatIndex, VectorIndex
+
+
+def unit_rows(rng, n, dim=16):
+    rows = rng.normal(size=(n, dim)).astype(np.float32)
+    return rows / np.linalg.norm(rows, axis=1, keepdims=True)
+
+
+def brute_force_top_k(vectors, query, k):
+    ids = np.array(list(vectors))
+    matrix = np.stack([vectors[i] for i in ids])
+    scores = matrix @ (query / np.linalg.norm(query))
+    return [int(i) for i in ids[np.argsort(-scores, kind='stable')[:k]]]
+
+
+class BruteForceMixin:
+    def check_against_brute_force(self, index, vectors, queries=10, k=10, **search_kwargs):
+        for query in self.rng.normal(size=(queries, index.dim)).astype(np.float32):
+            expected = brute_force_top_k(vectors, query, k)
+            got = [item_id for item_id, _ in index.search(query, top_k=k, **search_kwargs)]
+            self.assertEqual(got, expected)
+
+
+class VectorIndexTests(BruteForceMixin, SimpleTestCase):
+    def setUp(self):
+        self.rng = np.random.default_rng(0)
+
+    def test_top_k_matches_brute_force(self):
+        index = VectorIndex('test', initial_capacity=8)  # forces several capacity doublings
+        vectors = {i: v for i, v in enumerate(unit_rows(self.rng, 300), start=1)}
+        self.assertEqual(index.bulk_load(vectors.items()), 300)
+        self.check_against_brute_force(index, vectors)
+
+        results = index.search(vectors[7], top_k=3)
+        self.assertEqual(results[0][0], 7)
+        self.assertAlmostEqual(results[0][1], 1.0, places=5)
+        self.assertEqual([s for _, s in results], sorted((s for _, s in results), reverse=True))
+
+    def test_upsert_remove_and_compact(self):
+        index = VectorIndex('test')
+        vectors = {i: v for i, v in enumerate(unit_rows(self.rng, 200), start=1)}
+        index.bulk_load(vectors.items())
+
+        for item_id, vector in zip(range(1, 21), unit_rows(self.rng, 20)):
+            self.assertTrue(index.upsert(item_id, vector * 3.0))  # not unit length: normalized on insert
+            vectors[item_id] = vector
+        for item_id in range(21, 61):
+            self.assertTrue(index.remove(item_id))
+            del vectors[item_id]
+        self.assertFalse(index.remove(21))
+        self.assertEqual(index.tombstones, 40)
+        self.assertEqual(len(index), 200)
+        self.check_against_brute_force(index, vectors)
+
+        self.assertEqual(index.compact(), 40)
+        self.assertEqual(index.tombstones, 0)
+        self.assertEqual(len(index), 160)
+        self.assertEqual(index.ids(), set(vectors))
+        self.check_against_brute_force(index, vectors)
+
+    def test_rejects_unusable_vectors(self):
+        index = VectorIndex('test')
+        self.assertTrue(index.upsert(1, [1.0, 0.0]))
+        self.assertFalse(index.upsert(2, [0.0, 0.0]))
+        self.assertFalse(index.upsert(3, [1.0, 0.0, 0.0]))  # dimension mismatch
+        self.assertEqual(index.search([0.0, 0.0]), [])
+        self.assertEqual(index.search([1.0, 0.0], min_score=1.5), [])
+        self.assertEqual(index.search([1.0, 0.0], top_k=0), [])
+
+
+class IVFFlatIndexTests(BruteForceMixin, SimpleTestCase):
+    def setUp(self):
+        self.rng = np.random.default_rng(0)
+
+    def test_untrained_index_searches_exactly(self):
+        index = IVFFlatIndex('test', nlist=8, min_train_size=100)
+        vectors = {i: v for i, v in enumerate(unit_rows(self.rng, 50), start=1)}
+        index.bulk_load(vectors.items())
+        self.assertFalse(index.needs_training)
+        self.assertFalse(index.train())  # below min_train_size
+        self.assertFalse(index.is_trained)
+        self.check_against_brute_force(index, vectors)
+
+    def test_top_k_matches_brute_force_when_probing_every_list(self):
+        index = IVFFlatIndex('test', nlist=8, nprobe=8, min_train_size=100)
+        vectors = {i: v for i, v in enumerate(unit_rows(self.rng, 400), start=1)}
+        index.bulk_load(vectors.items())
+        self.assertTrue(index.needs_training)
+        self.assertTrue(index.train())
+        self.assertTrue(index.is_trained)
+        self.assertFalse(index.needs_training)
+        self.check_against_brute_force(index, vectors)
+
+        for item_id, vector in zip(range(1, 31), unit_rows(self.rng, 30)):
+            index.upsert(item_id, vector)
+            vectors[item_id] = vector
+        for item_id in range(1000, 1030):
+            vector = unit_rows(self.rng, 1)[0]
+            index.upsert(item_id, vector)
+            vectors[item_id] = vector
+        for item_id in range(31, 81):
+            index.remove(item_id)
+            del vectors[item_id]
+        self.check_against_brute_force(index, vectors)
+
+        self.assertEqual(index.compact(), 50)
+        self.check_against_brute_force(index, vectors)
+
+    def test_recall_with_partial_probing(self):
+        index = IVFFlatIndex('test', nlist=16, nprobe=8, min_train_size=100)
+        vectors = {i: v for i, v in enumerate(unit_rows(self.rng, 1000), start=1)}
+        index.bulk_load(vectors.items())
+        index.train()
+        hits = sum(index.search(vectors[item_id], top_k=1)[0][0] == item_id for item_id in range(1, 51))
+        self.assertGreaterEqual(hits, 45)
+
+    def test_train_is_skipped_while_another_train_runs(self):
+        index = IVFFlatIndex('test', nlist=4, min_train_size=10)
+        index.bulk_load(enumerate(unit_rows(self.rng, 50), start=1))
+        with index._train_lock:
+            self.assertFalse(index.train())
+        self.assertTrue(index.train())
+
+    def test_rows_written_during_training_are_assigned_on_swap(self):
+        index = IVFFlatIndex('test', nlist=4, nprobe=4, min_train_size=10)
+        vectors = {i: v for i, v in enumerate(unit_rows(self.rng, 100), start=1)}
+        index.bulk_load(vectors.items())
+        kmeans = index._kmeans
+
+        def kmeans_with_concurrent_writes(data):
+            centroids = kmeans(data)
+            for item_id, vector in zip((5, 500), unit_rows(self.rng, 2)):
+                index.upsert(item_id, vector)
+                vectors[item_id] = vector
+            return centroids
+
+        index._kmeans = kmeans_with_concurrent_writes
+        self.assertTrue(index.train())
+        self.assertEqual(sum(len(rows) for rows in index._lists), 101)
+        self.check_against_brute_force(index, vectors)
+
+    def test_compaction_during_training_discards_the_result(self):
+        index = IVFFlatIndex('test', nlist=4, min_train_size=10)
+        index.bulk_load(enumerate(unit_rows(self.rng, 100), start=1))
+        kmeans = index._kmeans
+
+        def kmeans_with_compaction(data):
+            index.remove(1)
+            index.compact()
+            return kmeans(data)
+
+        index._kmeans = kmeans_with_compaction
+        self.assertFalse(index.train())
+        self.assertFalse(index.is_trained)
+
+
+@override_settings(VECTOR_INDEX_SYNC_INTERVAL=0, EMBEDDING_SNAPSHOT_DIR=None)
+class LiveIndexTests(TestCase):
+    """The process-wide indexes follow saves through signals and other processes' writes through syncs."""
+
+    def setUp(self):
+        for patcher in (mock.patch.dict(vector_index._indexes, clear=True),
+                        mock.patch.dict(vector_index._watermarks, clear=True),
+                        mock.patch.object(vector_index, '_snapshot_version', None)):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.charity = Charity.objects.create(
+            name="Water", aptos_wallet_address="0x1", contact_email="a@example.com", embedding=[1.0, 0.0, 0.0])
+
+    def _top(self, index, query):
+        results = index.search(query, top_k=1)
+        return results[0][0] if results else None
+
+    def test_signals_upsert_and_remove_charities(self):
+        index = vector_index.get_charity_index()
+        self.assertEqual(self._top(index, [1.0, 0.0, 0.0]), self.charity.id)
+
+        other = Charity.objects.create(
+            name="Trees", aptos_wallet_address="0x2", contact_email="b@example.com", embedding=[0.0, 2.0, 0.0])
+        self.assertEqual(self._top(index, [0.0, 1.0, 0.0]), other.id)
+
+        self.charity.embedding = [0.0, 0.0, 5.0]
+        self.charity.save()
+        self.assertEqual(self._top(index, [0.0, 0.0, 1.0]), self.charity.id)
+
+        other.delete()
+        self.assertNotIn(other.id, index)
+
+    def test_inactive_movements_leave_the_index(self):
+        movement = Movement.objects.create(charity=self.charity, title="Wells", slug="wells", embedding=[0.0, 1.0, 0.0])
+        index = vector_index.get_movement_index()
+        self.assertIn(movement.id, index)
+        movement.is_active = False
+        movement.save()
+        self.assertNotIn(movement.id, index)
+
+    def test_sync_picks_up_writes_that_bypass_signals(self):
+        index = vector_index.get_charity_index()
+        vector_index._watermarks['charity'] -= timedelta(seconds=5)
+        Charity.objects.filter(id=self.charity.id).update(
+            embedding=np.array([0.0, 1.0, 0.0], dtype=np.float32), embedding_norm=1.0, updated_at=timezone.now())
+        self.assertEqual(vector_index.sync_index_changes('charity'), (1, 0))
+        self.assertEqual(self._top(index, [0.0, 1.0, 0.0]), self.charity.id)
+
+    def test_compaction_reconciles_rows_deleted_elsewhere(self):
+        index = vector_index.get_charity_index()
+        Charity.objects.filter(id=self.charity.id)._raw_delete(using='default')  # no post_delete signal
+        self.assertIn(self.charity.id, index)
+        self.assertEqual(vector_index.compact_index('charity'), 1)
+        self.assertNotIn(self.charity.id, index)
@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from .views import HomeView, RegisterCharityView, CharityListView
@@ -6,6 +7,15 @@ from . import api_views # Import new api_views
 
 app_name = 'main'
 
+# Under ASGI the LLM-bound endpoints are served by native async views (see async_views.py)
+if getattr(settings, 'ASYNC_API_VIEWS', False):
+    from . import async_views
+    semantic_search_view = async_views.AsyncCharitySemanticSearchView.as_view()
+    compass_match_view = async_views.AsyncCompassMatchView.as_view()
+else:
+    semantic_search_view = api_views.CharitySemanticSearchView.as_view()
+    compass_match_view = api_views.CompassMatchView.as_view()
+
 # Create a router and register our viewsets with it.
 router = DefaultRouter()
 router.register(r'charities', api_views.CharityViewSet, basename='charity')
@@ -27,10 +37,11 @@ urlpatterns = [
     path('api/prepare-donation-transaction/', api_views.PrepareDonationTransactionView.as_view(), name='prepare-donation-transaction'),
 
     # New endpoint for semantic charity search
-    path('api/charity-semantic-search/', api_views.CharitySemanticSearchView.as_view(), name='charity-semantic-search'),
+    path('api/charity-semantic-search/', semantic_search_view, name='charity-semantic-search'),
+    path('api/charity-semantic-search/mission/<str:token>/', api_views.CombinedMissionView.as_view(), name='charity-search-mission'),
 
     # Compass matching endpoint
-    path('api/compass/match/', api_views.CompassMatchView.as_view(), name='compass-match'),
+    path('api/compass/match/', compass_match_view, name='compass-match'),
 
     # Old API endpoints (to be removed or commented out)
     # path('api/charities/featured/', api.featured_charities, name='api-featured-charities'),
@@ -1,15 +1,26 @@
 import os
+import asyncio
+import hashlib
+import secrets
+import threading
 import openai
+import numpy as np
 import requests
 import json # Import json for parsing
 from bs4 import BeautifulSoup
 from pydantic import BaseModel, Field, ValidationError
-from typing import List, Optional
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from datetime import timedelta
+from typing import Dict, List, Optional, Tuple
 from django.conf import settings
-from .models import Charity # Assuming Charity model is in the same app's models.py
-from django.db.models import Q
-from sklearn.metrics.pairwise import cosine_similarity
-import numpy as np
+from django.utils import timezone
+from asgiref.sync import sync_to_async
+from .models import Charity, EmbeddingCache, MissionToken # Assuming Charity model is in the same app's models.py
+from .vector_index import get_charity_index
+from .lexical_index import get_charity_text_index, reciprocal_rank_fusion
+from .local_embeddings import embed_query as embed_query_locally, get_local_charity_index, resolve_backend
+from .openai_client import client_error, get_async_client, get_loop, run_sync
+from .cache import normalize_query, query_enhancement_cache, query_embedding_cache, mission_statement_cache
 from django.db.models.signals import post_save
 from django.dispatch import receiver
 
@@ -36,34 +47,156 @@ class CombinedCharityMission(BaseModel):
     # contributing_charity_names: Optional[List[str]] = Field(None, description="Names of the charities that most contributed to this combined statement.")
 
 # --- OpenAI Client Initialization ---
+# One shared AsyncOpenAI with a pooled HTTP/2 connection pool on a persistent
+# event loop (see main/openai_client.py); sync code runs its calls via run_sync().
 
-try:
-    openai.api_key = os.getenv("OPENAI_API_KEY")
-    if not openai.api_key and hasattr(settings, 'OPENAI_API_KEY'):
-        openai.api_key = settings.OPENAI_API_KEY
-    
-    if not openai.api_key:
-        raise ValueError("OPENAI_API_KEY not found in environment variables or Django settings.")
-    
-    client = openai.OpenAI(api_key=openai.api_key)
-
-except Exception as e:
-    print(f"Error initializing OpenAI client: {e}")
-    client = None
+client = get_async_client()
+if client is None:
+    print(f"Error initializing OpenAI client: {client_error()}")
 
 
 # --- Core Functions (Synchronous) ---
 
-def get_embedding(text: str, model="text-embedding-3-small") -> Optional[List[float]]:
-    if not client or not text:
-        return None
+# Provider limits for one embeddings request (OpenAI: 2048 inputs, ~300k tokens).
+# Token counts are estimated at ~4 characters per token, with some headroom.
+EMBEDDING_BATCH_MAX_INPUTS = 2048
+EMBEDDING_BATCH_MAX_TOKENS = 250_000
+
+
+def _estimate_tokens(text: str) -> int:
+    return len(text) // 4 + 1
+
+
+def _embedding_batches(items: List[tuple]) -> List[List[tuple]]:
+    """Split (position, text) pairs into request-sized batches, keeping their order."""
+    batches, current, current_tokens = [], [], 0
+    for item in items:
+        tokens = _estimate_tokens(item[1])
+        if current and (len(current) >= EMBEDDING_BATCH_MAX_INPUTS or current_tokens + tokens > EMBEDDING_BATCH_MAX_TOKENS):
+            batches.append(current)
+            current, current_tokens = [], 0
+        current.append(item)
+        current_tokens += tokens
+    if current:
+        batches.append(current)
+    return batches
+
+
+# --- Embedding cache (content-addressed, DB-backed) ---
+
+_embedding_cache_counters = {'hits': 0, 'misses': 0}
+_embedding_cache_lock = threading.Lock()
+
+
+def _normalize_embedding_text(text: str) -> str:
+    return " ".join(text.split())
+
+
+def _embedding_text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def embedding_cache_stats() -> dict:
+    """Process-wide embedding cache hit/miss counters."""
+    with _embedding_cache_lock:
+        stats = dict(_embedding_cache_counters)
+    lookups = stats['hits'] + stats['misses']
+    stats['hit_rate'] = round(stats['hits'] / lookups, 3) if lookups else 0.0
+    return stats
+
+
+def _read_embedding_cache(model: str, hashes: List[str]) -> dict:
+    cached = {}
     try:
-        text = text.replace("\n", " ")
-        response = client.embeddings.create(input=[text], model=model)
-        return response.data[0].embedding
+        for start in range(0, len(hashes), 500):
+            rows = EmbeddingCache.objects.filter(model_name=model, text_hash__in=hashes[start:start + 500])
+            cached.update(rows.values_list('text_hash', 'embedding'))
     except Exception as e:
-        print(f"Error getting embedding for text '{text[:100]}...': {e}")
-        return None
+        print(f"Embedding cache read failed: {e}")
+    return cached
+
+
+def _write_embedding_cache(model: str, vectors: dict) -> None:
+    try:
+        EmbeddingCache.objects.bulk_create(
+            [EmbeddingCache(model_name=model, text_hash=h, embedding=v) for h, v in vectors.items()],
+            batch_size=500,
+            ignore_conflicts=True,
+        )
+    except Exception as e:
+        print(f"Embedding cache write failed: {e}")
+
+
+def _embed_uncached(texts: List[str], model: str) -> List[Optional[List[float]]]:
+    """Call the embeddings API for `texts`, batched; None marks a failed item."""
+    results: List[Optional[List[float]]] = [None] * len(texts)
+    if not client:
+        return results
+    for batch in _embedding_batches(list(enumerate(texts))):
+        try:
+            timeout = getattr(settings, 'OPENAI_EMBEDDING_TIMEOUT', 30)
+            response = run_sync(client.with_options(timeout=timeout).embeddings.create(
+                input=[text for _, text in batch], model=model,
+            ))
+            for item in response.data:
+                results[batch[item.index][0]] = item.embedding
+        except Exception as e:
+            if len(batch) == 1:
+                print(f"Error getting embedding for text '{batch[0][1][:100]}...': {e}")
+                continue
+            print(f"Error embedding batch of {len(batch)} texts: {e}. Retrying individually.")
+            for position, text in batch:
+                results[position] = _embed_uncached([text], model)[0]
+    return results
+
+
+def get_embeddings(texts: List[str], model="text-embedding-3-small") -> List[Optional[List[float]]]:
+    """
+    Embed many texts with as few API round-trips as possible.
+
+    Texts are whitespace-normalized and looked up in the embedding cache first;
+    only misses (deduplicated) go to the API, and new vectors are written back.
+    Returns one entry per input, in order; an entry is None when the text was
+    empty or could not be embedded. If a whole batch is rejected, its items are
+    retried one by one so a single bad input does not fail the others.
+    """
+    results: List[Optional[List[float]]] = [None] * len(texts)
+    positions_by_hash = {}
+    text_by_hash = {}
+    for i, text in enumerate(texts):
+        normalized = _normalize_embedding_text(text or "")
+        if not normalized:
+            continue
+        text_hash = _embedding_text_hash(normalized)
+        positions_by_hash.setdefault(text_hash, []).append(i)
+        text_by_hash[text_hash] = normalized
+    if not positions_by_hash:
+        return results
+
+    cached = _read_embedding_cache(model, list(positions_by_hash))
+    missing = [h for h in positions_by_hash if h not in cached]
+    with _embedding_cache_lock:
+        _embedding_cache_counters['hits'] += len(positions_by_hash) - len(missing)
+        _embedding_cache_counters['misses'] += len(missing)
+
+    fresh = {}
+    for text_hash, vector in zip(missing, _embed_uncached([text_by_hash[h] for h in missing], model)):
+        if vector is not None:
+            fresh[text_hash] = vector
+    if fresh:
+        _write_embedding_cache(model, fresh)
+
+    for text_hash, positions in positions_by_hash.items():
+        vector = fresh.get(text_hash)
+        if vector is None and text_hash in cached:
+            vector = cached[text_hash].tolist()
+        for i in positions:
+            results[i] = vector
+    return results
+
+
+def get_embedding(text: str, model="text-embedding-3-small") -> Optional[List[float]]:
+    return get_embeddings([text], model=model)[0]
 
 def process_charity_website(charity: Charity) -> None:
     if not client or not charity.website_url:
@@ -116,13 +249,13 @@ def process_charity_website(charity: Charity) -> None:
         )
         
         print(f"Sending text to OpenAI for structured extraction (length: {len(prompt_text)} chars)...")
-        response = client.responses.create(
+        response = run_sync(client.responses.create(
             model="gpt-5",
             instructions="You are an expert assistant skilled in analyzing charity websites and extracting structured information according to the provided tool. Provide all requested fields: summary, tagline, category, and keywords.",
             input=prompt_text,
             tools=[charity_info_tool],
             tool_choice={"type": "function", "name": "extract_charity_information"},
-        )
+        ))
         
         # Find the function call in the response output
         # Items can be objects (with attributes) or dicts
@@ -232,7 +365,8 @@ def process_charity_website(charity: Charity) -> None:
         charity.embedding = None
         charity.save()
 
-def generate_combined_mission_statement(user_query: str, charities_data: List[dict]) -> Optional[CombinedCharityMission]:
+async def generate_combined_mission_statement_async(user_query: str, charities_data: List[dict]) -> Optional[CombinedCharityMission]:
+    """Await on the shared OpenAI loop (see main/openai_client.py)."""
     if not client or not charities_data:
         print("OpenAI client not initialized or no charities data provided for combined mission.")
         return None
@@ -257,7 +391,8 @@ def generate_combined_mission_statement(user_query: str, charities_data: List[di
 
     try:
         print(f"Sending prompt to OpenAI for combined mission statement (query: '{user_query}', num_charities: {len(charities_data)})...")
-        response = client.responses.create(
+        timeout = getattr(settings, 'MISSION_GENERATION_TIMEOUT', 30)
+        response = await client.with_options(timeout=timeout).responses.create(
             model="gpt-5",
             instructions="You are an expert assistant skilled in synthesizing information about multiple charities and a user query into a single, impactful mission statement. Respond using the provided tool.",
             input=prompt_text,
@@ -317,33 +452,119 @@ def generate_combined_mission_statement(user_query: str, charities_data: List[di
         print(f"General error generating combined mission statement: {e} (Type: {type(e).__name__})")
         return None
 
-def enhance_query_and_search(user_query: str, top_k: int = 5) -> List[Charity]:
-    def fallback_charity_search(q: str, limit: int = 6) -> List[Charity]:
-        try:
-            base_qs = Charity.objects.all()
-            if q and q.strip():
-                naive_qs = base_qs.filter(
-                    Q(name__icontains=q) |
-                    Q(description__icontains=q) |
-                    Q(tagline__icontains=q)
-                ).order_by('-is_verified', '-date_registered')
-                results = list(naive_qs[:limit])
-                if results:
-                    print(f"Fallback search returned {len(results)} charities for query '{q}'.")
-                    return results
-            # As a last resort, return some verified or recent charities
-            verified_qs = base_qs.filter(is_verified=True).order_by('-date_registered')
-            results = list(verified_qs[:limit]) if verified_qs.exists() else list(base_qs.order_by('-date_registered')[:limit])
-            print(f"Fallback default returned {len(results)} charities.")
-            return results
-        except Exception as e:
-            print(f"Fallback search error: {e}")
-            return []
+def generate_combined_mission_statement(user_query: str, charities_data: List[dict]) -> Optional[CombinedCharityMission]:
+    return run_sync(generate_combined_mission_statement_async(user_query, charities_data))
+
+# --- Deferred combined mission statements ---
+#
+# The semantic search endpoint returns its charities immediately with a mission
+# token; the statement is generated in the background and fetched from
+# CombinedMissionView. Token state lives in the MissionToken table, so any
+# worker can answer for a token, and generation runs as a coroutine on the
+# shared OpenAI loop - bounded by its connection pool, not a thread pool.
+
+DEFAULT_RESONATING_STATEMENT = "Explore these charities that align with your vision."
+MISSION_RETRY_AFTER = 1  # seconds a client should wait before polling a pending token again
+
+# Generations started by this worker, referenced until they finish
+_mission_jobs: Dict[str, Future] = {}
+_mission_jobs_lock = threading.Lock()
+
+# Statements for the same query and charity set are reused from mission_statement_cache.
+# Keys embed a fingerprint of each charity's name and description (what the prompt
+# sees), so an edited charity can never hit a stale statement; old entries simply
+# age out of the cache by LRU / TTL.
+
+def _charity_fingerprint(charity_data: dict) -> str:
+    text = f"{charity_data.get('name') or ''}\0{charity_data.get('description') or ''}"
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()[:16]
+
+def _mission_cache_key(user_query: str, charities_data: List[dict]) -> Optional[tuple]:
+    if any(c.get('id') is None for c in charities_data):
+        return None
+    ordered = sorted(charities_data, key=lambda c: c['id'])
+    return (
+        normalize_query(user_query),
+        tuple(c['id'] for c in ordered),
+        tuple(_charity_fingerprint(c) for c in ordered),
+    )
 
-    if not client:
-        print("OpenAI client not initialized. Using fallback search.")
-        return fallback_charity_search(user_query)
+def _mission_token_cutoff():
+    return timezone.now() - timedelta(seconds=getattr(settings, 'MISSION_TOKEN_TTL', 600))
+
+def prune_expired_mission_tokens() -> int:
+    """Delete tokens older than MISSION_TOKEN_TTL; run periodically by the vector index maintenance thread."""
+    deleted, _ = MissionToken.objects.filter(created_at__lt=_mission_token_cutoff()).delete()
+    return deleted
+
+def _complete_mission_token(token: str, statement: str, cache_key: Optional[tuple] = None) -> None:
+    if cache_key is not None:
+        mission_statement_cache.set(cache_key, statement)
+    try:
+        MissionToken.objects.filter(token=token).update(statement=statement, completed_at=timezone.now())
+    except Exception as e:
+        print(f"Saving combined mission for token {token} failed: {e}")
 
+async def _generate_mission_for_token(token: str, user_query: str, charities_data: List[dict]) -> str:
+    statement, cache_key = DEFAULT_RESONATING_STATEMENT, None
+    try:
+        result = await generate_combined_mission_statement_async(user_query, charities_data)
+        if result and result.resonating_statement:
+            statement = result.resonating_statement
+            cache_key = _mission_cache_key(user_query, charities_data)
+    finally:
+        # ORM and cache-backend calls are blocking: keep them off the shared loop
+        await sync_to_async(_complete_mission_token)(token, statement, cache_key)
+    return statement
+
+def _forget_mission_job(token: str) -> None:
+    with _mission_jobs_lock:
+        _mission_jobs.pop(token, None)
+
+def cached_combined_mission(user_query: str, charities_data: List[dict]) -> Optional[str]:
+    """
+    Return the combined mission statement if no generation is needed, else None.
+
+    `charities_data` items carry 'id', 'name' and 'description'. With no
+    charities the default statement is returned.
+    """
+    if not charities_data:
+        return DEFAULT_RESONATING_STATEMENT
+    cache_key = _mission_cache_key(user_query, charities_data)
+    return mission_statement_cache.get(cache_key) if cache_key is not None else None
+
+def start_combined_mission(user_query: str, charities_data: List[dict]) -> str:
+    """
+    Generate the combined mission statement in the background; returns the token to fetch it with.
+
+    Check cached_combined_mission() first: this always creates a token and calls the LLM.
+    """
+    token = secrets.token_urlsafe(16)
+    MissionToken.objects.create(token=token)
+    future = asyncio.run_coroutine_threadsafe(_generate_mission_for_token(token, user_query, charities_data), get_loop())
+    with _mission_jobs_lock:
+        _mission_jobs[token] = future
+    future.add_done_callback(lambda done, token=token: _forget_mission_job(token))
+    return token
+
+def get_combined_mission(token: str) -> Tuple[str, Optional[str]]:
+    """
+    Look up a mission token without waiting; clients poll until it is ready.
+
+    Returns (status, statement) with status 'ready', 'pending' or 'unknown'.
+    """
+    row = MissionToken.objects.filter(token=token, created_at__gte=_mission_token_cutoff()).values('statement').first()
+    if row is None:
+        return 'unknown', None
+    if row['statement'] is None:
+        return 'pending', None
+    return 'ready', row['statement']
+
+async def _request_query_enhancement_async(user_query: str) -> Optional[str]:
+    """Ask the LLM to rewrite `user_query`; caches and returns the result, or None on failure. Await on the shared loop."""
+    if not client:
+        return None
+    cache_key = normalize_query(user_query)
     try:
         enhanced_query_tool = {
             "type": "function",
@@ -353,7 +574,8 @@ def enhance_query_and_search(user_query: str, top_k: int = 5) -> List[Charity]:
         }
         prompt = f"Enhance the following user query to make it more effective for semantic search in a database of charities. Focus on keywords and the underlying intent. Return the enhanced query.\n\nUser Query: '{user_query}'"
         
-        response = client.responses.create(
+        timeout = getattr(settings, 'QUERY_ENHANCEMENT_TIMEOUT', 20)
+        response = await client.with_options(timeout=timeout).responses.create(
             model="gpt-5",
             instructions="You are an expert query enhancer. Your goal is to refine user queries for better semantic search against a charity database. Respond using the provided tool.",
             input=prompt,
@@ -361,8 +583,6 @@ def enhance_query_and_search(user_query: str, top_k: int = 5) -> List[Charity]:
             tool_choice={"type": "function", "name": "enhance_user_query"},
         )
         
-        search_query_text = user_query # Default to original query
-        
         # Find the function call in the response output
         # Items can be objects (with attributes) or dicts
         function_call_item = None
@@ -398,88 +618,231 @@ def enhance_query_and_search(user_query: str, top_k: int = 5) -> List[Charity]:
                 enhanced_query_data = EnhancedQuery.model_validate_json(arguments_json) # Pydantic v2 method
                 search_query_text = enhanced_query_data.enhanced_query
                 print(f"Original query: '{user_query}', Enhanced query: '{search_query_text}'")
+                # A shared cache backend is a blocking network call: keep it off the shared loop
+                await sync_to_async(query_enhancement_cache.set, thread_sensitive=False)(cache_key, search_query_text)
+                return search_query_text
             except ValidationError as e:
                 print(f"Pydantic validation error for enhanced query: {e}. Using original query.")
             except json.JSONDecodeError as e:
                 print(f"JSON decode error for enhanced query: {e}. Using original query.")
         else:
             print("OpenAI did not use the tool for query enhancement. Using original query.")
+    except openai.APIError as e:
+        print(f"OpenAI API error enhancing query '{user_query}': {e}. Using original query.")
+    return None
+
+def _request_query_enhancement(user_query: str) -> Optional[str]:
+    return run_sync(_request_query_enhancement_async(user_query))
+
+def enhance_query(user_query: str) -> str:
+    """
+    Rewrite a user query for semantic search with the LLM.
+
+    Results are cached per normalized query (see main.cache); on any failure
+    the original query is returned and nothing is cached.
+    """
+    cached = query_enhancement_cache.get(normalize_query(user_query))
+    if cached is not None:
+        return cached
+    enhanced = _request_query_enhancement(user_query)
+    return enhanced if enhanced is not None else user_query
+
+# Enhancements run as coroutines on the shared OpenAI loop, so concurrency is bounded by
+# its connection pool rather than a few threads with a queue in front of them; ones that
+# overrun the search latency budget keep running there and land in the cache.
+_enhancements_in_flight: Dict[str, Future] = {}
+_enhancements_lock = threading.Lock()
+
+def _start_query_enhancement(user_query: str) -> Future:
+    """Start an enhancement on the shared loop, or join the one already running for the same normalized query."""
+    key = normalize_query(user_query)
+    with _enhancements_lock:
+        future = _enhancements_in_flight.get(key)
+        if future is not None:
+            return future
+        future = asyncio.run_coroutine_threadsafe(_request_query_enhancement_async(user_query), get_loop())
+        _enhancements_in_flight[key] = future
+
+    def _forget(done: Future):
+        with _enhancements_lock:
+            if _enhancements_in_flight.get(key) is done:
+                del _enhancements_in_flight[key]
+
+    # Registered outside the lock: a future that is already done runs the callback right here
+    future.add_done_callback(_forget)
+    return future
+
+def enhance_query_within_budget(user_query: str, budget: Optional[float] = None) -> Tuple[str, str]:
+    """
+    Enhance `user_query`, waiting at most `budget` seconds (QUERY_ENHANCEMENT_BUDGET by default).
+
+    Returns (search text, path), where path is one of:
+      'cached'      - enhancement served from the query cache
+      'enhanced'    - fresh enhancement finished within the budget
+      'raw_timeout' - budget ran out; the raw query is used and the enhancement
+                      finishes in the background, warming the cache for next time
+      'raw'         - enhancement unavailable or failed; the raw query is used
+    """
+    cached = query_enhancement_cache.get(normalize_query(user_query))
+    if cached is not None:
+        return cached, 'cached'
+    if not client:
+        return user_query, 'raw'
+    if budget is None:
+        budget = getattr(settings, 'QUERY_ENHANCEMENT_BUDGET', 1.5)
+    future = _start_query_enhancement(user_query)
+    try:
+        enhanced = future.result(timeout=max(budget, 0))
+    except FutureTimeoutError:
+        print(f"Query enhancement for '{user_query}' exceeded its {budget}s budget. Using original query.")
+        return user_query, 'raw_timeout'
+    if enhanced is None:
+        return user_query, 'raw'
+    return enhanced, 'enhanced'
+
+def get_query_embedding(text: str, model="text-embedding-3-small", backend: str = 'openai') -> Optional[np.ndarray]:
+    """
+    Embed an interactive search query, served from the in-process query cache when possible.
+
+    backend='local' embeds in-process with the fitted scikit-learn model
+    (main/local_embeddings.py); search those vectors against the local indexes only.
+    """
+    if backend == 'local':
+        return embed_query_locally(text)
+    cache_key = (model, normalize_query(text))
+    cached = query_embedding_cache.get(cache_key)
+    if cached is not None:
+        return cached
+    embedding = get_embedding(text, model=model)
+    if embedding is None:
+        return None
+    vector = np.asarray(embedding, dtype=np.float32)
+    query_embedding_cache.set(cache_key, vector)
+    return vector
 
+# Candidates taken from each ranking before reciprocal-rank fusion
+HYBRID_SEARCH_CANDIDATES = 50
 
-        query_embedding = get_embedding(search_query_text)
-        if not query_embedding:
-            print(f"Failed to embed query: '{search_query_text}'. Using fallback search.")
-            return fallback_charity_search(user_query)
-
-        charities_with_embeddings = Charity.objects.filter(embedding__isnull=False).exclude(embedding__exact=[]) # Exclude empty lists
-        
-        if not charities_with_embeddings.exists():
-            print("No charities with embeddings found in the database. Using fallback search.")
-            return fallback_charity_search(user_query)
-
-        # Filter out charities with invalid or missing embeddings before creating numpy array
-        valid_charities = []
-        all_charity_embeddings_list = []
-        for charity in charities_with_embeddings:
-            if charity.embedding and isinstance(charity.embedding, list) and len(charity.embedding) > 0:
-                 # Assuming embedding is a list of floats. Add further validation if needed.
-                is_valid_embedding = all(isinstance(val, (int, float)) for val in charity.embedding)
-                if is_valid_embedding:
-                    valid_charities.append(charity)
-                    all_charity_embeddings_list.append(charity.embedding)
-                else:
-                    print(f"Skipping charity {charity.name} due to invalid embedding content: {charity.embedding}")
-            else:
-                print(f"Skipping charity {charity.name} due to missing or invalid embedding: {charity.embedding}")
-        
-        if not valid_charities:
-            print("No charities with valid embeddings available for search. Using fallback search.")
-            return fallback_charity_search(user_query)
-
-        charity_embeddings_np = np.array(all_charity_embeddings_list)
-        query_embedding_np = np.array(query_embedding).reshape(1, -1)
-
-        similarities = cosine_similarity(query_embedding_np, charity_embeddings_np)[0]
-        
-        # Add similarity scores to charities for potential sorting/filtering
-        # charities_with_scores = []
-        # for i, charity in enumerate(valid_charities):
-        #     charities_with_scores.append({"charity": charity, "score": similarities[i]})
-        
-        # Sort by score and get top K
-        # sorted_charities = sorted(charities_with_scores, key=lambda x: x["score"], reverse=True)
-        # top_k_results = [item["charity"] for item in sorted_charities[:top_k] if item["score"] > 0.75] # Optional threshold
-
-        # More direct way with argsort
-        # Ensure we only consider indices for valid_charities
-        num_valid_charities = len(valid_charities)
-        if num_valid_charities == 0 : return []
-
-        # Argsort returns indices from smallest to largest similarity
-        # We need to handle cases where top_k might be larger than num_valid_charities
-        actual_top_k = min(top_k, num_valid_charities)
-        top_k_indices = np.argsort(similarities)[-actual_top_k:][::-1]
-
-        results = []
-        similarity_threshold = 0.5 # Slightly relaxed threshold
-        for i in top_k_indices:
-            if i < len(valid_charities) and similarities[i] >= similarity_threshold: # Check index bounds and threshold
-                results.append(valid_charities[i])
-            # else: # Optional: log why a potential top-k was skipped
-                # print(f"Skipping charity {valid_charities[i].name if i < len(valid_charities) else 'N/A'} with similarity {similarities[i] if i < len(similarities) else 'N/A'}")
-
-        print(f"Found {len(results)} charities for query '{search_query_text}' (threshold: {similarity_threshold}).")
-        if not results:
-            print("Semantic search yielded 0 results. Using fallback search.")
-            return fallback_charity_search(user_query)
+def _default_charities(limit: int = 6) -> List[Charity]:
+    """Last resort when nothing matches: verified charities first, otherwise the most recent."""
+    try:
+        base_qs = Charity.objects.all()
+        verified_qs = base_qs.filter(is_verified=True).order_by('-date_registered')
+        results = list(verified_qs[:limit]) if verified_qs.exists() else list(base_qs.order_by('-date_registered')[:limit])
+        print(f"Fallback default returned {len(results)} charities.")
         return results
+    except Exception as e:
+        print(f"Fallback search error: {e}")
+        return []
+
+def _lexical_charity_ranking(user_query: str, limit: int) -> List[int]:
+    try:
+        lexical_matches = get_charity_text_index().search(user_query, top_k=limit)
+        return [charity_id for charity_id, _ in lexical_matches]
+    except Exception as e:
+        print(f"Lexical search error for query '{user_query}': {e} (Type: {type(e).__name__})")
+        return []
 
+def _semantic_charity_ranking(search_text: str, limit: int) -> List[int]:
+    """Charity ids ranked by embedding similarity to `search_text`; empty if embedding is unavailable."""
+    try:
+        backend = resolve_backend('CHARITY_SEARCH_EMBEDDING_BACKEND')
+        query_embedding = get_query_embedding(search_text, backend=backend)
+        if query_embedding is None:
+            print(f"Failed to embed query: '{search_text}'.")
+            return []
+        if backend == 'local':
+            # LSA cosines run lower than OpenAI's, so the local backend has its own threshold
+            index = get_local_charity_index()
+            similarity_threshold = getattr(settings, 'LOCAL_EMBEDDING_MIN_SCORE', 0.3)
+        else:
+            index = get_charity_index()
+            similarity_threshold = 0.5 # Slightly relaxed threshold
+        top_matches = index.search(query_embedding, top_k=limit, min_score=similarity_threshold)
+        return [charity_id for charity_id, _ in top_matches]
     except openai.APIError as e:
-        print(f"OpenAI API error during semantic search for query '{user_query}': {e}")
-        return fallback_charity_search(user_query)
+        print(f"OpenAI API error during semantic search for query '{search_text}': {e}")
     except Exception as e:
-        print(f"General error during semantic search for query '{user_query}': {e} (Type: {type(e).__name__})")
-        return fallback_charity_search(user_query)
+        print(f"General error during semantic search for query '{search_text}': {e} (Type: {type(e).__name__})")
+    return []
+
+async def _rank_charities_async(user_query: str, top_k: int) -> Tuple[List[int], dict]:
+    """
+    Charity ids for `user_query`, best first, by speculative hybrid ranking.
+
+    The LLM enhancement (bounded by its latency budget), the raw-query
+    embedding plus a preliminary vector search, and the BM25 lookup all start
+    at once. If the enhancement yields a different query, it is embedded and
+    searched once it arrives and its ranking is fused ahead of the raw one, so
+    a fresh enhancement costs up to the budget plus one embedding call; a
+    cached one is embedded alongside the raw query. All rankings are merged by
+    reciprocal-rank fusion (main.lexical_index), so keyword matches still come
+    back when embedding fails or is skipped.
+    """
+    search_info = {'query_path': 'raw', 'search_query': user_query}
+    limit = HYBRID_SEARCH_CANDIDATES
+    # Each branch gets its own worker thread so concurrent searches overlap instead of
+    # queueing on asgiref's single thread-sensitive executor
+    lexical_task = asyncio.ensure_future(
+        sync_to_async(_lexical_charity_ranking, thread_sensitive=False)(user_query, limit)
+    )
+    rankings = []
+    if client:
+        enhancement_task = asyncio.ensure_future(
+            sync_to_async(enhance_query_within_budget, thread_sensitive=False)(user_query)
+        )
+        raw_task = asyncio.ensure_future(
+            sync_to_async(_semantic_charity_ranking, thread_sensitive=False)(user_query, limit)
+        )
+        search_text, search_info['query_path'] = await enhancement_task
+        search_info['search_query'] = search_text
+        if normalize_query(search_text) != normalize_query(user_query):
+            rankings.append(await sync_to_async(_semantic_charity_ranking, thread_sensitive=False)(search_text, limit))
+        rankings.append(await raw_task)
+    else:
+        print("OpenAI client not initialized. Using lexical search only.")
+    lexical_ids = await lexical_task
+    search_info['semantic_candidates'] = len(set().union(*rankings)) if rankings else 0
+    search_info['lexical_candidates'] = len(lexical_ids)
+    rankings.append(lexical_ids)
+    return [charity_id for charity_id, _ in reciprocal_rank_fusion(rankings)[:top_k]], search_info
+
+def _load_ranked_charities(user_query: str, ranked_ids: List[int], search_info: dict) -> List[Charity]:
+    """Fetch the winning charities in ranking order (one ORM hit), or the defaults if none are left."""
+    if not ranked_ids:
+        print(f"No semantic or lexical matches for query '{user_query}'. Using fallback search.")
+        return _default_charities()
+    charities_by_id = Charity.objects.in_bulk(ranked_ids)
+    results = [charities_by_id[charity_id] for charity_id in ranked_ids if charity_id in charities_by_id]
+    print(f"Found {len(results)} charities for query '{user_query}' "
+          f"({search_info['semantic_candidates']} semantic, {search_info['lexical_candidates']} lexical candidates, "
+          f"query path: {search_info['query_path']}).")
+    return results or _default_charities()
+
+async def hybrid_charity_search_async(user_query: str, top_k: int = 5) -> Tuple[List[Charity], dict]:
+    """
+    Hybrid charity search with speculative execution (see _rank_charities_async).
+
+    Returns (charities, search info); the info reports which query
+    enhancement path was taken (see enhance_query_within_budget).
+    """
+    ranked_ids, search_info = await _rank_charities_async(user_query, top_k)
+    results = await sync_to_async(_load_ranked_charities)(user_query, ranked_ids, search_info)
+    return results, search_info
+
+def hybrid_charity_search(user_query: str, top_k: int = 5) -> Tuple[List[Charity], dict]:
+    """
+    Synchronous entry point for hybrid charity search (for WSGI views and commands).
+
+    The ranking runs on the shared OpenAI loop via run_sync, not a fresh event
+    loop per call; the ORM lookups stay on the calling thread.
+    """
+    ranked_ids, search_info = run_sync(_rank_charities_async(user_query, top_k))
+    return _load_ranked_charities(user_query, ranked_ids, search_info), search_info
+
+def enhance_query_and_search(user_query: str, top_k: int = 5) -> List[Charity]:
+    """Hybrid charity search returning only the ranked charities (see hybrid_charity_search)."""
+    return hybrid_charity_search(user_query, top_k=top_k)[0]
 
 # --- Django Signals ---
 @receiver(post_save, sender=Charity)
@@ -0,0 +1,792 @@
+"""
+In-process vector indexes for semantic charity search and Compass matching.
+
+Embeddings are kept resident in a preallocated float32 matrix with a
+row -> object id map, so a search is a single matrix-vector product over
+rows that were loaded once, instead of a table scan per request. Movements,
+the fastest-growing table, use an IVF-flat approximate index on top.
+"""
+
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .fields import l2_normalize
+
+
+def similarity_scores(rows: np.ndarray, unit_query: np.ndarray) -> np.ndarray:
+    """
+    Cosine similarity of a unit query against unit-length float32 rows.
+
+    The one scoring kernel shared by charity search, Compass matching and IVF
+    cell assignment: with both sides normalized at write time it is a single
+    matvec (or matmul for a block of queries).
+    """
+    return rows @ unit_query.T if unit_query.ndim > 1 else rows @ unit_query
+
+
+class VectorIndex:
+    """
+    Dense cosine-similarity index over L2-normalized float32 rows.
+
+    Rows are stored unit-length, so the score of a query against every row
+    is one matvec. Capacity grows by doubling; existing ids are overwritten
+    in place. Removals leave a tombstone (the row is masked out of results)
+    until compact() squeezes the matrix.
+
+    An index served from a snapshot (see attach()) keeps the snapshot rows in
+    a read-only base matrix: rows [0, base rows) live there and later rows in
+    the in-memory matrix, which takes every write.
+    """
+
+    def __init__(self, name: str, initial_capacity: int = 1024):
+        self.name = name
+        self.dim: Optional[int] = None
+        self._initial_capacity = max(1, initial_capacity)
+        self._matrix: Optional[np.ndarray] = None
+        self._base: Optional[np.ndarray] = None  # read-only snapshot rows, never written
+        self._base_rows = 0
+        self._base_tombstones = 0
+        self._ids = np.empty(0, dtype=np.int64)
+        self._row_of: Dict[int, int] = {}
+        self._size = 0
+        self._tombstones = 0
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __contains__(self, item_id: int) -> bool:
+        return item_id in self._row_of
+
+    @property
+    def tombstones(self) -> int:
+        """Tombstones compact() can drop; removed snapshot rows stay masked until the next snapshot."""
+        return self._tombstones - self._base_tombstones
+
+    def ids(self) -> Set[int]:
+        with self._lock:
+            return set(self._row_of)
+
+    @staticmethod
+    def _as_unit_vector(vector, normalized: bool = False) -> Optional[np.ndarray]:
+        if normalized:
+            # Stored unit-length at write time (see EmbeddingField.norm_field): no O(d) norm pass
+            arr = np.asarray(vector, dtype=np.float32).reshape(-1)
+            return arr if arr.size else None
+        unit, _ = l2_normalize(vector)
+        return unit
+
+    def _ensure_capacity(self, needed: int) -> None:
+        capacity = 0 if self._matrix is None else self._matrix.shape[0]
+        if needed <= self._base_rows + capacity:
+            return
+        new_capacity = max(self._initial_capacity, capacity)
+        while new_capacity < needed - self._base_rows:
+            new_capacity *= 2
+        matrix = np.zeros((new_capacity, self.dim), dtype=np.float32)
+        ids = np.full(self._base_rows + new_capacity, -1, dtype=np.int64)
+        if self._size > self._base_rows:
+            matrix[:self._size - self._base_rows] = self._matrix[:self._size - self._base_rows]
+        if self._size:
+            ids[:self._size] = self._ids[:self._size]
+        self._matrix = matrix
+        self._ids = ids
+
+    def _row_vector(self, row: int) -> np.ndarray:
+        return self._base[row] if row < self._base_rows else self._matrix[row - self._base_rows]
+
+    def _take(self, rows: np.ndarray) -> np.ndarray:
+        """Gather `rows` from the base and in-memory matrices."""
+        if not self._base_rows:
+            return self._matrix[rows]
+        out = np.empty((rows.shape[0], self.dim), dtype=np.float32)
+        in_base = rows < self._base_rows
+        out[in_base] = self._base[rows[in_base]]
+        if not in_base.all():
+            out[~in_base] = self._matrix[rows[~in_base] - self._base_rows]
+        return out
+
+    def _rows_copy(self, start: int, stop: int) -> np.ndarray:
+        """Rows [start, stop) as an array later writes cannot change (base rows are not copied)."""
+        base = self._base_rows
+        if stop <= base:
+            return self._base[start:stop]
+        overlay = self._matrix[max(start - base, 0):stop - base]
+        if start >= base:
+            return overlay.copy()
+        return np.concatenate([self._base[start:], overlay])
+
+    def _score_rows(self, unit: np.ndarray) -> np.ndarray:
+        """Similarity of `unit` against rows [0, size), scoring the base and in-memory matrices separately."""
+        base = min(self._base_rows, self._size)
+        if not base:
+            return similarity_scores(self._matrix[:self._size], unit)
+        scores = similarity_scores(self._base[:base], unit)
+        if self._size > base:
+            scores = np.concatenate([scores, similarity_scores(self._matrix[:self._size - base], unit)])
+        return scores
+
+    def upsert(self, item_id: int, vector, normalized: bool = False) -> bool:
+        """
+        Insert or overwrite the vector for `item_id`. Returns False if the vector is unusable.
+
+        Pass normalized=True for vectors already stored unit-length.
+        """
+        unit = self._as_unit_vector(vector, normalized)
+        if unit is None:
+            return False
+        with self._lock:
+            if self.dim is None:
+                self.dim = unit.shape[0]
+            elif unit.shape[0] != self.dim:
+                print(f"[{self.name}] Skipping id {item_id}: embedding has {unit.shape[0]} dims, index has {self.dim}.")
+                return False
+            row = self._row_of.get(item_id)
+            if row is not None and row < self._base_rows:
+                # Snapshot rows are read-only: mask the old row and append the new vector
+                self._ids[row] = -1
+                self._tombstones += 1
+                self._base_tombstones += 1
+                row = None
+            if row is None:
+                self._ensure_capacity(self._size + 1)
+                row = self._size
+                self._size += 1
+                self._row_of[item_id] = row
+                self._ids[row] = item_id
+            self._matrix[row - self._base_rows] = unit
+            return True
+
+    def remove(self, item_id: int) -> bool:
+        """Tombstone the row for `item_id`. Returns False if it was not indexed."""
+        with self._lock:
+            row = self._row_of.pop(item_id, None)
+            if row is None:
+                return False
+            self._ids[row] = -1
+            if row < self._base_rows:
+                self._base_tombstones += 1
+            else:
+                self._matrix[row - self._base_rows] = 0.0
+            self._tombstones += 1
+            return True
+
+    def apply(self, changes: Iterable[Tuple[int, Optional[Sequence[float]]]],
+              normalized: bool = False) -> Tuple[int, int]:
+        """Apply (id, vector) changes, where a None vector removes the id. Returns (upserted, removed)."""
+        upserted = removed = 0
+        with self._lock:
+            for item_id, vector in changes:
+                if vector is not None and self.upsert(item_id, vector, normalized):
+                    upserted += 1
+                elif self.remove(item_id):
+                    removed += 1
+        return upserted, removed
+
+    def compact(self) -> int:
+        """
+        Drop tombstoned rows so live rows are contiguous again. Returns how many rows were dropped.
+
+        Snapshot rows are never moved: their tombstones stay masked until the next snapshot is attached.
+        """
+        with self._lock:
+            if self._tombstones == self._base_tombstones:
+                return 0
+            old_size = self._size
+            base = self._base_rows
+            keep = self._ids[:old_size] >= 0
+            keep[:base] = True
+            live = np.flatnonzero(keep)
+            moved = live[base:] - base
+            self._matrix[:moved.size] = self._matrix[moved]
+            self._ids[:live.size] = self._ids[live]
+            self._ids[live.size:old_size] = -1
+            self._size = live.size
+            rows = np.flatnonzero(self._ids[:self._size] >= 0)
+            self._row_of = dict(zip(self._ids[rows].tolist(), rows.tolist()))
+            self._tombstones = self._base_tombstones
+            self._after_compaction(live, old_size)
+            return old_size - live.size
+
+    def _after_compaction(self, live_rows: np.ndarray, old_size: int) -> None:
+        pass
+
+    def attach(self, matrix: np.ndarray, ids: np.ndarray) -> None:
+        """
+        Serve from a read-only matrix, e.g. a memmap of a snapshot.
+
+        The first len(ids) rows of `matrix` become the base and are never
+        written, so every worker keeps sharing the snapshot's pages. Upserts
+        go to the small in-memory matrix searched alongside it (an overwritten
+        snapshot row is masked and re-appended), and removals only mask rows.
+        """
+        with self._lock:
+            size = ids.shape[0]
+            self.dim = matrix.shape[1]
+            self._base = matrix[:size]
+            self._base_rows = size
+            self._base_tombstones = 0
+            self._matrix = None
+            self._ids = np.array(ids, dtype=np.int64)
+            self._size = size
+            self._row_of = {int(item_id): row for row, item_id in enumerate(self._ids[:size])}
+            self._tombstones = 0
+
+    def _materialize(self) -> None:
+        """Copy the base rows into the in-memory matrix, so every row can be moved or written."""
+        if not self._base_rows:
+            return
+        base = self._base_rows
+        matrix = np.zeros((self._ids.shape[0], self.dim), dtype=np.float32)
+        matrix[:base] = self._base
+        if self._size > base:
+            matrix[base:self._size] = self._matrix[:self._size - base]
+        self._matrix = matrix
+        self._base = None
+        self._base_rows = 0
+        self._base_tombstones = 0
+
+    def export_arrays(self) -> Dict[str, np.ndarray]:
+        """
+        Compact and return the live rows as arrays suitable for a snapshot.
+
+        An index attached to a snapshot is first copied into memory in full.
+        """
+        with self._lock:
+            self._materialize()
+            self.compact()
+            if self._matrix is None:
+                return {}
+            return {'vectors': self._matrix[:self._size], 'ids': self._ids[:self._size]}
+
+    def bulk_load(self, items: Iterable[Tuple[int, Sequence[float]]], normalized: bool = False) -> int:
+        """Load many (id, vector) pairs; returns how many were accepted."""
+        loaded = 0
+        with self._lock:
+            for item_id, vector in items:
+                if self.upsert(item_id, vector, normalized):
+                    loaded += 1
+        return loaded
+
+    def search(self, query, top_k: int = 5, min_score: Optional[float] = None) -> List[Tuple[int, float]]:
+        """
+        Return up to `top_k` (id, cosine similarity) pairs, best first.
+
+        Uses a partial selection (argpartition) so only the winning rows are sorted.
+        """
+        unit = self._as_unit_vector(query)
+        if unit is None or top_k <= 0:
+            return []
+        with self._lock:
+            if not self._size or unit.shape[0] != self.dim:
+                return []
+            scores = self._score_rows(unit)
+            ids = self._ids[:self._size].copy()
+            if self._tombstones:
+                scores[ids < 0] = -np.inf
+        return self._select_top_k(scores, ids, top_k, min_score)
+
+    @staticmethod
+    def _select_top_k(scores: np.ndarray, ids: np.ndarray, top_k: int,
+                      min_score: Optional[float]) -> List[Tuple[int, float]]:
+        k = min(top_k, scores.shape[0])
+        if k < scores.shape[0]:
+            candidates = np.argpartition(-scores, k - 1)[:k]
+        else:
+            candidates = np.arange(scores.shape[0])
+        ordered = candidates[np.argsort(-scores[candidates], kind='stable')]
+
+        results = []
+        for pos in ordered:
+            score = float(scores[pos])
+            if score == -np.inf or (min_score is not None and score < min_score):
+                break
+            results.append((int(ids[pos]), score))
+        return results
+
+
+class IVFFlatIndex(VectorIndex):
+    """
+    Inverted-file (IVF-flat) approximate nearest-neighbour index.
+
+    Rows are partitioned by spherical k-means into `nlist` cells. A query is
+    scored against the centroids first and then only against the rows of the
+    `nprobe` closest cells, so cost grows with nprobe * N / nlist instead of N.
+    Below `min_train_size` rows (or before training) it behaves exactly like
+    VectorIndex. Raising nprobe trades speed for recall.
+
+    Training is never done on the search path: the maintenance thread calls
+    train(), which runs k-means on a copy of the rows outside the index lock
+    and swaps the centroids and lists in atomically.
+    """
+
+    def __init__(self, name: str, nlist: int = 0, nprobe: int = 8, min_train_size: int = 2000,
+                 kmeans_iterations: int = 10, initial_capacity: int = 1024, seed: int = 0):
+        super().__init__(name, initial_capacity=initial_capacity)
+        self.nlist = nlist
+        self.nprobe = max(1, nprobe)
+        self.min_train_size = min_train_size
+        self.kmeans_iterations = kmeans_iterations
+        self._rng = np.random.default_rng(seed)
+        self._centroids: Optional[np.ndarray] = None
+        self._lists: List[List[int]] = []
+        self._list_arrays: List[Optional[np.ndarray]] = []
+        self._assignment = np.empty(0, dtype=np.int32)
+        self._trained_size = 0
+        self._train_lock = threading.Lock()
+        self._layout_version = 0  # bumped when rows move (compaction, attach)
+        self._training_dirty: Optional[Set[int]] = None  # rows written while train() runs
+
+    @property
+    def is_trained(self) -> bool:
+        return self._centroids is not None
+
+    @property
+    def needs_training(self) -> bool:
+        """True once the index is big enough to train, or has doubled since it was last trained."""
+        if self._size < self.min_train_size:
+            return False
+        return self._centroids is None or self._size >= 2 * self._trained_size
+
+    def _ensure_capacity(self, needed: int) -> None:
+        super()._ensure_capacity(needed)
+        if self._assignment.shape[0] < self._ids.shape[0]:
+            assignment = np.full(self._ids.shape[0], -1, dtype=np.int32)
+            assignment[:self._assignment.shape[0]] = self._assignment
+            self._assignment = assignment
+
+    @staticmethod
+    def _nearest_centroids(vectors: np.ndarray, centroids: np.ndarray, chunk_size: int = 8192) -> np.ndarray:
+        out = np.empty(vectors.shape[0], dtype=np.int32)
+        for start in range(0, vectors.shape[0], chunk_size):
+            block = vectors[start:start + chunk_size]
+            out[start:start + chunk_size] = np.argmax(similarity_scores(block, centroids), axis=1)
+        return out
+
+    def _assign_row(self, row: int, cell: int) -> None:
+        previous = int(self._assignment[row])
+        if previous == cell:
+            return
+        if previous >= 0:
+            self._lists[previous].remove(row)
+            self._list_arrays[previous] = None
+        self._lists[cell].append(row)
+        self._list_arrays[cell] = None
+        self._assignment[row] = cell
+
+    def _set_lists(self, centroids: np.ndarray, labels: np.ndarray) -> None:
+        """Install centroids and rebuild the inverted lists from per-row cell labels."""
+        nlist = centroids.shape[0]
+        size = labels.shape[0]
+        order = np.argsort(labels, kind='stable')
+        bounds = np.searchsorted(labels[order], np.arange(nlist + 1))
+        self._centroids = centroids
+        self._lists = [order[bounds[c]:bounds[c + 1]].tolist() for c in range(nlist)]
+        self._list_arrays = [None] * nlist
+        self._assignment[:size] = labels
+        self._trained_size = size
+
+    def _kmeans(self, data: np.ndarray) -> np.ndarray:
+        """Spherical k-means centroids for `data`, fitted on a sample of at most 32 rows per list."""
+        size = data.shape[0]
+        nlist = self.nlist or int(max(1, round(4 * np.sqrt(size))))
+        nlist = min(nlist, size)
+
+        sample_size = min(size, nlist * 32)
+        sample = data[self._rng.choice(size, sample_size, replace=False)]
+        centroids = sample[self._rng.choice(sample_size, nlist, replace=False)].copy()
+        for _ in range(self.kmeans_iterations):
+            labels = self._nearest_centroids(sample, centroids)
+            order = np.argsort(labels, kind='stable')
+            counts = np.bincount(labels, minlength=nlist)
+            sums = np.zeros_like(centroids)
+            present = np.flatnonzero(counts)
+            starts = np.concatenate(([0], np.cumsum(counts)[:-1]))[present]
+            sums[present] = np.add.reduceat(sample[order], starts, axis=0)
+            empty = counts == 0
+            if empty.any():
+                sums[empty] = sample[self._rng.choice(sample_size, int(empty.sum()))]
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            centroids = (sums / norms).astype(np.float32)
+        return centroids
+
+    def train(self) -> bool:
+        """
+        (Re)build centroids and inverted lists from the current rows.
+
+        k-means and the full assignment pass run on a snapshot of the matrix
+        without holding the index lock, so searches (exact until the first
+        training finishes), upserts and syncs carry on meanwhile. Rows appended
+        or overwritten during training are assigned when the result is swapped
+        in. Returns False if the index is too small, another train() is
+        running, or the rows were compacted in the meantime.
+        """
+        if not self._train_lock.acquire(blocking=False):
+            return False
+        try:
+            with self._lock:
+                size = self._size
+                if size < max(self.min_train_size, 1):
+                    return False
+                data = self._rows_copy(0, size)
+                layout = self._layout_version
+                self._training_dirty = set()
+
+            centroids = labels = None
+            installed = False
+            try:
+                centroids = self._kmeans(data)
+                labels = self._nearest_centroids(data, centroids)
+            finally:
+                with self._lock:
+                    dirty, self._training_dirty = self._training_dirty, None
+                    if labels is not None and self._layout_version == layout:
+                        if self._size > size:
+                            appended = self._nearest_centroids(self._rows_copy(size, self._size), centroids)
+                            labels = np.concatenate([labels, appended])
+                        rewritten = np.fromiter((row for row in dirty if row < size), dtype=np.int64)
+                        if rewritten.size:
+                            labels[rewritten] = self._nearest_centroids(self._take(rewritten), centroids)
+                        self._set_lists(centroids, labels)
+                        installed = True
+            if installed:
+                print(f"[{self.name}] Trained IVF index: {labels.shape[0]} rows, {centroids.shape[0]} lists.")
+            return installed
+        finally:
+            self._train_lock.release()
+
+    def upsert(self, item_id: int, vector, normalized: bool = False) -> bool:
+        with self._lock:
+            if not super().upsert(item_id, vector, normalized):
+                return False
+            row = self._row_of[item_id]
+            if self._training_dirty is not None:
+                self._training_dirty.add(row)
+            if self._centroids is not None:
+                cell = int(np.argmax(similarity_scores(self._centroids, self._row_vector(row))))
+                self._assign_row(row, cell)
+            return True
+
+    def search(self, query, top_k: int = 5, min_score: Optional[float] = None,
+               nprobe: Optional[int] = None) -> List[Tuple[int, float]]:
+        unit = self._as_unit_vector(query)
+        if unit is None or top_k <= 0:
+            return []
+        with self._lock:
+            if self._centroids is None or self._size < self.min_train_size:
+                # Untrained (or too small to bother): exact scan until the maintenance thread trains it
+                return super().search(unit, top_k=top_k, min_score=min_score)
+            if unit.shape[0] != self.dim:
+                return []
+            centroid_scores = similarity_scores(self._centroids, unit)
+            probes = min(nprobe or self.nprobe, centroid_scores.shape[0])
+            cells = np.argpartition(-centroid_scores, probes - 1)[:probes]
+            parts = []
+            for cell in cells:
+                arr = self._list_arrays[cell]
+                if arr is None:
+                    arr = np.asarray(self._lists[cell], dtype=np.int64)
+                    self._list_arrays[cell] = arr
+                parts.append(arr)
+            rows = np.concatenate(parts) if parts else np.empty(0, dtype=np.int64)
+            if not rows.size:
+                return []
+            scores = similarity_scores(self._take(rows), unit)
+            ids = self._ids[rows]
+            if self._tombstones:
+                scores[ids < 0] = -np.inf
+        return self._select_top_k(scores, ids, top_k, min_score)
+
+    def attach(self, matrix: np.ndarray, ids: np.ndarray, centroids: Optional[np.ndarray] = None,
+               assignment: Optional[np.ndarray] = None) -> None:
+        with self._lock:
+            super().attach(matrix, ids)
+            self._layout_version += 1
+            self._assignment = np.full(self._ids.shape[0], -1, dtype=np.int32)
+            if centroids is None or assignment is None:
+                self._centroids = None
+                return
+            self._set_lists(np.array(centroids, dtype=np.float32), np.asarray(assignment, dtype=np.int32))
+
+    def export_arrays(self) -> Dict[str, np.ndarray]:
+        with self._lock:
+            arrays = super().export_arrays()
+            if arrays and self._centroids is not None:
+                arrays['centroids'] = self._centroids
+                arrays['assignment'] = self._assignment[:self._size]
+            return arrays
+
+    def _after_compaction(self, live_rows: np.ndarray, old_size: int) -> None:
+        self._layout_version += 1
+        new_size = live_rows.size
+        self._assignment[:new_size] = self._assignment[live_rows]
+        self._assignment[new_size:old_size] = -1
+        if self._centroids is None:
+            return
+        new_row_of = np.full(old_size, -1, dtype=np.int64)
+        new_row_of[live_rows] = np.arange(new_size)
+        for cell, rows in enumerate(self._lists):
+            remapped = new_row_of[np.asarray(rows, dtype=np.int64)] if rows else np.empty(0, dtype=np.int64)
+            self._lists[cell] = remapped[remapped >= 0].tolist()
+            self._list_arrays[cell] = None
+
+
+# --- Process-wide indexes ---
+#
+# Each index is fed by a row source: source(since=None) yields (id, vector) for
+# the full load, or (id, vector-or-None) for rows updated since a timestamp,
+# where None means "no longer searchable". Sources always yield unit-length
+# vectors, so indexes load them without another normalization pass. Saves in this process reach the
+# index immediately through the model signals below; the maintenance thread
+# picks up changes made by other processes (research commands, other
+# workers) from `updated_at`, reconciles deletions, compacts tombstones and
+# (re)trains IVF indexes off the request path. On each compaction pass it also
+# prunes expired mission tokens (see utils.prune_expired_mission_tokens).
+# When a memory-mapped snapshot is published (see embedding_snapshot.py),
+# indexes start from it instead of the database and swap to newer versions.
+
+_indexes: Dict[str, VectorIndex] = {}
+_indexes_lock = threading.Lock()
+_watermarks: Dict[str, datetime] = {}
+_snapshot_version: Optional[str] = None
+_maintenance_thread: Optional[threading.Thread] = None
+
+# Compact early once this share of rows are tombstones
+COMPACTION_TOMBSTONE_RATIO = 0.2
+
+
+def _stored_unit_vector(emb, norm):
+    # Rows written before embeddings were normalized on save have no stored norm
+    if emb is None or norm is not None:
+        return emb
+    return l2_normalize(emb)[0]
+
+
+def _charity_rows(since: Optional[datetime] = None):
+    from .models import Charity
+
+    qs = Charity.objects.all()
+    qs = qs.filter(embedding__isnull=False) if since is None else qs.filter(updated_at__gte=since)
+    for charity_id, emb, norm in qs.values_list('id', 'embedding', 'embedding_norm').iterator(chunk_size=500):
+        yield charity_id, _stored_unit_vector(emb, norm)
+
+
+def _movement_rows(since: Optional[datetime] = None):
+    from .models import Movement
+
+    qs = Movement.objects.all()
+    qs = qs.filter(is_active=True, embedding__isnull=False) if since is None else qs.filter(updated_at__gte=since)
+    rows = qs.values_list('id', 'embedding', 'embedding_norm', 'is_active').iterator(chunk_size=2000)
+    for movement_id, emb, norm, is_active in rows:
+        yield movement_id, (_stored_unit_vector(emb, norm) if is_active else None)
+
+
+def _live_charity_ids() -> Set[int]:
+    from .models import Charity
+    return set(Charity.objects.filter(embedding__isnull=False).values_list('id', flat=True))
+
+
+def _live_movement_ids() -> Set[int]:
+    from .models import Movement
+    return set(Movement.objects.filter(is_active=True, embedding__isnull=False).values_list('id', flat=True))
+
+
+def _new_charity_index() -> VectorIndex:
+    return VectorIndex('charity')
+
+
+def _new_movement_index() -> IVFFlatIndex:
+    return IVFFlatIndex(
+        'movement',
+        nlist=getattr(settings, 'COMPASS_ANN_NLIST', 0),
+        nprobe=getattr(settings, 'COMPASS_ANN_NPROBE', 8),
+        min_train_size=getattr(settings, 'COMPASS_ANN_MIN_SIZE', 2000),
+    )
+
+
+_SOURCES = {
+    'charity': (_new_charity_index, _charity_rows, _live_charity_ids),
+    'movement': (_new_movement_index, _movement_rows, _live_movement_ids),
+}
+INDEX_NAMES = tuple(_SOURCES)
+
+
+def build_index(name: str, snapshot_version: Optional[str] = None) -> Tuple[VectorIndex, datetime]:
+    """
+    Build a fresh, unregistered index for `name`.
+
+    With `snapshot_version` the index is attached to that memory-mapped
+    snapshot and the database changes made since it was written are replayed
+    on top; otherwise every row is loaded from the database. Returns the index
+    and the watermark to sync further changes from.
+    """
+    from . import embedding_snapshot
+
+    factory, rows, _ = _SOURCES[name]
+    index = factory()
+    if snapshot_version:
+        created_at = embedding_snapshot.load_snapshot_into(index, name, snapshot_version)
+        if created_at is not None:
+            watermark = timezone.now()
+            upserted, removed = index.apply(rows(created_at - timedelta(seconds=1)), normalized=True)
+            print(f"Opened {name} vector index from snapshot {snapshot_version} "
+                  f"({len(index)} rows, replayed {upserted} upserts and {removed} removals).")
+            return index, watermark
+
+    watermark = timezone.now()
+    loaded = index.bulk_load(((item_id, emb) for item_id, emb in rows() if emb is not None), normalized=True)
+    print(f"Built {name} vector index with {loaded} embeddings.")
+    return index, watermark
+
+
+def _get_or_build(name: str) -> VectorIndex:
+    global _snapshot_version
+    from . import embedding_snapshot
+
+    index = _indexes.get(name)
+    if index is not None:
+        return index
+    with _indexes_lock:
+        index = _indexes.get(name)
+        if index is None:
+            if _snapshot_version is None:
+                _snapshot_version = embedding_snapshot.current_version()
+            index, _watermarks[name] = build_index(name, snapshot_version=_snapshot_version)
+            _indexes[name] = index
+    _ensure_maintenance_thread()
+    return index
+
+
+def get_charity_index() -> VectorIndex:
+    """Return the process-wide charity index, opening the snapshot or loading the database on first use."""
+    return _get_or_build('charity')
+
+
+def get_movement_index() -> IVFFlatIndex:
+    """Return the process-wide movement ANN index, opening the snapshot or loading the database on first use."""
+    return _get_or_build('movement')
+
+
+def swap_to_snapshot(version: str) -> None:
+    """Rebuild every live index from snapshot `version` and swap it in atomically."""
+    global _snapshot_version
+    for name in list(_indexes):
+        index, watermark = build_index(name, snapshot_version=version)
+        with _indexes_lock:
+            _indexes[name] = index
+            _watermarks[name] = watermark
+    _snapshot_version = version
+
+
+def sync_index_changes(name: str) -> Tuple[int, int]:
+    """Apply rows updated since the last sync to a built index. Returns (upserted, removed)."""
+    index = _indexes.get(name)
+    if index is None:
+        return 0, 0
+    _, rows, _ = _SOURCES[name]
+    started = timezone.now()
+    # Overlap the window slightly; re-applying a row is idempotent
+    since = _watermarks.get(name, started) - timedelta(seconds=1)
+    changes = index.apply(rows(since), normalized=True)
+    _watermarks[name] = started
+    return changes
+
+
+def compact_index(name: str, reconcile: bool = True) -> int:
+    """Drop rows deleted elsewhere, squeeze tombstones and retrain IVF lists if the index has grown."""
+    index = _indexes.get(name)
+    if index is None:
+        return 0
+    if reconcile:
+        _, _, live_ids = _SOURCES[name]
+        for stale_id in index.ids() - live_ids():
+            index.remove(stale_id)
+    dropped = index.compact()
+    if isinstance(index, IVFFlatIndex) and index.needs_training:
+        index.train()
+    return dropped
+
+
+def _maintenance_loop() -> None:
+    from . import embedding_snapshot, lexical_index, local_embeddings
+
+    sync_interval = getattr(settings, 'VECTOR_INDEX_SYNC_INTERVAL', 5)
+    compact_interval = getattr(settings, 'VECTOR_INDEX_COMPACT_INTERVAL', 300)
+    last_compaction = time.monotonic()
+    while True:
+        time.sleep(sync_interval)
+        try:
+            close_old_connections()
+            version = embedding_snapshot.current_version()
+            if version and version != _snapshot_version:
+                swap_to_snapshot(version)
+            due = time.monotonic() - last_compaction >= compact_interval
+            for name in list(_indexes):
+                sync_index_changes(name)
+                index = _indexes[name]
+                if due or index.tombstones > COMPACTION_TOMBSTONE_RATIO * max(len(index), 1):
+                    dropped = compact_index(name, reconcile=due)
+                    if dropped:
+                        print(f"Compacted {name} vector index: dropped {dropped} rows.")
+                elif isinstance(index, IVFFlatIndex) and index.needs_training:
+                    index.train()
+            lexical_index.sync_text_index_changes(reconcile=due)
+            local_embeddings.sync_local_index_changes(reconcile=due)
+            if due:
+                from .utils import prune_expired_mission_tokens
+                prune_expired_mission_tokens()
+                last_compaction = time.monotonic()
+        except Exception as e:
+            print(f"Vector index maintenance error: {e} (Type: {type(e).__name__})")
+        finally:
+            close_old_connections()
+
+
+def _ensure_maintenance_thread() -> None:
+    global _maintenance_thread
+    if getattr(settings, 'VECTOR_INDEX_SYNC_INTERVAL', 5) <= 0:
+        return
+    with _indexes_lock:
+        if _maintenance_thread is None or not _maintenance_thread.is_alive():
+            _maintenance_thread = threading.Thread(target=_maintenance_loop, name='vector-index-maintenance', daemon=True)
+            _maintenance_thread.start()
+
+
+# --- Model signal hooks: O(1) upserts and tombstones on the live indexes ---
+
+def _apply_change(name: str, item_id: int, embedding, normalized: bool = False) -> None:
+    index = _indexes.get(name)
+    if index is not None:
+        index.apply([(item_id, embedding)], normalized=normalized)
+
+
+@receiver(post_save, sender='main.Charity')
+def charity_index_post_save(sender, instance, **kwargs):
+    # EmbeddingField.pre_save has already normalized the vector and set embedding_norm
+    _apply_change('charity', instance.id, instance.embedding, normalized=instance.embedding_norm is not None)
+
+
+@receiver(post_delete, sender='main.Charity')
+def charity_index_post_delete(sender, instance, **kwargs):
+    _apply_change('charity', instance.id, None)
+
+
+@receiver(post_save, sender='main.Movement')
+def movement_index_post_save(sender, instance, **kwargs):
+    _apply_change('movement', instance.id, instance.embedding if instance.is_active else None,
+                  normalized=instance.embedding_norm is not None)
+
+
+@receiver(post_delete, sender='main.Movement')
+def movement_index_post_delete(sender, instance, **kwargs):
+    _apply_change('movement', instance.id, None)